@@ -0,0 +1,435 @@
+"""Tamper-evident audit log: hash chain plus Merkle checkpoints.
+
+Each audit record's ``provenance_hash`` is computed from its stored fields
+only, so it can be recomputed at any time. Records are then appended to the
+chain: ``sequence`` numbers them and ``chain_hash`` links each one to its
+predecessor. The same provenance hashes are the leaves of an append-only
+Merkle tree in the RFC 6962 layout; complete subtrees are stored in
+``AuditMerkleNode`` and every ``audit_checkpoint_interval`` records the root
+is persisted as an ``AuditCheckpoint``.
+
+``verify_range`` rehashes only the records of a range and checks them against
+a checkpoint root using O(log n) stored subtree hashes. ``verify_all`` rehashes
+the whole log in sequence chunks across a process pool.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, create_engine, func, or_, select, update
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+from app.models import Audit, AuditChainHead, AuditCheckpoint, AuditMerkleNode
+from app.audit_export import audit_filter_clauses
+
+GENESIS_HASH = "0" * 64
+HEAD_ID = 1
+VERIFY_CHUNK_SIZE = 1 << 16  # Power of two, so every full chunk is one Merkle subtree
+
+PROVENANCE_FIELDS = (
+    "session_id",
+    "timestamp",
+    "prompt",
+    "response",
+    "used_memory_ids",
+    "dropped_memory_ids",
+    "policy_violation",
+    "violation_reason",
+    "violation_offset",
+    "cached",
+)
+_PROVENANCE_ENCODER = json.JSONEncoder(sort_keys=True)  # Same output as json.dumps(..., sort_keys=True)
+_VERIFY_COLUMNS = [Audit.__table__.c[name] for name in ("sequence", "provenance_hash", "chain_hash", *PROVENANCE_FIELDS)]
+
+
+# Hashing
+
+def compute_provenance_hash(record) -> str:
+    """Hash an audit record's stored fields (an ``Audit``, dict or row mapping)."""
+    if isinstance(record, Mapping):
+        values = {name: record[name] for name in PROVENANCE_FIELDS}
+    else:
+        values = {name: getattr(record, name) for name in PROVENANCE_FIELDS}
+    values["session_id"] = str(values["session_id"])
+    values["timestamp"] = values["timestamp"].isoformat()
+    values["policy_violation"] = bool(values["policy_violation"])
+    return hashlib.sha256(_PROVENANCE_ENCODER.encode(values).encode()).hexdigest()
+
+
+def chain_link(previous_hash: str, provenance_hash: str) -> str:
+    return hashlib.sha256(bytes.fromhex(previous_hash) + bytes.fromhex(provenance_hash)).hexdigest()
+
+
+def leaf_hash(provenance_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(provenance_hash)).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _push(frontier: List[List], level: int, node: str) -> List[Tuple[int, str]]:
+    """Append a complete subtree to the tree's right edge; returns the new merged nodes."""
+    merged = []
+    while frontier and frontier[-1][0] == level:
+        node = node_hash(frontier.pop()[1], node)
+        level += 1
+        merged.append((level, node))
+    frontier.append([level, node])
+    return merged
+
+
+def frontier_root(frontier: List[List]) -> str:
+    """Merkle root of a tree given its right edge (complete subtrees, largest first)."""
+    if not frontier:
+        return hashlib.sha256(b"").hexdigest()
+    root = frontier[-1][1]
+    for _, node in reversed(frontier[:-1]):
+        root = node_hash(node, root)
+    return root
+
+
+# Appending
+
+def _lock_head(conn: Connection) -> Tuple[int, str, List[List]]:
+    """Lock the chain head row for this transaction and return its state."""
+    table = AuditChainHead.__table__
+    # A no-op UPDATE takes the row (PostgreSQL) or database (SQLite) write lock before reading
+    locked = conn.execute(update(table).where(table.c.id == HEAD_ID).values(id=HEAD_ID))
+    if locked.rowcount == 0:
+        conn.execute(table.insert().values(id=HEAD_ID, sequence=0, chain_hash=GENESIS_HASH, frontier="[]"))
+    head = conn.execute(select(table).where(table.c.id == HEAD_ID)).one()
+    return head.sequence, head.chain_hash, json.loads(head.frontier)
+
+
+def append_to_chain(conn: Connection, provenance_hashes: List[str]) -> List[Tuple[int, str]]:
+    """Chain records in order and extend the Merkle tree.
+    
+    Must run in the transaction that inserts the records; the head row stays
+    locked until it commits. Returns ``(sequence, chain_hash)`` per record.
+    """
+    sequence, chain_hash, frontier = _lock_head(conn)
+    interval = settings.audit_checkpoint_interval
+    links, nodes, checkpoints = [], [], []
+    
+    for provenance_hash in provenance_hashes:
+        sequence += 1
+        chain_hash = chain_link(chain_hash, provenance_hash)
+        links.append((sequence, chain_hash))
+        
+        position = sequence - 1
+        for level, node in _push(frontier, 0, leaf_hash(provenance_hash)):
+            nodes.append({"level": level, "position": position >> level, "hash": node})
+        
+        if interval > 0 and sequence % interval == 0:
+            checkpoints.append({
+                "tree_size": sequence,
+                "root_hash": frontier_root(frontier),
+                "chain_hash": chain_hash,
+                "created_at": datetime.utcnow(),
+            })
+    
+    if nodes:
+        conn.execute(AuditMerkleNode.__table__.insert(), nodes)
+    if checkpoints:
+        conn.execute(AuditCheckpoint.__table__.insert(), checkpoints)
+    table = AuditChainHead.__table__
+    conn.execute(
+        update(table).where(table.c.id == HEAD_ID).values(
+            sequence=sequence, chain_hash=chain_hash, frontier=json.dumps(frontier)
+        )
+    )
+    return links
+
+
+# Range verification
+
+def _split(size: int) -> int:
+    """Largest power of two strictly below ``size``."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def _proof_keys(start: int, end: int, lo: int, hi: int, keys: List[Tuple[int, int]]):
+    """Collect the stored subtrees of leaves [start, end) that lie outside [lo, hi)."""
+    size = end - start
+    if end <= lo or start >= hi:
+        if size & (size - 1) == 0:
+            level = size.bit_length() - 1
+            keys.append((level, start >> level))
+            return
+    elif size == 1:
+        return
+    split = _split(size)
+    _proof_keys(start, start + split, lo, hi, keys)
+    _proof_keys(start + split, end, lo, hi, keys)
+
+
+def _subtree_hash(start: int, end: int, lo: int, hi: int, leaves: Dict[int, str], stored: Dict) -> str:
+    size = end - start
+    if end <= lo or start >= hi:
+        if size & (size - 1) == 0:
+            level = size.bit_length() - 1
+            return stored[(level, start >> level)]
+    elif size == 1:
+        return leaves[start]
+    split = _split(size)
+    return node_hash(
+        _subtree_hash(start, start + split, lo, hi, leaves, stored),
+        _subtree_hash(start + split, end, lo, hi, leaves, stored)
+    )
+
+
+def _load_proof(conn: Connection, keys: List[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+    stored = {}
+    leaf_positions = [position for level, position in keys if level == 0]
+    if leaf_positions:
+        table = Audit.__table__
+        rows = conn.execute(
+            select(table.c.sequence, table.c.provenance_hash).where(
+                table.c.sequence.in_([position + 1 for position in leaf_positions])
+            )
+        )
+        stored.update({(0, row.sequence - 1): leaf_hash(row.provenance_hash) for row in rows})
+    node_keys = [key for key in keys if key[0] > 0]
+    if node_keys:
+        table = AuditMerkleNode.__table__
+        rows = conn.execute(
+            select(table).where(
+                or_(*(and_(table.c.level == level, table.c.position == position) for level, position in node_keys))
+            )
+        )
+        stored.update({(row.level, row.position): row.hash for row in rows})
+    return stored
+
+
+def sequence_range(
+    conn: Connection,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Optional[Tuple[int, int]]:
+    """Smallest sequence span covering every chained record in ``[since, until)``."""
+    table = Audit.__table__
+    lo, hi = conn.execute(
+        select(func.min(table.c.sequence), func.max(table.c.sequence)).where(
+            table.c.sequence.is_not(None), *audit_filter_clauses(since=since, until=until)
+        )
+    ).one()
+    return (lo, hi) if lo is not None else None
+
+
+def verify_range(conn: Connection, start_sequence: int, end_sequence: int) -> Dict:
+    """Verify records ``start_sequence..end_sequence`` (inclusive).
+    
+    Recomputes each record's provenance hash and chain link, then folds the
+    range into the Merkle root of the first checkpoint covering it, using
+    O(log n) stored subtree hashes for everything outside the range.
+    """
+    result = {
+        "verified": False,
+        "start_sequence": start_sequence,
+        "end_sequence": end_sequence,
+        "records": 0,
+        "checkpoint_tree_size": None,
+        "root_hash": None,
+        "proof_hashes": 0,
+        "error": None,
+    }
+    table = Audit.__table__
+    
+    if start_sequence > 1:
+        previous = conn.execute(
+            select(table.c.chain_hash).where(table.c.sequence == start_sequence - 1)
+        ).scalar_one_or_none()
+        if previous is None:
+            result["error"] = f"Missing record at sequence {start_sequence - 1}"
+            return result
+    else:
+        previous = GENESIS_HASH
+    
+    leaves = {}
+    expected = start_sequence
+    rows = conn.execute(
+        select(*_VERIFY_COLUMNS).where(table.c.sequence.between(start_sequence, end_sequence)).order_by(table.c.sequence)
+    )
+    for row in rows:
+        if row.sequence != expected:
+            result["error"] = f"Missing record at sequence {expected}"
+            return result
+        provenance_hash = compute_provenance_hash(row._mapping)
+        if provenance_hash != row.provenance_hash:
+            result["error"] = f"Record {row.sequence} does not match its provenance hash"
+            return result
+        previous = chain_link(previous, provenance_hash)
+        if previous != row.chain_hash:
+            result["error"] = f"Hash chain broken at sequence {row.sequence}"
+            return result
+        leaves[row.sequence - 1] = leaf_hash(provenance_hash)
+        expected += 1
+    result["records"] = expected - start_sequence
+    if expected != end_sequence + 1:
+        result["error"] = f"Missing record at sequence {expected}"
+        return result
+    
+    checkpoint = conn.execute(
+        select(AuditCheckpoint.__table__).where(AuditCheckpoint.__table__.c.tree_size >= end_sequence)
+        .order_by(AuditCheckpoint.__table__.c.tree_size).limit(1)
+    ).first()
+    if checkpoint is None:
+        # Not yet covered by a checkpoint: only the chain links could be checked
+        result["verified"] = True
+        return result
+    
+    lo, hi, size = start_sequence - 1, end_sequence, checkpoint.tree_size
+    keys: List[Tuple[int, int]] = []
+    _proof_keys(0, size, lo, hi, keys)
+    stored = _load_proof(conn, keys)
+    result["checkpoint_tree_size"] = size
+    result["proof_hashes"] = len(keys)
+    if len(stored) != len(keys):
+        result["error"] = f"Merkle proof incomplete for checkpoint {size}"
+        return result
+    
+    root = _subtree_hash(0, size, lo, hi, leaves, stored)
+    result["root_hash"] = root
+    if root != checkpoint.root_hash:
+        result["error"] = f"Merkle root does not match checkpoint {size}"
+        return result
+    
+    result["verified"] = True
+    return result
+
+
+# Bulk verification
+
+_worker_engines: Dict[str, object] = {}
+
+
+def _verify_chunk(task: Tuple[str, int, int, List[int]]) -> Dict:
+    """Rehash one aligned sequence chunk (runs in a worker process)."""
+    database_url, start, end, checkpoint_sizes = task
+    engine = _worker_engines.get(database_url)
+    if engine is None:
+        engine = _worker_engines[database_url] = create_engine(database_url)
+    table = Audit.__table__
+    checkpoint_sizes = set(checkpoint_sizes)
+    result = {"start": start, "end": end, "frontier": [], "snapshots": {}, "chain_hash": None, "error": None}
+    
+    with engine.connect() as conn:
+        if start > 1:
+            previous = conn.execute(
+                select(table.c.chain_hash).where(table.c.sequence == start - 1)
+            ).scalar_one_or_none() or GENESIS_HASH
+        else:
+            previous = GENESIS_HASH
+        frontier: List[List] = []
+        expected = start
+        rows = conn.execution_options(yield_per=5000).execute(
+            select(*_VERIFY_COLUMNS).where(table.c.sequence.between(start, end)).order_by(table.c.sequence)
+        )
+        for row in rows:
+            if row.sequence != expected:
+                result["error"] = f"Missing record at sequence {expected}"
+                return result
+            provenance_hash = compute_provenance_hash(row._mapping)
+            if provenance_hash != row.provenance_hash:
+                result["error"] = f"Record {row.sequence} does not match its provenance hash"
+                return result
+            previous = chain_link(previous, provenance_hash)
+            if previous != row.chain_hash:
+                result["error"] = f"Hash chain broken at sequence {row.sequence}"
+                return result
+            _push(frontier, 0, leaf_hash(provenance_hash))
+            if row.sequence in checkpoint_sizes:
+                result["snapshots"][row.sequence] = ([list(entry) for entry in frontier], previous)
+            expected += 1
+    
+    if expected != end + 1:
+        result["error"] = f"Missing record at sequence {expected}"
+    result["frontier"] = frontier
+    result["chain_hash"] = previous
+    return result
+
+
+def verify_all(
+    database_url: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = VERIFY_CHUNK_SIZE
+) -> Dict:
+    """Rehash the whole chain in parallel and check every checkpoint.
+    
+    Each worker process verifies one sequence chunk (provenance hashes and
+    chain links) and returns the Merkle subtrees it covers; the parent joins
+    them to recompute every checkpoint root.
+    """
+    if chunk_size & (chunk_size - 1):
+        raise ValueError("chunk_size must be a power of two")
+    database_url = database_url or settings.database_url
+    workers = workers or settings.audit_verify_workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    
+    engine = create_engine(database_url)
+    table = Audit.__table__
+    with engine.connect() as conn:
+        head = conn.execute(select(func.max(table.c.sequence))).scalar() or 0
+        unchained = conn.execute(select(func.count()).select_from(table).where(table.c.sequence.is_(None))).scalar()
+        checkpoints = {
+            row.tree_size: row
+            for row in conn.execute(select(AuditCheckpoint.__table__).where(AuditCheckpoint.__table__.c.tree_size <= head))
+        }
+        chain_head = conn.execute(select(AuditChainHead.__table__)).first()
+    engine.dispose()
+    
+    tasks = [
+        (database_url, start, min(start + chunk_size - 1, head), [size for size in checkpoints if start <= size < start + chunk_size])
+        for start in range(1, head + 1, chunk_size)
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_verify_chunk, tasks))
+    else:
+        chunks = [_verify_chunk(task) for task in tasks]
+    
+    result = {
+        "verified": False,
+        "records": head,
+        "unchained_records": unchained,
+        "checkpoints_checked": 0,
+        "root_hash": None,
+        "workers": workers,
+        "seconds": 0.0,
+        "error": None,
+    }
+    frontier: List[List] = []
+    for chunk in chunks:
+        if chunk["error"]:
+            result["error"] = chunk["error"]
+            break
+        for size, (snapshot, chain_hash) in sorted(chunk["snapshots"].items()):
+            checkpoint = checkpoints[size]
+            joined = [list(entry) for entry in frontier]
+            for level, node in snapshot:
+                _push(joined, level, node)
+            if frontier_root(joined) != checkpoint.root_hash or chain_hash != checkpoint.chain_hash:
+                result["error"] = f"Checkpoint {size} does not match the records"
+                break
+            result["checkpoints_checked"] += 1
+        if result["error"]:
+            break
+        for level, node in chunk["frontier"]:
+            _push(frontier, level, node)
+    else:
+        if chunks and chain_head is not None and chunks[-1]["chain_hash"] != chain_head.chain_hash:
+            result["error"] = "Chain head does not match the last record"
+        else:
+            result["verified"] = True
+            result["root_hash"] = frontier_root(frontier)
+    
+    result["seconds"] = time.perf_counter() - started
+    return result
@@ -0,0 +1,140 @@
+"""Streaming audit log export.
+
+Rows are read with a server-side cursor (``yield_per``) and written as NDJSON,
+one JSON object per audit record in chronological order, optionally gzip or
+zstd compressed on the fly. Memory use depends on the batch size only, not on
+the size of the audit table.
+"""
+
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models import Audit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression -> (media type, file extension)
+EXPORT_COMPRESSIONS = {
+    "none": ("application/x-ndjson", ".ndjson"),
+    "gzip": ("application/gzip", ".ndjson.gz"),
+    "zstd": ("application/zstd", ".ndjson.zst"),
+}
+EXPORT_BATCH_SIZE = 5000
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def as_utc(value: datetime) -> datetime:
+    """Audit timestamps are stored as naive UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def audit_filter_clauses(
+    session_id: Optional[UUID] = None,
+    policy_violation: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> List:
+    """WHERE clauses shared by the audit listing and export."""
+    clauses = []
+    if session_id is not None:
+        clauses.append(Audit.session_id == session_id)
+    if policy_violation is not None:
+        clauses.append(Audit.policy_violation == policy_violation)
+    if since is not None:
+        clauses.append(Audit.timestamp >= as_utc(since))
+    if until is not None:
+        clauses.append(Audit.timestamp < as_utc(until))
+    return clauses
+
+
+def _json_list(value: Optional[str]) -> List[str]:
+    if not value or value == "[]":
+        return []
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return []
+
+
+def audit_row_to_dict(row) -> Dict:
+    """Export representation of one audit row."""
+    return {
+        "id": str(row.id),
+        "session_id": str(row.session_id),
+        "timestamp": row.timestamp.isoformat(),
+        "prompt": row.prompt,
+        "response": row.response,
+        "used_memory_ids": _json_list(row.used_memory_ids),
+        "dropped_memory_ids": _json_list(row.dropped_memory_ids),
+        "provenance_hash": row.provenance_hash,
+        "policy_violation": row.policy_violation,
+        "violation_reason": row.violation_reason,
+        "violation_offset": row.violation_offset,
+        "cached": row.cached,
+        "sequence": row.sequence,
+        "chain_hash": row.chain_hash,
+    }
+
+
+def iter_audit_ndjson(engine: Engine, clauses: Iterable = (), batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield NDJSON-encoded audit rows, one chunk per fetched batch."""
+    table = Audit.__table__
+    statement = select(table).where(*clauses).order_by(table.c.timestamp, table.c.id)
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield "".join(json.dumps(audit_row_to_dict(row)) + "\n" for row in partition).encode()
+
+
+def check_compression(compression: str):
+    """Raise ValueError for an unknown or unavailable compression."""
+    if compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'. Supported: {', '.join(EXPORT_COMPRESSIONS)}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package: pip install zstandard")
+
+
+def compress_chunks(chunks: Iterable[bytes], compression: str = "none") -> Iterator[bytes]:
+    """Compress a byte stream on the fly with gzip or zstd."""
+    check_compression(compression)
+    if compression == "none":
+        yield from chunks
+        return
+    
+    if compression == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_audit(
+    engine: Engine,
+    clauses: Iterable = (),
+    compression: str = "none",
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Stream the (filtered) audit log as optionally compressed NDJSON.
+    
+    The compression is validated eagerly so callers can reject the request
+    before the first byte is sent.
+    """
+    check_compression(compression)
+    return compress_chunks(iter_audit_ndjson(engine, clauses, batch_size), compression)
@@ -0,0 +1,335 @@
+"""Write-behind audit logger with group commit.
+
+In ``write_behind`` mode, ``LCACEngine.create_audit_record`` hands the fully
+built ``Audit`` (ID and provenance hash already set) to the writer and returns
+immediately. A background thread chains and inserts queued records in
+multi-row transactions, flushing when ``audit_batch_size`` records are waiting
+or ``audit_flush_interval_ms`` has passed.
+
+Durability options:
+- ``none``: records only live in memory until flushed.
+- ``spill``: each record is appended to a per-process spill file first.
+- ``fsync``: as ``spill``, and the file is fsync'd before the caller returns.
+
+Spill files are truncated once everything in them has been committed and are
+replayed on the next start if the process died before flushing. Replay needs
+``fcntl`` to tell a dead worker's file from a live one's; without it (Windows)
+leftover spill files are only reported in the log.
+
+A batch that fails with a database connection error (``OperationalError``)
+stays at the head of the queue and is retried, together with anything queued
+behind it, with a backoff doubling up to ``RETRY_DELAY_MAX`` seconds until the
+database is back; after ``audit_flush_max_retries`` consecutive failures each
+attempt logs an error. Rows still uncommitted at shutdown remain in the spill
+file (lost with ``durability="none"``). Any other error is blamed on the rows:
+the batch is bisected until the offending rows are isolated, those are moved to
+a quarantine file (``audit-quarantine-<pid>.ndjson`` in the spill directory,
+never replayed) with an error log, and the rest is committed.
+
+Rows written here are not part of the request's transaction, so callers that
+need an audit row to commit atomically with other changes (a revocation) pass
+``atomic=True`` to ``LCACEngine.create_audit_record`` to bypass the writer.
+"""
+
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.database import engine
+from app.models import Audit
+from app.audit_chain import append_to_chain
+
+try:
+    import fcntl
+except ImportError:  # Windows: no way to tell a dead worker's spill file, so none are replayed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flush attempts while the database is unreachable
+RETRY_DELAY_MIN = 0.05
+RETRY_DELAY_MAX = 5.0
+
+_STOP = object()
+_UUID_COLUMNS = {"id", "session_id"}
+_DATETIME_COLUMNS = {"timestamp"}
+
+
+def _encode_row(row: Dict) -> Dict:
+    return {
+        key: str(value) if key in _UUID_COLUMNS else value.isoformat() if key in _DATETIME_COLUMNS else value
+        for key, value in row.items()
+    }
+
+
+def _decode_row(row: Dict) -> Dict:
+    return {
+        key: UUID(value) if key in _UUID_COLUMNS else datetime.fromisoformat(value) if key in _DATETIME_COLUMNS else value
+        for key, value in row.items()
+    }
+
+
+class AuditWriter:
+    """Queues audit rows and commits them in batches from a background thread."""
+    
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        durability: Optional[str] = None,
+        spill_dir: Optional[str] = None
+    ):
+        self.batch_size = batch_size or settings.audit_batch_size
+        self.flush_interval = (flush_interval_ms or settings.audit_flush_interval_ms) / 1000
+        self.durability = (durability or settings.audit_durability).lower()
+        self.spill_dir = spill_dir or settings.audit_spill_dir
+        self.max_retries = settings.audit_flush_max_retries
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._spill_file = None
+        self._unflushed = 0  # Records submitted but not yet committed
+        self._failures = 0  # Consecutive flushes that hit a connection error
+        self.stats = {"submitted": 0, "flushed": 0, "batches": 0, "errors": 0, "recovered": 0, "quarantined": 0, "held": 0}
+    
+    @property
+    def spill_enabled(self) -> bool:
+        return self.durability in ("spill", "fsync")
+    
+    # Lifecycle
+    
+    def start(self):
+        """Replay leftover spill files and start the flush thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.spill_enabled:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._recover_spill_files()
+                path = os.path.join(self.spill_dir, f"audit-spill-{os.getpid()}.ndjson")
+                self._spill_file = open(path, "a+", encoding="utf-8")
+                if fcntl is not None:
+                    fcntl.flock(self._spill_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+    
+    def drain(self, timeout: Optional[float] = None):
+        """Flush everything queued and stop the flush thread (graceful shutdown)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            if self._spill_file is not None:
+                if self._unflushed == 0:
+                    os.remove(self._spill_file.name)
+                self._spill_file.close()
+                self._spill_file = None
+    
+    # Submission
+    
+    def submit(self, audit: Audit):
+        """Queue an audit row; returns once it is as durable as configured."""
+        if self._thread is None:
+            self.start()
+        row = {column.name: getattr(audit, column.name) for column in Audit.__table__.columns}
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.write(json.dumps(_encode_row(row)) + "\n")
+                self._spill_file.flush()
+                if self.durability == "fsync":
+                    os.fsync(self._spill_file.fileno())
+            self._unflushed += 1
+            self.stats["submitted"] += 1
+            self._queue.put(row)
+    
+    # Background flushing
+    
+    def _run(self):
+        stopping = False
+        held: List[Dict] = []  # Rows a connection error left uncommitted; they go first, in order
+        delay = RETRY_DELAY_MIN
+        while not stopping:
+            batch = list(held)
+            if batch:
+                # Back off, still taking new rows so they queue behind the held ones
+                item, deadline = None, time.monotonic() + delay
+            else:
+                item, deadline = self._queue.get(), time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    # Take whatever is still queued before the final flush
+                    while True:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    break
+                if item is not None:
+                    batch.append(item)
+                if not held and len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                held = self._flush(batch)
+                delay = min(delay * 2, RETRY_DELAY_MAX) if held else RETRY_DELAY_MIN
+        
+        if held:
+            where = "left in the spill file for the next start" if self.spill_enabled else "lost"
+            logger.error("Shutting down with %d uncommitted audit rows, %s", len(held), where)
+    
+    def _flush(self, batch: List[Dict]) -> List[Dict]:
+        """Commit a batch; returns the rows a connection error left uncommitted, oldest first."""
+        error = self._insert(batch)
+        if error is None:
+            self._settled(len(batch), len(batch))
+            held = []
+        else:
+            self.stats["errors"] += 1
+            if isinstance(error, OperationalError):
+                held = batch
+            else:
+                quarantined = self.stats["quarantined"]
+                held = self._isolate(batch)
+                settled = len(batch) - len(held)
+                if settled:
+                    self._settled(settled, settled - (self.stats["quarantined"] - quarantined))
+        
+        self.stats["held"] = len(held)
+        if not held:
+            self._failures = 0
+            return held
+        self._failures += 1
+        log = logger.error if self._failures > self.max_retries else logger.warning
+        log("Audit flush failed %d time(s) in a row; %d rows held for retry", self._failures, len(held))
+        return held
+    
+    def _insert(self, rows: List[Dict]) -> Optional[Exception]:
+        """Chain and insert ``rows`` in one transaction; returns the error, if any."""
+        try:
+            with engine.begin() as conn:
+                self._chain(conn, rows)
+                conn.execute(Audit.__table__.insert(), rows)
+        except Exception as e:
+            return e
+        return None
+    
+    def _isolate(self, rows: List[Dict]) -> List[Dict]:
+        """Bisect a batch that failed on its data, quarantining the rows that cannot be inserted.
+        
+        Stops at the first connection error, so the chain keeps queue order,
+        and returns the rows from there on (empty when all were settled).
+        """
+        if len(rows) == 1:
+            error = self._insert(rows)
+            if isinstance(error, OperationalError):
+                return rows
+            if error is not None:
+                self._quarantine(rows[0], error)
+            return []
+        middle = len(rows) // 2
+        for start, end in ((0, middle), (middle, len(rows))):
+            error = self._insert(rows[start:end])
+            if isinstance(error, OperationalError):
+                return rows[start:]
+            if error is not None:
+                held = self._isolate(rows[start:end])
+                if held:
+                    return held + rows[end:]
+        return []
+    
+    def _quarantine(self, row: Dict, error: Exception):
+        """Set a row that can never be inserted aside so it stops blocking the queue."""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"audit-quarantine-{os.getpid()}.ndjson")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"error": str(error), "row": _encode_row(row)}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats["quarantined"] += 1
+        logger.error("Quarantined audit row %s to %s: %s", row.get("id"), path, error)
+    
+    def _settled(self, count: int, committed: int):
+        """Account for rows that no longer need the spill file (committed or quarantined)."""
+        with self._lock:
+            self._unflushed -= count
+            self.stats["flushed"] += committed
+            self.stats["batches"] += 1
+            # Everything spilled so far is committed; start the file over
+            if self._spill_file is not None and self._unflushed == 0:
+                self._spill_file.truncate(0)
+                self._spill_file.seek(0)
+    
+    @staticmethod
+    def _chain(conn, rows: List[Dict]):
+        """Assign hash chain positions in queue order (reassigned if a flush is retried)."""
+        links = append_to_chain(conn, [row["provenance_hash"] for row in rows])
+        for row, (sequence, chain_hash) in zip(rows, links):
+            row["sequence"] = sequence
+            row["chain_hash"] = chain_hash
+    
+    # Recovery
+    
+    def _recover_spill_files(self):
+        paths = glob.glob(os.path.join(self.spill_dir, "audit-spill-*.ndjson"))
+        if fcntl is None:
+            # Replaying a live worker's file would insert its rows twice
+            if paths:
+                logger.warning("Not replaying %d audit spill file(s) without file locking: %s", len(paths), ", ".join(paths))
+            return
+        for path in paths:
+            with open(path, "r+", encoding="utf-8") as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # Owned by a live worker
+                rows = [_decode_row(json.loads(line)) for line in f if line.strip()]
+                if rows:
+                    self._replay(rows)
+            os.remove(path)
+    
+    def _replay(self, rows: List[Dict]):
+        ids = [row["id"] for row in rows]
+        with engine.connect() as conn:
+            existing = set()
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                existing.update(conn.execute(select(Audit.__table__.c.id).where(Audit.__table__.c.id.in_(chunk))).scalars())
+        missing = [row for row in rows if row["id"] not in existing]
+        if not missing:
+            return
+        error = self._insert(missing)
+        if error is None:
+            self.stats["recovered"] += len(missing)
+            return
+        if isinstance(error, OperationalError):
+            raise error
+        quarantined = self.stats["quarantined"]
+        held = self._isolate(missing)
+        if held:
+            raise OperationalError("Replaying audit spill file", None, None)
+        self.stats["recovered"] += len(missing) - (self.stats["quarantined"] - quarantined)
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,302 @@
+"""Background bulk redaction of memories.
+
+``LCACEngine.redact_memory`` handles one memory per call. A bulk job takes a
+selector (zone, any of a set of tags, a ``created_at`` range and/or explicit
+memory IDs, combined with AND) and redacts every unredacted match on a
+background thread, ``redaction_chunk_size`` memories per transaction:
+
+- the chunk's rows are read with a keyset on ``id`` (or a slice of the ID
+  list), their new content hashes are computed in one pass with the same
+  formula as ``redact_memory``, and they are rewritten by a single
+  ``UPDATE ... WHERE id IN (...) AND redacted = false RETURNING id``;
+- only the rows that statement returned count as redacted: memories a
+  concurrent ``/redact_memory`` got to first are left out of the job's count,
+  the audit record and the digest;
+- one audit record per chunk lists the changed memory IDs and a digest over
+  every ``id:old_hash:new_hash`` change, chained like any other audit row and
+  attached to a revoked system session created for the job;
+- job progress and the invalidation events (one ``memory`` event per
+  redacted memory, so every worker drops it from its retrieval index, and one
+  ``zone`` event per zone) commit in the same transaction, so a chunk is
+  either fully applied and audited or not at all.
+
+Jobs are stored in the ``redactionjob`` table, so progress can be read from
+any worker. A job interrupted by shutdown can simply be submitted again:
+already redacted memories no longer match.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, func, select, update
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import engine
+from app.invalidation_bus import MEMORY, ZONE, invalidation_bus
+from app.lcac import LCACEngine
+from app.models import Memory, MemoryTag, RedactionJob, Session as SessionModel
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_USER_ID = "system:bulk-redaction"
+ID_BATCH = 500  # IDs bound into one IN (...) clause
+INTERRUPTED = "Stopped by shutdown; submit the job again to resume"
+
+
+@dataclass
+class RedactionSelector:
+    """Which memories a job redacts; every given criterion must match."""
+    zone: Optional[str] = None
+    tags: List[str] = field(default_factory=list)  # Any of these tags
+    created_after: Optional[datetime] = None  # Inclusive
+    created_before: Optional[datetime] = None  # Exclusive
+    memory_ids: List[UUID] = field(default_factory=list)
+    
+    def __post_init__(self):
+        # Stored timestamps are naive UTC
+        for name in ("created_after", "created_before"):
+            value = getattr(self, name)
+            if value is not None and value.tzinfo is not None:
+                setattr(self, name, value.astimezone(timezone.utc).replace(tzinfo=None))
+    
+    def validate(self):
+        """Raise ValueError for an empty or inconsistent selector."""
+        if not (self.zone or self.tags or self.created_after or self.created_before or self.memory_ids):
+            raise ValueError("Selector needs at least one of zone, tags, created_after, created_before or memory_ids")
+        if self.created_after and self.created_before and self.created_after >= self.created_before:
+            raise ValueError("created_after must be earlier than created_before")
+    
+    def clauses(self) -> List:
+        """WHERE clauses on ``memory`` for everything but the ID list."""
+        table = Memory.__table__
+        clauses = [table.c.redacted == False]
+        if self.zone is not None:
+            clauses.append(table.c.zone == self.zone)
+        if self.tags:
+            tagged = select(MemoryTag.memory_id).where(MemoryTag.tag.in_(self.tags))
+            if self.zone is not None:
+                tagged = tagged.where(MemoryTag.zone == self.zone)
+            clauses.append(table.c.id.in_(tagged))
+        if self.created_after is not None:
+            clauses.append(table.c.created_at >= self.created_after)
+        if self.created_before is not None:
+            clauses.append(table.c.created_at < self.created_before)
+        return clauses
+    
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["memory_ids"] = [str(memory_id) for memory_id in self.memory_ids]
+        for name in ("created_after", "created_before"):
+            data[name] = data[name].isoformat() if data[name] else None
+        return json.dumps(data)
+    
+    @classmethod
+    def from_json(cls, text: str) -> "RedactionSelector":
+        data = json.loads(text)
+        return cls(
+            zone=data.get("zone"),
+            tags=data.get("tags") or [],
+            created_after=datetime.fromisoformat(data["created_after"]) if data.get("created_after") else None,
+            created_before=datetime.fromisoformat(data["created_before"]) if data.get("created_before") else None,
+            memory_ids=[UUID(memory_id) for memory_id in data.get("memory_ids") or []]
+        )
+
+
+def redaction_hashes(content_hashes: List[str], redacted_at: str) -> List[str]:
+    """New content hashes for a chunk, as ``LCACEngine.redact_memory`` computes them."""
+    sha256 = hashlib.sha256
+    return [sha256(f"redacted:{content_hash}:{redacted_at}".encode()).hexdigest() for content_hash in content_hashes]
+
+
+def redaction_digest(changes: List[Tuple[str, str, str]]) -> str:
+    """sha256 over ``id:old_hash:new_hash`` lines, recorded in the chunk's audit row."""
+    return hashlib.sha256("".join(f"{memory_id}:{old}:{new}\n" for memory_id, old, new in changes).encode()).hexdigest()
+
+
+class BulkRedactor:
+    """Creates redaction jobs and runs them on a background thread pool."""
+    
+    def __init__(self, bind=None, chunk_size: Optional[int] = None, workers: Optional[int] = None):
+        self.engine = bind or engine
+        self.chunk_size = chunk_size or settings.redaction_chunk_size
+        self._executor = ThreadPoolExecutor(workers or settings.redaction_workers, thread_name_prefix="bulk-redaction")
+        self._stopping = threading.Event()
+    
+    # Jobs
+    
+    def submit(self, selector: RedactionSelector, reason: Optional[str] = None) -> RedactionJob:
+        """Validate the selector, record the job with its match count and queue it."""
+        selector.validate()
+        now = datetime.utcnow()
+        with Session(self.engine, expire_on_commit=False) as db_session:
+            # Audit rows need a session; this one can never be used for inference
+            system_session = SessionModel(zone=selector.zone or "system", user_id=SYSTEM_USER_ID, revoked_at=now)
+            job = RedactionJob(
+                selector=selector.to_json(),
+                reason=reason,
+                session_id=system_session.session_id,
+                total=self._count(db_session, selector),
+                created_at=now
+            )
+            system_session.set_metadata({"redaction_job_id": str(job.id), "revocation_reason": "System session"})
+            db_session.add(system_session)
+            db_session.add(job)
+            db_session.commit()
+        self._executor.submit(self.run, job.id)
+        return job
+    
+    def _count(self, db_session: Session, selector: RedactionSelector) -> int:
+        table = Memory.__table__
+        statement = select(func.count()).select_from(table).where(*selector.clauses())
+        if not selector.memory_ids:
+            return db_session.execute(statement).scalar()
+        return sum(
+            db_session.execute(statement.where(table.c.id.in_(batch))).scalar()
+            for batch in self._id_batches(selector.memory_ids, ID_BATCH)
+        )
+    
+    @staticmethod
+    def _id_batches(memory_ids: List[UUID], size: int) -> Iterator[List[UUID]]:
+        ordered = sorted(set(memory_ids))
+        for start in range(0, len(ordered), size):
+            yield ordered[start:start + size]
+    
+    def get(self, job_id: UUID, db_session: Session) -> Optional[RedactionJob]:
+        return db_session.get(RedactionJob, job_id)
+    
+    def run(self, job_id: UUID):
+        """Run a job to completion, recording failures on the job row."""
+        try:
+            self._run(job_id)
+        except Exception as e:
+            logger.exception("Bulk redaction job %s failed", job_id)
+            self._finish(job_id, "failed", f"{e.__class__.__name__}: {e}")
+    
+    def _run(self, job_id: UUID):
+        with Session(self.engine) as db_session:
+            job = db_session.get(RedactionJob, job_id)
+            if self._stopping.is_set():
+                self._finish(job_id, "interrupted", INTERRUPTED)
+                return
+            selector = RedactionSelector.from_json(job.selector)
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            db_session.add(job)
+            db_session.commit()
+            
+            for rows in self._chunks(db_session, selector):
+                if self._stopping.is_set():
+                    self._finish(job_id, "interrupted", INTERRUPTED)
+                    return
+                self._redact_chunk(db_session, job, rows)
+        self._finish(job_id, "completed")
+    
+    def _chunks(self, db_session: Session, selector: RedactionSelector) -> Iterator[List]:
+        """Unredacted matching (id, zone, content_hash) rows, ``chunk_size`` at a time."""
+        table = Memory.__table__
+        statement = select(table.c.id, table.c.zone, table.c.content_hash).where(*selector.clauses()).order_by(table.c.id)
+        if selector.memory_ids:
+            for batch in self._id_batches(selector.memory_ids, min(self.chunk_size, ID_BATCH)):
+                rows = db_session.execute(statement.where(table.c.id.in_(batch))).all()
+                if rows:
+                    yield rows
+            return
+        
+        last_id = None
+        while True:
+            page = statement if last_id is None else statement.where(table.c.id > last_id)
+            rows = db_session.execute(page.limit(self.chunk_size)).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+    
+    def _redact_chunk(self, db_session: Session, job: RedactionJob, rows: List):
+        """Rewrite one chunk, audit it and advance the job in a single transaction."""
+        table = Memory.__table__
+        redacted_at = datetime.utcnow().isoformat()
+        new_hashes = redaction_hashes([row.content_hash for row in rows], redacted_at)
+        
+        try:
+            changed = set(db_session.connection().execute(
+                update(table)
+                .where(table.c.id.in_([row.id for row in rows]), table.c.redacted == False)
+                .values(
+                    content=f"[REDACTED - {redacted_at}]",
+                    redacted=True,
+                    content_hash=case({row.id: new_hash for row, new_hash in zip(rows, new_hashes)}, value=table.c.id)
+                )
+                .returning(table.c.id)
+            ).scalars())
+            # Rows redacted by someone else since they were read are not ours to audit
+            kept = [(row, new_hash) for row, new_hash in zip(rows, new_hashes) if row.id in changed]
+            if not kept:
+                db_session.rollback()
+                return
+            rows = [row for row, _ in kept]
+            new_hashes = [new_hash for _, new_hash in kept]
+            memory_ids = [str(row.id) for row in rows]
+            
+            job.chunks += 1
+            job.redacted += len(rows)
+            summary = {
+                "action": "bulk_redaction",
+                "job_id": str(job.id),
+                "chunk": job.chunks,
+                "reason": job.reason,
+                "selector": json.loads(job.selector),
+            }
+            result = {
+                "redacted": len(rows),
+                "redacted_at": redacted_at,
+                "redaction_digest": redaction_digest([
+                    (memory_id, row.content_hash, new_hash)
+                    for memory_id, row, new_hash in zip(memory_ids, rows, new_hashes)
+                ]),
+            }
+            LCACEngine(db_session).create_audit_record(
+                str(job.session_id),
+                json.dumps(summary),
+                json.dumps(result),
+                memory_ids,
+                commit=False,
+                atomic=True
+            )
+            # Every worker drops the memories from its retrieval index and cached responses
+            invalidation_bus.publish_many(
+                MEMORY,
+                [(memory_id, {"zone": row.zone}) for memory_id, row in zip(memory_ids, rows)],
+                db_session
+            )
+            for zone in {row.zone for row in rows}:
+                invalidation_bus.publish(ZONE, zone, db_session=db_session)
+            db_session.add(job)
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
+    
+    def _finish(self, job_id: UUID, status: str, error: Optional[str] = None):
+        with Session(self.engine) as db_session:
+            job = db_session.get(RedactionJob, job_id)
+            job.status = status
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db_session.add(job)
+            db_session.commit()
+    
+    def shutdown(self):
+        """Stop jobs after their current chunk; queued jobs are marked interrupted without running."""
+        self._stopping.set()
+        self._executor.shutdown(wait=True)
+
+
+bulk_redactor = BulkRedactor()
@@ -1,7 +1,7 @@
 """Configuration settings for the application."""
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -13,9 +13,19 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./clinical_triage.db"
+    storage_profile: str = "default"  # Options: "default", "sqlite_wal" or "postgres" (see app/database.py)
+    db_pool_size: int = 20  # sqlite_wal / postgres profiles
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced
+    db_pool_pre_ping: bool = True  # postgres profile: test connections on checkout
+    sqlite_busy_timeout_ms: int = 5000  # sqlite_wal profile
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 65536
+    sqlite_read_pool_size: int = 8  # Separate query_only pool for read endpoints
     
     # LLM Provider Selection
-    llm_provider: str = "openai"  # Options: "openai" or "gemini"
+    llm_provider: str = "openai"  # Options: "openai", "gemini" or "local-stub" (offline, see app/llm_stub.py)
     
     # OpenAI Configuration
     openai_api_key: Optional[str] = None
@@ -30,12 +40,92 @@ class Settings(BaseSettings):
     gemini_temperature: float = 0.7
     gemini_max_tokens: int = 500
     
+    # Local stub LLM (llm_provider="local-stub"): deterministic, no network
+    llm_stub_model: str = "local-stub"
+    llm_stub_seed: int = 0
+    llm_stub_latency_distribution: str = "fixed"  # Options: fixed, uniform, normal, lognormal, exponential
+    llm_stub_latency_ms: float = 50.0  # Mean time to first token
+    llm_stub_latency_jitter_ms: float = 0.0  # Uniform half-width, or standard deviation
+    llm_stub_tokens_per_second: float = 0.0  # Streaming rate; 0 disables per-token delay
+    llm_stub_response_tokens: int = 60
+    llm_stub_error_rate: float = 0.0  # Fraction of calls that raise
+    llm_stub_violation_rate: float = 0.0  # Fraction of responses containing llm_stub_violation_text
+    llm_stub_violation_text: str = "radiology"
+    
+    # LLM HTTP connection pools (one long-lived pool per provider/model)
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_http_keepalive_expiry: float = 30.0  # Seconds an idle connection stays open
+    llm_http_timeout: float = 60.0
+    llm_http_pools: Dict[str, Dict[str, float]] = {}  # Overrides keyed by "provider" or "provider:model"
+    
     # LCAC Configuration
     trust_score_initial: float = 1.0
     trust_score_violation_penalty: float = 0.2
     trust_score_success_bonus: float = 0.05
     trust_score_min: float = 0.0
     trust_score_max: float = 1.0
+    lcac_disallowed_patterns_file: Optional[str] = None  # Extra cross-zone terms, one per line
+    
+    # Retrieval
+    retrieval_backend: str = "bm25"  # Options: "bm25" or "vector"
+    retrieval_top_k: int = 5  # Memories per prompt after ranking; 0 keeps all
+    vector_store_path: str = "./vector_store"  # One memory-mapped store per zone
+    vector_embedder: str = "hashing"  # Registered name or "module:Class" local embedder
+    vector_dim: int = 256
+    
+    # Context packing (token estimates cover system prompt, memory context and user message)
+    prompt_token_budget: int = 3000
+    prompt_token_budgets: Dict[str, int] = {}  # Keys: "provider", "zone" or "provider:zone"
+    context_tag_weights: Dict[str, float] = {"vitals": 1.0, "symptoms": 0.8, "recent_visit": 0.5}
+    context_weight_relevance: float = 0.6
+    context_weight_tags: float = 0.2
+    context_weight_recency: float = 0.2
+    
+    # Response cache
+    response_cache_enabled: bool = True
+    response_cache_ttl_seconds: float = 300.0
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 16 * 1024 * 1024
+    
+    # Session state cache (pre-inference revocation check)
+    session_cache_enabled: bool = True
+    session_cache_ttl_seconds: float = 5.0  # Upper bound for revocations by other worker processes to apply here
+    session_cache_max_entries: int = 10000
+    
+    # Cross-worker cache invalidation (app/invalidation_bus.py)
+    invalidation_bus_enabled: bool = True
+    invalidation_poll_interval_ms: float = 100.0  # Bounds how long other workers serve stale cache entries
+    invalidation_retention_seconds: float = 600.0  # Change-log rows older than this are pruned
+    invalidation_lookback: int = 32  # Versions re-read per poll in case of out-of-order commits
+    
+    # Bulk memory ingestion (POST /memories/bulk, scripts/ingest_memories.py)
+    memory_ingest_batch_size: int = 5000  # Memories per insert transaction
+    memory_ingest_workers: int = 0  # Hashing threads (0 = min(4, CPUs))
+    memory_ingest_spool_bytes: int = 1024 * 1024  # Per-line results kept in memory before spilling to disk
+    memory_ingest_sqlite_cache_mb: int = 256  # SQLite page cache for the loading connection
+    
+    # Bulk redaction jobs (POST /redactions, app/bulk_redaction.py)
+    redaction_chunk_size: int = 1000  # Memories per transaction and per audit record
+    redaction_workers: int = 1  # Jobs run concurrently per worker process
+    
+    # Audit logging
+    audit_write_mode: str = "sync"  # Options: "sync" or "write_behind"
+    audit_batch_size: int = 500  # Write-behind: flush when this many records are queued
+    audit_flush_interval_ms: int = 50  # Write-behind: or when the oldest queued record is this old
+    audit_durability: str = "fsync"  # Write-behind: "none", "spill" or "fsync" (spill file fsync'd per record)
+    audit_spill_dir: str = "./audit_spill"
+    audit_flush_max_retries: int = 5  # Write-behind: failed flushes in a row before each retry logs an error
+    audit_page_size: int = 100  # GET /audit default page size
+    audit_page_size_max: int = 1000
+    audit_checkpoint_interval: int = 1024  # Persist a Merkle checkpoint every N chained records
+    audit_verify_workers: int = 0  # Bulk verifier processes (0 = one per CPU)
+    
+    # Profiling (X-Profile header on /ask, POST /profiling/window)
+    profiling_enabled: bool = False  # Opt in: profiles cost CPU and expose internals
+    profiling_sample_interval_ms: float = 5.0  # Stack sampling period
+    profiling_max_stored: int = 32  # Per-request profiles kept for GET /profiling/{id}
+    profiling_window_max_seconds: float = 300.0
     
     # Security
     encryption_key: Optional[str] = None  # For content encryption (optional in MVP)
@@ -0,0 +1,164 @@
+"""Compiled multi-pattern scanner for LCAC content violation checks.
+
+All disallowed terms are folded into a single trie-shaped regular expression,
+so a response is scanned once regardless of how many terms are loaded.
+
+Terms match whole words only, so short terms and codes cannot fire inside
+unrelated words. Inflections, spelling variants and compounds that should count
+as the same term ("x-rays", "xray", "teleradiology") are listed explicitly per
+term and reported under it.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# A term must not touch a letter or digit on either side. Underscores and
+# punctuation count as separators so "radiology_report" still hits "radiology".
+_LEFT_BOUNDARY = r"(?<![^\W_])"
+_RIGHT_BOUNDARY = r"(?![^\W_])"
+# Hyphens and dashes NFKC leaves alone ("X\u2011ray") all match "-"
+_DASHES = str.maketrans({char: "-" for char in "\u2010\u2011\u2012\u2013\u2014\u2015\u2212"})
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for matching (NFKC + case folding, dashes to "-")."""
+    return unicodedata.normalize("NFKC", text).casefold().translate(_DASHES)
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Normalize ``text`` and map every normalized character back to its raw offset.
+    
+    Each base character is normalized together with the combining marks that
+    follow it, so ``offsets[i]`` is the raw index of the cluster that produced
+    normalized character ``i`` ("\ufb01" -> "fi" maps both characters to the
+    ligature). ``offsets`` has one extra entry, ``len(text)``.
+    """
+    normalized: List[str] = []
+    offsets: List[int] = []
+    start = 0
+    for index in range(1, len(text) + 1):
+        if index < len(text) and unicodedata.combining(text[index]):
+            continue
+        piece = normalize_text(text[start:index])
+        normalized.append(piece)
+        offsets.extend([start] * len(piece))
+        start = index
+    offsets.append(len(text))
+    return "".join(normalized), offsets
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Build a regex that matches any of ``terms`` using shared prefixes."""
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def render(node: Dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+    
+    return render(trie)
+
+
+class ContentScanner:
+    """Single-pass matcher for a fixed dictionary of disallowed terms.
+    
+    ``forms`` maps a pattern to the other words that count as it (plurals,
+    derived words, variant spellings, compounds).
+    """
+    
+    def __init__(self, patterns: Iterable[str], forms: Optional[Dict[str, Iterable[str]]] = None):
+        # Map normalized term or form -> original pattern for reporting
+        self.terms: Dict[str, str] = {}
+        forms = forms or {}
+        for pattern in patterns:
+            for term in (pattern, *forms.get(pattern, ())):
+                normalized = normalize_text(term).strip()
+                if normalized:
+                    self.terms.setdefault(normalized, pattern)
+        
+        self.max_term_length = max((len(term) for term in self.terms), default=0)
+        self._regex: Optional[re.Pattern] = None
+        if self.terms:
+            self._regex = re.compile(_LEFT_BOUNDARY + "(" + _trie_pattern(self.terms) + ")" + _RIGHT_BOUNDARY)
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+    
+    def finditer(self, normalized_text: str, pos: int = 0) -> Iterator[Tuple[str, int, int]]:
+        """Yield (pattern, start, end) for every match in already-normalized text."""
+        if self._regex is None:
+            return
+        for match in self._regex.finditer(normalized_text, pos):
+            yield self.terms[match.group(1)], match.start(), match.end()
+    
+    def search(self, content: str) -> Optional[Tuple[str, int, int]]:
+        """Return the first (pattern, start, end) match in ``content``, if any."""
+        return next(self.finditer(normalize_text(content)), None)
+    
+    def find_all(self, content: str) -> List[str]:
+        """Return all distinct patterns found in ``content``, in order of appearance."""
+        found = (pattern for pattern, _, _ in self.finditer(normalize_text(content)))
+        return list(dict.fromkeys(found))
+
+
+class IncrementalScanner:
+    """Sliding-window wrapper around ContentScanner for streamed text.
+    
+    Text is released only once it can no longer be part of a match, so a
+    disallowed term split across chunks is caught before any of it is emitted.
+    """
+    
+    def __init__(self, scanner: ContentScanner):
+        self.scanner = scanner
+        # Longest term + one lookahead character, with some slack
+        self.window = scanner.max_term_length + 3
+        self.pending = ""  # Raw text not yet released
+        self.context = ""  # Last released character, for the left word boundary
+        self.released = 0  # Number of raw characters released so far
+    
+    def _scan(self, final: bool) -> Optional[Tuple[str, int]]:
+        """First settled match as (pattern, offset into the raw streamed text)."""
+        text, offsets = normalize_with_offsets(self.context + self.pending)
+        # Skip what the released context normalized to (it may have absorbed leading combining marks)
+        skip = bisect_left(offsets, len(self.context))
+        for pattern, start, end in self.scanner.finditer(text, skip):
+            # A match touching the end of the window may still grow or lose its boundary;
+            # wait for more text rather than report a later match first
+            if final or end < len(text):
+                return pattern, self.released + offsets[start] - len(self.context)
+            return None
+        return None
+    
+    def _release(self, count: int) -> str:
+        safe, self.pending = self.pending[:count], self.pending[count:]
+        if safe:
+            self.context = safe[-1]
+            self.released += len(safe)
+        return safe
+    
+    def feed(self, chunk: str) -> Tuple[str, Optional[Tuple[str, int]]]:
+        """Add a chunk; return (text safe to emit, (pattern, offset) if a violation was found)."""
+        self.pending += chunk
+        violation = self._scan(final=False)
+        if violation:
+            return "", violation
+        return self._release(max(0, len(self.pending) - self.window)), None
+    
+    def finish(self) -> Tuple[str, Optional[Tuple[str, int]]]:
+        """Flush the remaining window at end of stream."""
+        violation = self._scan(final=True)
+        if violation:
+            return "", violation
+        return self._release(len(self.pending)), None
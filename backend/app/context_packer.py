@@ -0,0 +1,126 @@
+"""Token-budgeted packing of memory context into the prompt."""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models import Memory
+
+# Words and individual punctuation marks; long words count as several tokens
+_TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_CHARS_PER_WORD_TOKEN = 4
+# Don't bother keeping a truncated memory smaller than this
+_MIN_TRUNCATED_TOKENS = 16
+_TRUNCATION_MARK = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate BPE token count locally (no tokenizer download needed)."""
+    return sum(
+        max(1, -(-len(piece) // _CHARS_PER_WORD_TOKEN))
+        for piece in _TOKEN_PIECE_RE.findall(text)
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text at a piece boundary so its estimate fits ``max_tokens``."""
+    used = 0
+    for match in _TOKEN_PIECE_RE.finditer(text):
+        used += max(1, -(-len(match.group()) // _CHARS_PER_WORD_TOKEN))
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def resolve_token_budget(provider: str, zone: str) -> int:
+    """Prompt token budget: "provider:zone" > "zone" > "provider" > default."""
+    budgets = settings.prompt_token_budgets
+    for key in (f"{provider}:{zone}", zone, provider):
+        if key in budgets:
+            return budgets[key]
+    return settings.prompt_token_budget
+
+
+@dataclass
+class PackedContext:
+    """Result of packing memories into a token budget."""
+    context: str
+    packed: List[Memory] = field(default_factory=list)
+    dropped: List[Memory] = field(default_factory=list)
+    truncated_ids: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    budget: int = 0
+
+
+class ContextPacker:
+    """Greedy packer ordering memories by relevance, tag weight and recency."""
+    
+    def __init__(
+        self,
+        format_memory: Callable[[Memory, Optional[str]], str],
+        empty_context: str
+    ):
+        self.format_memory = format_memory
+        self.empty_context = empty_context
+    
+    @staticmethod
+    def _tag_weight(memory: Memory) -> float:
+        weights = settings.context_tag_weights
+        return max((weights.get(tag, 0.0) for tag in memory.get_tags()), default=0.0)
+    
+    def prioritize(self, ranked: List[Tuple[Memory, float]]) -> List[Memory]:
+        """Order memories by a weighted blend of normalized priority signals."""
+        if not ranked:
+            return []
+        # Scores can be negative (cosine similarity); scale them into [-1, 1]
+        max_score = max(abs(score) for _, score in ranked) or 1.0
+        max_tag = max(self._tag_weight(memory) for memory, _ in ranked) or 1.0
+        timestamps = [memory.created_at or datetime.min for memory, _ in ranked]
+        oldest, newest = min(timestamps), max(timestamps)
+        span = (newest - oldest).total_seconds() or 1.0
+        
+        def priority(item: Tuple[Memory, float]) -> float:
+            memory, score = item
+            recency = ((memory.created_at or oldest) - oldest).total_seconds() / span
+            return (
+                settings.context_weight_relevance * score / max_score
+                + settings.context_weight_tags * self._tag_weight(memory) / max_tag
+                + settings.context_weight_recency * recency
+            )
+        
+        return [memory for memory, _ in sorted(ranked, key=priority, reverse=True)]
+    
+    def pack(self, ranked: List[Tuple[Memory, float]], budget: int) -> PackedContext:
+        """Fit memories into ``budget`` tokens, truncating or dropping the rest."""
+        result = PackedContext(context=self.empty_context, budget=budget)
+        lines = []
+        remaining = budget
+        
+        for memory in self.prioritize(ranked):
+            line = self.format_memory(memory, None)
+            cost = estimate_tokens(line) + 1  # newline
+            if cost <= remaining:
+                lines.append(line)
+                result.packed.append(memory)
+                remaining -= cost
+                continue
+            
+            # Truncate the content to whatever room is left, if worthwhile
+            overhead = estimate_tokens(self.format_memory(memory, _TRUNCATION_MARK)) + 1
+            room = remaining - overhead
+            if room >= _MIN_TRUNCATED_TOKENS:
+                content = truncate_to_tokens(memory.content, room) + _TRUNCATION_MARK
+                line = self.format_memory(memory, content)
+                lines.append(line)
+                result.packed.append(memory)
+                result.truncated_ids.append(str(memory.id))
+                remaining -= estimate_tokens(line) + 1
+            else:
+                result.dropped.append(memory)
+        
+        if lines:
+            result.context = "\n".join(lines)
+        result.tokens_used = budget - remaining
+        return result
@@ -1,19 +1,203 @@
 """Database setup and session management."""
 
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import delete, event, inspect, literal, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from app.config import settings
+from typing import Callable, Dict, List, Optional, Tuple
 
-# Create engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    echo=False  # Set to True for SQL debugging
-)
+# Async drivers used for the non-blocking request path
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Map a sync database URL to its async driver equivalent."""
+    scheme, separator, rest = database_url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}{separator}{rest}"
+
+
+# Storage profiles (settings.storage_profile):
+# - default: bare engines, driver defaults
+# - sqlite_wal: WAL journal, synchronous=NORMAL, busy timeout, mmap and a
+#   separate query_only connection pool for read endpoints
+# - postgres: sized connection pools with pre-ping and recycling
+STORAGE_PROFILES = ("default", "sqlite_wal", "postgres")
+
+
+def _pool_options() -> Dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def _sqlite_pragmas(read_only: bool = False) -> List[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size = -{settings.sqlite_cache_size_kib}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _on_connect(pragmas: List[str]) -> Callable:
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return apply
+
+
+def create_engines(database_url: Optional[str] = None, profile: Optional[str] = None) -> Tuple:
+    """Build (engine, async_engine, read_engine) for a database URL and storage profile.
+    
+    ``read_engine`` is the same object as ``engine`` unless the profile has a
+    separate read pool.
+    """
+    database_url = database_url or settings.database_url
+    profile = (profile or settings.storage_profile).lower()
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile}'. Options: {', '.join(STORAGE_PROFILES)}")
+    dialect = database_url.split(":", 1)[0].split("+", 1)[0]
+    if profile == "sqlite_wal" and dialect != "sqlite":
+        raise ValueError("The sqlite_wal storage profile needs a sqlite:// database URL")
+    if profile == "postgres" and dialect != "postgresql":
+        raise ValueError("The postgres storage profile needs a postgresql:// database URL")
+    in_memory = dialect == "sqlite" and (database_url.rstrip("/").endswith(":") or ":memory:" in database_url)
+    
+    connect_args = {"check_same_thread": False} if dialect == "sqlite" else {}
+    options, async_options = {}, {}
+    if profile == "postgres":
+        options = async_options = {**_pool_options(), "pool_pre_ping": settings.db_pool_pre_ping}
+    elif profile == "sqlite_wal":
+        connect_args["timeout"] = settings.sqlite_busy_timeout_ms / 1000
+        if not in_memory:
+            options = async_options = _pool_options()
+    
+    sync_engine = create_engine(
+        database_url,
+        connect_args=connect_args,
+        echo=False,  # Set to True for SQL debugging
+        **options
+    )
+    # Async engine for endpoints that await the LLM (e.g. /ask)
+    async_db_engine = create_async_engine(get_async_database_url(database_url), echo=False, **async_options)
+    read_engine = sync_engine
+    
+    if profile == "sqlite_wal":
+        event.listen(sync_engine, "connect", _on_connect(_sqlite_pragmas()))
+        event.listen(async_db_engine.sync_engine, "connect", _on_connect(_sqlite_pragmas()))
+    if profile == "sqlite_wal" and not in_memory:
+        read_engine = create_engine(
+            database_url,
+            connect_args=connect_args,
+            echo=False,
+            pool_size=settings.sqlite_read_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+        event.listen(read_engine, "connect", _on_connect(_sqlite_pragmas(read_only=True)))
+    
+    return sync_engine, async_db_engine, read_engine
+
+
+# Create engines
+engine, async_engine, read_engine = create_engines()
+
+
+def _add_missing_columns():
+    """Add columns introduced after a table was first created (no migration tool in MVP)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.default is not None and column.default.is_scalar:
+                    default = literal(column.default.arg).compile(
+                        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+
+
+def _add_missing_indexes():
+    """Create indexes introduced after a table was first created."""
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def backfill_memory_tags(batch_size: int = 5000) -> int:
+    """Rebuild memorytag rows from the JSON ``Memory.tags`` column. Safe to run more than once."""
+    from app.models import Memory, MemoryTag
+    tag_table = MemoryTag.__table__
+    migrated = 0
+    
+    with Session(engine) as session:
+        session.execute(delete(tag_table))
+        
+        statement = select(Memory.id, Memory.zone, Memory.tags).execution_options(yield_per=batch_size)
+        rows = []
+        for memory_id, zone, tags in session.execute(statement):
+            memory = Memory(id=memory_id, zone=zone, tags=tags, content="", content_hash="")
+            rows.extend(
+                {"memory_id": row.memory_id, "zone": row.zone, "tag": row.tag}
+                for row in memory.build_tag_rows()
+            )
+            migrated += 1
+            if len(rows) >= batch_size:
+                session.execute(tag_table.insert(), rows)
+                rows = []
+        if rows:
+            session.execute(tag_table.insert(), rows)
+        
+        session.commit()
+    
+    return migrated
+
+
+def _backfill_missing_memory_tags():
+    """Build the tag index of a database whose memories predate the memorytag table."""
+    from app.models import Memory, MemoryTag
+    with engine.connect() as conn:
+        if conn.execute(select(MemoryTag.__table__.c.memory_id).limit(1)).first() is not None:
+            return
+        tagged = conn.execute(
+            select(Memory.__table__.c.id).where(Memory.__table__.c.tags.not_in(["[]", ""])).limit(1)
+        ).first()
+    if tagged is None:
+        return
+    try:
+        backfill_memory_tags()
+    except IntegrityError:
+        pass  # Another worker starting at the same time backfilled it
 
 
 def init_db():
     """Initialize database tables."""
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+    _add_missing_indexes()
+    _backfill_missing_memory_tags()
 
 
 def get_session():
@@ -21,3 +205,14 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+
+def get_read_session():
+    """Get database session for read-only endpoints (separate pool in the sqlite_wal profile)."""
+    with Session(read_engine) as session:
+        yield session
+
+
+async def get_async_session():
+    """Get async database session."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,244 @@
+"""Cross-worker cache invalidation over a database change log.
+
+Every uvicorn worker keeps its own in-process caches (session state,
+responses, retrieval indexes), so a ``/revoke``, ``/redact_memory`` or
+``POST /memories`` handled by one worker must reach the others. No broker is
+needed: ``publish`` appends an ``InvalidationEvent`` row, preferably inside
+the transaction of the change it describes, and a background thread in each
+worker polls for rows with a ``version`` above the last one it applied every
+``invalidation_poll_interval_ms``. Propagation to other workers is therefore
+bounded by the poll interval plus one query.
+
+The publishing worker applies its own events synchronously (when the
+transaction commits, and once before that) and its poller skips them.
+Subscribers are ``callback(key, payload)`` functions registered per event
+kind; a ``reset`` callback clears the whole cache when a worker cannot be
+sure it saw every event (its poller stalled for longer than the retention
+window, after which old events are pruned, or the change log's highest
+version went backwards). Pruning always keeps the newest row, so versions
+keep increasing even on a change-log table created without AUTOINCREMENT.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import delete, event, func, insert, select
+
+from app.config import settings
+from app.database import engine
+from app.models import InvalidationEvent
+
+logger = logging.getLogger(__name__)
+
+SESSION = "session"  # key: session ID
+MEMORY = "memory"  # key: memory ID, payload: {"zone": ...}
+ZONE = "zone"  # key: zone whose memories changed
+RESET = "reset"  # Local only: drop everything
+
+Subscriber = Callable[[str, Dict], None]
+
+
+class InvalidationBus:
+    """Publishes invalidation events to the change log and applies everyone else's."""
+    
+    def __init__(self, bind=None):
+        self.engine = bind or engine
+        self.poll_interval = settings.invalidation_poll_interval_ms / 1000
+        self.retention = settings.invalidation_retention_seconds
+        self.lookback = settings.invalidation_lookback
+        self._token = uuid4().hex[:12]
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.version: Optional[int] = None  # Highest version applied
+        self._seen = deque(maxlen=max(64, self.lookback * 4))
+        self._seen_set = set()
+        self._last_poll = 0.0
+        self._last_prune = 0.0
+        self.stats = {"published": 0, "applied": 0, "resets": 0, "poll_errors": 0}
+    
+    @property
+    def origin(self) -> str:
+        """Identifies this worker process (re-derived after a fork)."""
+        return f"{os.getpid()}:{self._token}"
+    
+    # Subscribing and publishing
+    
+    def subscribe(self, kind: str, callback: Subscriber):
+        self._subscribers.setdefault(kind, []).append(callback)
+    
+    def publish(self, kind: str, key: str, payload: Optional[Dict] = None, db_session=None):
+        """Record an invalidation and apply it in this process.
+        
+        With ``db_session`` the event row joins that session's transaction and
+        is applied locally now and again after the commit, so a reader that
+        loaded pre-change data in between cannot leave it cached. Without one,
+        the row is committed on its own connection.
+        """
+        payload = payload or {}
+        values = {
+            "kind": kind,
+            "key": str(key),
+            "payload": json.dumps(payload),
+            "origin": self.origin,
+            "created_at": datetime.utcnow(),
+        }
+        self.stats["published"] += 1
+        if db_session is not None:
+            db_session.add(InvalidationEvent(**values))
+            self._dispatch(kind, str(key), payload)
+            event.listen(db_session, "after_commit", lambda _: self._dispatch(kind, str(key), payload), once=True)
+            return
+        with self.engine.begin() as conn:
+            conn.execute(insert(InvalidationEvent.__table__).values(**values))
+        self._dispatch(kind, str(key), payload)
+    
+    def publish_many(self, kind: str, events: List[Tuple[str, Dict]], db_session):
+        """Publish ``(key, payload)`` events of one kind inside ``db_session``'s transaction.
+        
+        Same semantics as ``publish`` with a session, with one batched insert
+        and one commit hook for all of them.
+        """
+        if not events:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "kind": kind,
+                "key": str(key),
+                "payload": json.dumps(payload),
+                "origin": self.origin,
+                "created_at": now,
+            }
+            for key, payload in events
+        ]
+        self.stats["published"] += len(rows)
+        db_session.connection().execute(insert(InvalidationEvent.__table__), rows)
+        
+        def apply(_=None):
+            for key, payload in events:
+                self._dispatch(kind, str(key), payload)
+        
+        apply()
+        event.listen(db_session, "after_commit", apply, once=True)
+    
+    def _dispatch(self, kind: str, key: str, payload: Dict):
+        for callback in self._subscribers.get(kind, []):
+            try:
+                callback(key, payload)
+            except Exception:
+                logger.exception("Invalidation subscriber failed for %s %s", kind, key)
+    
+    def reset(self):
+        """Clear every subscribed cache."""
+        self.stats["resets"] += 1
+        self._dispatch(RESET, "", {})
+    
+    # Polling
+    
+    def start(self):
+        """Begin polling from the current end of the change log."""
+        if not settings.invalidation_bus_enabled or self._thread is not None:
+            return
+        table = InvalidationEvent.__table__
+        with self.engine.connect() as conn:
+            self.version = conn.execute(select(func.max(table.c.version))).scalar() or 0
+            # Events already in the log are not replayed by the first polls' lookback
+            for (version,) in conn.execute(select(table.c.version).where(table.c.version > self.version - self.lookback)):
+                self._seen.append(version)
+                self._seen_set.add(version)
+        self._last_poll = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception:
+                self.stats["poll_errors"] += 1
+                logger.exception("Invalidation bus poll failed")
+    
+    def poll(self) -> int:
+        """Apply events published by other workers since the last poll; returns how many."""
+        if self.version is None:
+            self.version = 0
+        now = time.monotonic()
+        if now - self._last_poll > self.retention:
+            # Events this worker never read may have been pruned already
+            self.reset()
+        
+        table = InvalidationEvent.__table__
+        # Re-read a few versions below the high-water mark: on databases where
+        # concurrent transactions can commit out of version order a lower
+        # version may become visible after a higher one was applied
+        with self.engine.connect() as conn:
+            head = conn.execute(select(func.max(table.c.version))).scalar() or 0
+            if head < self.version:
+                # The log was recreated or emptied: versions restarted below ours
+                logger.warning("Invalidation log version went back from %s to %s", self.version, head)
+                self.reset()
+                self.version = head
+                self._seen.clear()
+                self._seen_set.clear()
+            floor = max(0, self.version - self.lookback)
+            rows = conn.execute(
+                select(table.c.version, table.c.kind, table.c.key, table.c.payload, table.c.origin)
+                .where(table.c.version > floor)
+                .order_by(table.c.version)
+            ).all()
+        self._last_poll = now
+        
+        applied = 0
+        origin = self.origin
+        for version, kind, key, payload, event_origin in rows:
+            if version in self._seen_set:
+                continue
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_set.discard(self._seen[0])
+            self._seen.append(version)
+            self._seen_set.add(version)
+            self.version = max(self.version, version)
+            if event_origin == origin:
+                continue
+            self._dispatch(kind, key, json.loads(payload or "{}"))
+            applied += 1
+        self.stats["applied"] += applied
+        
+        if now - self._last_prune > self.retention / 10:
+            self._prune()
+            self._last_prune = now
+        return applied
+    
+    def _prune(self):
+        """Delete events older than the retention window (any worker may do this).
+        
+        The newest row is kept so an emptied table cannot hand out versions again.
+        """
+        table = InvalidationEvent.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(table).where(
+                    table.c.created_at < cutoff,
+                    table.c.version < select(func.max(table.c.version)).scalar_subquery()
+                )
+            )
+
+
+invalidation_bus = InvalidationBus()
@@ -4,10 +4,17 @@ This module implements the Cognitive Control Plane that enforces
 zone-based access control, policy enforcement, and reasoning isolation.
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
 from sqlmodel import Session, select
-from app.models import Memory, Session as SessionModel, Audit, TrustScore
+from app.models import Memory, MemoryTag, Session as SessionModel, Audit, TrustScore
 from app.config import settings
+from app.content_scanner import ContentScanner
+from app.audit_writer import audit_writer
+from app.metrics import session_revocations, zone_label
+from app.session_cache import SessionState, session_cache
+from app.invalidation_bus import MEMORY, SESSION, invalidation_bus
+from app.audit_chain import append_to_chain, compute_provenance_hash
 import hashlib
 import json
 from datetime import datetime
@@ -34,6 +41,21 @@ class LCACPolicy:
         "insurance_claim",
     ]
     
+    # Other words that count as a disallowed pattern: inflections, spelling
+    # variants and compounds. Patterns match whole words only, so anything
+    # not listed here (or in the patterns file) is not a violation.
+    PATTERN_FORMS: Dict[str, List[str]] = {
+        "radiology": [
+            "radiologies", "radiologic", "radiological", "radiologically",
+            "radiologist", "radiologists", "teleradiology", "neuroradiology",
+            "neuroradiologist", "neuroradiologists",
+        ],
+        "x-ray": ["x-rays", "x-rayed", "x-raying", "xray", "xrays", "xrayed", "x ray", "x rays"],
+        "imaging": ["neuroimaging", "teleimaging"],
+        "billing_code": ["billing_codes"],
+        "insurance_claim": ["insurance_claims"],
+    }
+    
     @classmethod
     def get_allowed_tags(cls, zone: str) -> List[str]:
         """Get allowed tags for a zone."""
@@ -45,45 +67,133 @@ class LCACPolicy:
         allowed_tags = cls.get_allowed_tags(zone)
         return tag in allowed_tags
     
+    # Compiled per-zone scanners, rebuilt whenever the patterns change
+    _zone_scanners: Dict[str, ContentScanner] = {}
+    _unknown_zone_scanner: Optional[ContentScanner] = None
+    
+    @classmethod
+    def _denied_patterns(cls, zone: str) -> List[str]:
+        """Patterns that count as violations in a zone (not covered by an allowed tag)."""
+        allowed_tags = cls.get_allowed_tags(zone)
+        return [
+            pattern for pattern in cls.DISALLOWED_PATTERNS
+            if not any(pattern.lower() in tag for tag in allowed_tags)
+        ]
+    
+    @classmethod
+    def compile_scanners(cls):
+        """Precompute the allow/deny decision and compiled scanner for every zone."""
+        cls._zone_scanners = {
+            zone: ContentScanner(cls._denied_patterns(zone), cls.PATTERN_FORMS)
+            for zone in cls.ZONE_POLICIES
+        }
+        cls._unknown_zone_scanner = ContentScanner(cls.DISALLOWED_PATTERNS, cls.PATTERN_FORMS)
+    
+    @classmethod
+    def load_disallowed_patterns(
+        cls,
+        patterns: Iterable[str],
+        replace: bool = False,
+        forms: Optional[Dict[str, List[str]]] = None
+    ):
+        """Add (or replace) disallowed patterns and their forms, and recompile the zone scanners."""
+        patterns = [p.strip() for p in patterns if p.strip()]
+        base = [] if replace else cls.DISALLOWED_PATTERNS
+        cls.DISALLOWED_PATTERNS = list(dict.fromkeys(base + patterns))
+        merged = {} if replace else {pattern: list(words) for pattern, words in cls.PATTERN_FORMS.items()}
+        for pattern, words in (forms or {}).items():
+            merged[pattern] = list(dict.fromkeys(merged.get(pattern, []) + words))
+        cls.PATTERN_FORMS = merged
+        cls.compile_scanners()
+    
+    @classmethod
+    def load_disallowed_patterns_file(cls, path: str, replace: bool = False):
+        """Load disallowed patterns from a file with one term per line ('#' for comments).
+        
+        A line may list the term's other forms after a colon:
+        ``radiology: radiologist, radiologists, teleradiology``.
+        """
+        patterns: List[str] = []
+        forms: Dict[str, List[str]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.lstrip().startswith("#"):
+                    continue
+                pattern, _, words = line.partition(":")
+                pattern = pattern.strip()
+                if pattern:
+                    patterns.append(pattern)
+                    forms.setdefault(pattern, []).extend(w.strip() for w in words.split(",") if w.strip())
+        cls.load_disallowed_patterns(patterns, replace=replace, forms=forms)
+    
+    @classmethod
+    def get_content_scanner(cls, zone: str) -> ContentScanner:
+        """Get the compiled content scanner for a zone."""
+        if cls._unknown_zone_scanner is None:
+            cls.compile_scanners()
+        return cls._zone_scanners.get(zone, cls._unknown_zone_scanner)
+    
     @classmethod
     def check_content_violation(cls, zone: str, content: str) -> Tuple[bool, Optional[str]]:
         """Check if content violates zone policy."""
-        content_lower = content.lower()
-        for pattern in cls.DISALLOWED_PATTERNS:
-            if pattern in content_lower:
-                # Check if this pattern is actually allowed in the zone
-                if not any(pattern in tag for tag in cls.get_allowed_tags(zone)):
-                    return True, f"Content contains disallowed pattern: {pattern}"
+        match = cls.get_content_scanner(zone).search(content)
+        if match:
+            return True, f"Content contains disallowed pattern: {match[0]}"
         return False, None
 
 
+if settings.lcac_disallowed_patterns_file:
+    LCACPolicy.load_disallowed_patterns_file(settings.lcac_disallowed_patterns_file)
+else:
+    LCACPolicy.compile_scanners()
+
+
 class LCACEngine:
     """LCAC engine for enforcing cognitive access control."""
     
+    # Maximum number of IDs bound into one IN (...) lookup
+    MEMORY_LOOKUP_BATCH = 500
+    
     def __init__(self, db_session: Session):
         self.db_session = db_session
         self.policy = LCACPolicy()
     
+    def get_session_state(self, session_id) -> Optional[SessionState]:
+        """Zone, user and revocation state of a session, or None if it does not exist.
+        
+        Served from ``session_cache`` when enabled; only a miss reads the row.
+        """
+        if not settings.session_cache_enabled:
+            session = self.db_session.get(SessionModel, session_id)
+            return SessionState.from_session(session) if session else None
+        
+        state = session_cache.get(session_id)
+        if state is None:
+            generation = session_cache.generation
+            session = self.db_session.get(SessionModel, session_id)
+            if session is None:
+                return None
+            state = SessionState.from_session(session)
+            session_cache.put(session_id, state, generation)
+        return state
+    
     def get_allowed_memories(self, zone: str, user_id: Optional[str] = None) -> List[Memory]:
         """Get memories allowed for a zone based on LCAC policy."""
         allowed_tags = self.policy.get_allowed_tags(zone)
+        if not allowed_tags:
+            return []
         
-        # Query memories in the zone with allowed tags
+        # Zone + tag filtering is resolved by the memorytag index
+        tagged_memory_ids = select(MemoryTag.memory_id).where(
+            MemoryTag.zone == zone,
+            MemoryTag.tag.in_(allowed_tags)
+        )
         statement = select(Memory).where(
             Memory.zone == zone,
-            Memory.redacted == False
+            Memory.redacted == False,
+            Memory.id.in_(tagged_memory_ids)
         )
-        memories = self.db_session.exec(statement).all()
-        
-        # Filter by allowed tags
-        filtered_memories = []
-        for memory in memories:
-            memory_tags = memory.get_tags()
-            # Check if any memory tag is in allowed tags
-            if any(tag in allowed_tags for tag in memory_tags):
-                filtered_memories.append(memory)
-        
-        return filtered_memories
+        return list(self.db_session.exec(statement).all())
     
     def filter_memories_by_tags(self, memories: List[Memory], zone: str) -> List[Memory]:
         """Filter memories to only include those with allowed tags for the zone."""
@@ -116,21 +226,35 @@ class LCACEngine:
         
         return True, None
     
-    def validate_inference(self, zone: str, prompt: str, response: str, used_memory_ids: List[str]) -> Tuple[bool, Optional[str]]:
-        """Validate inference for policy violations."""
-        # Check response for disallowed patterns
-        violation, reason = self.policy.check_content_violation(zone, response)
-        if violation:
-            return False, reason
+    def validate_memory_access(
+        self,
+        zone: str,
+        used_memory_ids: List[str],
+        memories: Optional[Iterable[Memory]] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Check every used memory against the zone policy in one pass.
         
-        # Check if any used memories are from different zones
+        ``memories`` are rows the caller already loaded (e.g. by the pre-inference
+        hook); any other IDs are fetched with one ``IN (...)`` query per batch.
+        """
         from uuid import UUID
+        loaded = {str(memory.id): memory for memory in memories or []}
+        missing = []
         for memory_id in used_memory_ids:
+            if str(memory_id) in loaded:
+                continue
             try:
-                memory_uuid = UUID(memory_id) if isinstance(memory_id, str) else memory_id
+                missing.append(UUID(memory_id) if isinstance(memory_id, str) else memory_id)
             except (ValueError, TypeError):
                 return False, f"Invalid memory ID format: {memory_id}"
-            memory = self.db_session.get(Memory, memory_uuid)
+        
+        for start in range(0, len(missing), self.MEMORY_LOOKUP_BATCH):
+            chunk = missing[start:start + self.MEMORY_LOOKUP_BATCH]
+            for memory in self.db_session.exec(select(Memory).where(Memory.id.in_(chunk))):
+                loaded[str(memory.id)] = memory
+        
+        for memory_id in used_memory_ids:
+            memory = loaded.get(str(memory_id))
             if memory:
                 allowed, reason = self.check_memory_access(zone, memory)
                 if not allowed:
@@ -138,6 +262,23 @@ class LCACEngine:
         
         return True, None
     
+    def validate_inference(
+        self,
+        zone: str,
+        prompt: str,
+        response: str,
+        used_memory_ids: List[str],
+        memories: Optional[Iterable[Memory]] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Validate inference for policy violations."""
+        # Check response for disallowed patterns
+        violation, reason = self.policy.check_content_violation(zone, response)
+        if violation:
+            return False, reason
+        
+        # Check if any used memories are from different zones
+        return self.validate_memory_access(zone, used_memory_ids, memories)
+    
     def create_audit_record(
         self,
         session_id: str,
@@ -145,38 +286,52 @@ class LCACEngine:
         response: str,
         used_memory_ids: List[str],
         policy_violation: bool = False,
-        violation_reason: Optional[str] = None
+        violation_reason: Optional[str] = None,
+        violation_offset: Optional[int] = None,
+        dropped_memory_ids: Optional[List[str]] = None,
+        cached: bool = False,
+        commit: bool = True,
+        atomic: bool = False
     ) -> Audit:
-        """Create an audit record for an inference event."""
+        """Create an audit record for an inference event.
+        
+        With ``commit=False`` the row is only added to the session so the caller
+        can commit it together with other LCAC side effects. In ``write_behind``
+        mode the row is handed to the audit writer instead and commits
+        separately, so it is not part of that transaction; pass ``atomic=True``
+        when the audit row must commit (or roll back) with the caller's changes,
+        e.g. with a revocation, to always write it in the caller's session.
+        """
         from uuid import UUID
         try:
             session_uuid = UUID(session_id) if isinstance(session_id, str) else session_id
         except (ValueError, TypeError):
             raise ValueError(f"Invalid session ID format: {session_id}")
-        # Create provenance hash
-        provenance_data = {
-            "prompt": prompt,
-            "response": response,
-            "memory_ids": sorted(used_memory_ids),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        provenance_hash = hashlib.sha256(
-            json.dumps(provenance_data, sort_keys=True).encode()
-        ).hexdigest()
-        
         audit = Audit(
             session_id=session_uuid,
             prompt=prompt,
             response=response,
             used_memory_ids=json.dumps([str(mid) for mid in used_memory_ids]),
-            provenance_hash=provenance_hash,
+            dropped_memory_ids=json.dumps([str(mid) for mid in dropped_memory_ids or []]),
             policy_violation=policy_violation,
-            violation_reason=violation_reason
+            violation_reason=violation_reason,
+            violation_offset=violation_offset,
+            cached=cached
         )
+        # Provenance hash over the stored fields (including the timestamp) so it can be re-verified
+        audit.provenance_hash = compute_provenance_hash(audit)
         
+        if settings.audit_write_mode == "write_behind" and not atomic:
+            # ID and provenance hash are already set; the row is chained and committed in a later batch
+            audit_writer.submit(audit)
+            return audit
+        
+        # Link to the previous record; holds the chain head lock until the transaction commits
+        audit.sequence, audit.chain_hash = append_to_chain(self.db_session.connection(), [audit.provenance_hash])[0]
         self.db_session.add(audit)
-        self.db_session.commit()
-        self.db_session.refresh(audit)
+        if commit:
+            self.db_session.commit()
+            self.db_session.refresh(audit)
         
         return audit
     
@@ -194,15 +349,27 @@ class LCACEngine:
         if session.is_revoked():
             return True  # Already revoked
         
+        self.mark_session_revoked(session, reason)
+        self.db_session.commit()
+        
+        return True
+    
+    def mark_session_revoked(self, session: SessionModel, reason: Optional[str] = None):
+        """Stage the revocation of an already-loaded session without committing."""
+        if session.is_revoked():
+            return
+        
         session.revoked_at = datetime.utcnow()
         metadata = session.get_metadata()
         metadata["revocation_reason"] = reason or "Policy violation"
         session.set_metadata(metadata)
         
         self.db_session.add(session)
-        self.db_session.commit()
+        zone = zone_label(session.zone)
+        event.listen(self.db_session, "after_commit", lambda _: session_revocations.inc(zone), once=True)
         
-        return True
+        # Drops the cached state in every worker once the revocation commits
+        invalidation_bus.publish(SESSION, str(session.session_id), db_session=self.db_session)
     
     def redact_memory(self, memory_id: str, reason: Optional[str] = None) -> bool:
         """Redact a memory entry."""
@@ -228,6 +395,8 @@ class LCACEngine:
         ).hexdigest()
         
         self.db_session.add(memory)
+        # Retrieval indexes and cached responses of every worker drop the memory
+        invalidation_bus.publish(MEMORY, str(memory.id), {"zone": memory.zone}, db_session=self.db_session)
         self.db_session.commit()
         
         return True
@@ -0,0 +1,328 @@
+"""Process-wide registry of long-lived LLM clients.
+
+Orchestrators are created per request, and building a LangChain chat model per
+request also built a fresh HTTP connection pool, so every call paid a new TCP
+and TLS handshake. The registry builds one client per provider/model the first
+time it is needed (at startup for the configured provider) and every
+orchestrator borrows that same instance.
+
+OpenAI clients share a sync and an async ``httpx`` client whose keep-alive
+pools are sized by the ``llm_http_*`` settings, overridable per provider or per
+``provider:model`` through ``llm_http_pools``. Gemini clients talk gRPC through
+their own channel, which is kept warm the same way but has no pool to tune.
+The ``local-stub`` provider (``app.llm_stub``) needs neither.
+
+Only successfully built clients are kept. A failed build (missing key, package
+or a provider error) is retried on a later ``get``, waiting twice as long
+after each consecutive failure, from ``RETRY_BACKOFF_MIN`` up to
+``RETRY_BACKOFF_MAX`` seconds; requests in between get no client.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    from langchain_openai import ChatOpenAI
+except ImportError:
+    ChatOpenAI = None
+
+try:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+except ImportError:
+    ChatGoogleGenerativeAI = None
+
+from app.config import settings
+from app.llm_stub import LocalStubChatModel
+
+# Seconds before rebuilding a client whose last build failed; doubles per failure
+RETRY_BACKOFF_MIN = 1.0
+RETRY_BACKOFF_MAX = 60.0
+
+
+def resolve_pool_limits(provider: str, model: str) -> Dict[str, float]:
+    """Pool limits for a provider/model: defaults, then provider, then provider:model overrides."""
+    limits = {
+        "max_connections": settings.llm_http_max_connections,
+        "max_keepalive_connections": settings.llm_http_max_keepalive_connections,
+        "keepalive_expiry": settings.llm_http_keepalive_expiry,
+        "timeout": settings.llm_http_timeout,
+    }
+    for key in (provider, f"{provider}:{model}"):
+        limits.update(settings.llm_http_pools.get(key, {}))
+    return limits
+
+
+def _pool_state(client: httpx.Client) -> Dict[str, int]:
+    """Open/idle connection counts read from the client's httpcore pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class PooledHTTPClients:
+    """Shared sync/async httpx clients for one provider/model, with request counters."""
+    
+    def __init__(self, limits: Dict[str, float]):
+        self.limits = dict(limits)
+        pool_limits = httpx.Limits(
+            max_connections=int(limits["max_connections"]),
+            max_keepalive_connections=int(limits["max_keepalive_connections"]),
+            keepalive_expiry=float(limits["keepalive_expiry"]),
+        )
+        timeout = httpx.Timeout(float(limits["timeout"]))
+        self.stats = {"requests": 0, "responses": 0, "errors": 0}
+        self.client = httpx.Client(
+            limits=pool_limits,
+            timeout=timeout,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+        self.async_client = httpx.AsyncClient(
+            limits=pool_limits,
+            timeout=timeout,
+            event_hooks={"request": [self._aon_request], "response": [self._aon_response]},
+        )
+    
+    def _on_request(self, request: httpx.Request):
+        self.stats["requests"] += 1
+    
+    def _on_response(self, response: httpx.Response):
+        self.stats["responses"] += 1
+        if response.status_code >= 400:
+            self.stats["errors"] += 1
+    
+    async def _aon_request(self, request: httpx.Request):
+        self._on_request(request)
+    
+    async def _aon_response(self, response: httpx.Response):
+        self._on_response(response)
+    
+    def pool_stats(self) -> Dict:
+        return {
+            "limits": self.limits,
+            **self.stats,
+            "sync_pool": _pool_state(self.client),
+            "async_pool": _pool_state(self.async_client),
+        }
+    
+    async def aclose(self):
+        self.client.close()
+        await self.async_client.aclose()
+
+
+def _build_openai(model: str, http: Optional[PooledHTTPClients]):
+    """Build a ChatOpenAI client on the shared httpx pools."""
+    if not settings.openai_api_key:
+        print("Warning: OpenAI API key not set. Set OPENAI_API_KEY environment variable.")
+        return None
+    
+    if ChatOpenAI is None:
+        print("Warning: langchain-openai not installed. Install with: pip install langchain-openai")
+        return None
+    
+    try:
+        return ChatOpenAI(
+            model=model,
+            temperature=settings.openai_temperature,
+            max_tokens=settings.openai_max_tokens,
+            openai_api_key=settings.openai_api_key,
+            http_client=http.client,
+            http_async_client=http.async_client
+        )
+    except Exception as e:
+        print(f"Warning: Failed to initialize OpenAI LLM: {e}")
+        return None
+
+
+def _build_gemini(model: str, http: Optional[PooledHTTPClients]):
+    """Build a ChatGoogleGenerativeAI client (gRPC; no httpx pool)."""
+    # Check for API key in settings or environment (GOOGLE_API_KEY is the standard env var)
+    api_key = settings.gemini_api_key or settings.google_api_key or os.getenv("GOOGLE_API_KEY")
+    
+    if not api_key:
+        print("Warning: Gemini API key not set. Set GEMINI_API_KEY, GOOGLE_API_KEY, or google_api_key environment variable.")
+        return None
+    
+    if ChatGoogleGenerativeAI is None:
+        print("Warning: langchain-google-genai not installed. Install with: pip install langchain-google-genai")
+        return None
+    
+    try:
+        # ChatGoogleGenerativeAI reads from GOOGLE_API_KEY env var by default
+        # If we have it in settings, set it as env var so LangChain can pick it up
+        if (settings.gemini_api_key or settings.google_api_key) and not os.getenv("GOOGLE_API_KEY"):
+            os.environ["GOOGLE_API_KEY"] = settings.gemini_api_key or settings.google_api_key
+        
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=settings.gemini_temperature,
+            max_output_tokens=settings.gemini_max_tokens
+        )
+    except Exception as e:
+        print(f"Warning: Failed to initialize Gemini LLM: {e}")
+        return None
+
+
+def _build_local_stub(model: str, http: Optional[PooledHTTPClients]):
+    """Build the deterministic offline model from the llm_stub_* settings."""
+    try:
+        return LocalStubChatModel(
+            model_name=model,
+            seed=settings.llm_stub_seed,
+            latency_distribution=settings.llm_stub_latency_distribution.lower(),
+            latency_ms=settings.llm_stub_latency_ms,
+            latency_jitter_ms=settings.llm_stub_latency_jitter_ms,
+            tokens_per_second=settings.llm_stub_tokens_per_second,
+            response_tokens=settings.llm_stub_response_tokens,
+            error_rate=settings.llm_stub_error_rate,
+            violation_rate=settings.llm_stub_violation_rate,
+            violation_text=settings.llm_stub_violation_text
+        )
+    except Exception as e:
+        print(f"Warning: Failed to initialize local-stub LLM: {e}")
+        return None
+
+
+# provider -> (client builder, settings attribute naming the default model, uses shared httpx pools)
+PROVIDERS: Dict[str, Tuple[Callable, str, bool]] = {
+    "openai": (_build_openai, "openai_model", True),
+    "gemini": (_build_gemini, "gemini_model", False),
+    "local-stub": (_build_local_stub, "llm_stub_model", False),
+}
+
+
+# provider -> what to check when its client cannot be built
+SETUP_HINTS: Dict[str, str] = {
+    "openai": "Please set OPENAI_API_KEY environment variable and install langchain-openai.",
+    "gemini": "Please set GEMINI_API_KEY or GOOGLE_API_KEY environment variable and install langchain-google-genai.",
+    "local-stub": "Please check the LLM_STUB_* settings.",
+}
+
+
+def register_provider(
+    name: str,
+    builder: Callable,
+    model_setting: str,
+    pooled: bool = False,
+    setup_hint: Optional[str] = None
+):
+    """Register an LLM client builder ``builder(model, http_clients)`` under a provider name."""
+    PROVIDERS[name] = (builder, model_setting, pooled)
+    if setup_hint:
+        SETUP_HINTS[name] = setup_hint
+
+
+class LLMRegistry:
+    """Builds each provider/model client once and lends it to every orchestrator."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], object] = {}
+        self._http: Dict[Tuple[str, str], PooledHTTPClients] = {}
+        self._borrows: Dict[Tuple[str, str], int] = {}
+        self._created_at: Dict[Tuple[str, str], float] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}  # Consecutive failed builds
+        self._retry_at: Dict[Tuple[str, str], float] = {}  # time.monotonic() of the next build attempt
+    
+    def resolve_provider(self) -> str:
+        """The configured provider, falling back to whichever API key is set."""
+        provider = settings.llm_provider.lower()
+        if provider in PROVIDERS:
+            return provider
+        print(f"Warning: Unknown LLM provider '{provider}'. Supported: {', '.join(repr(p) for p in PROVIDERS)}")
+        # Try to auto-detect based on available API keys
+        if settings.openai_api_key:
+            return "openai"
+        if settings.gemini_api_key or settings.google_api_key:
+            return "gemini"
+        return provider
+    
+    @staticmethod
+    def unavailable_message(provider: str) -> str:
+        """Explain why ``provider`` has no client and what to configure."""
+        if provider not in PROVIDERS:
+            return f"LLM not configured. Unknown provider '{provider}'; supported: {', '.join(PROVIDERS)}."
+        model = LLMRegistry.model_for(provider)
+        hint = SETUP_HINTS.get(provider, "Please check its configuration.")
+        return f"LLM not configured for provider '{provider}' (model {model}). {hint}"
+    
+    @staticmethod
+    def model_for(provider: str) -> str:
+        """Default model name configured for a provider."""
+        _, model_setting, _ = PROVIDERS.get(provider, PROVIDERS["openai"])
+        return getattr(settings, model_setting)
+    
+    def start(self):
+        """Build the configured provider's client up front so the first request is warm."""
+        self.get(self.resolve_provider())
+    
+    def get(self, provider: str, model: Optional[str] = None):
+        """Borrow the shared client for a provider/model (None if it cannot be built yet)."""
+        model = model or self.model_for(provider)
+        key = (provider, model)
+        with self._lock:
+            self._borrows[key] = self._borrows.get(key, 0) + 1
+            client = self._clients.get(key)
+            if client is None and time.monotonic() >= self._retry_at.get(key, 0.0):
+                client = self._build(provider, model)
+                if client is None:
+                    self._failures[key] = self._failures.get(key, 0) + 1
+                    backoff = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_MIN * 2 ** (self._failures[key] - 1))
+                    self._retry_at[key] = time.monotonic() + backoff
+                else:
+                    self._clients[key] = client
+                    self._created_at[key] = time.time()
+                    self._failures.pop(key, None)
+                    self._retry_at.pop(key, None)
+            return client
+    
+    def _build(self, provider: str, model: str):
+        if provider not in PROVIDERS:
+            return None
+        builder, _, pooled = PROVIDERS[provider]
+        http = None
+        if pooled:
+            http = PooledHTTPClients(resolve_pool_limits(provider, model))
+        client = builder(model, http)
+        if http is not None:
+            if client is None:
+                http.client.close()  # No request was sent, so the async pool holds no connections
+            else:
+                self._http[(provider, model)] = http
+        return client
+    
+    def stats(self) -> List[Dict]:
+        """Per-client borrow counts and connection pool state."""
+        with self._lock:
+            return [
+                {
+                    "provider": provider,
+                    "model": model,
+                    "available": (provider, model) in self._clients,
+                    "created_at": self._created_at.get((provider, model)),
+                    "borrows": borrows,
+                    "failed_builds": self._failures.get((provider, model), 0),
+                    "pool": self._http[(provider, model)].pool_stats() if (provider, model) in self._http else None,
+                }
+                for (provider, model), borrows in self._borrows.items()
+            ]
+    
+    async def aclose(self):
+        """Close every pooled connection and forget the clients."""
+        with self._lock:
+            http_clients = list(self._http.values())
+            self._clients.clear()
+            self._http.clear()
+            self._borrows.clear()
+            self._created_at.clear()
+            self._failures.clear()
+            self._retry_at.clear()
+        for http in http_clients:
+            await http.aclose()
+
+
+llm_registry = LLMRegistry()
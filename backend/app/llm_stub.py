@@ -0,0 +1,193 @@
+"""Deterministic offline chat model for load tests (``llm_provider="local-stub"``).
+
+``LocalStubChatModel`` is a LangChain ``BaseChatModel``, so the orchestrator
+drives it exactly like a real provider (``invoke``/``ainvoke``/``astream``)
+and the full LCAC pipeline runs without network access or API keys.
+
+Everything about a call is derived from a RNG seeded with ``seed`` and the
+prompt text, so the same prompt always produces the same response, latency,
+failure and violation decision:
+
+- time to first token drawn from a fixed/uniform/normal/lognormal/exponential
+  distribution (``latency_ms`` mean, ``latency_jitter_ms`` spread),
+- tokens emitted at ``tokens_per_second`` (0 means no per-token delay),
+- ``error_rate`` of calls raise ``LocalStubError`` after the latency,
+- ``violation_rate`` of responses contain ``violation_text`` so the
+  post-inference check flags them.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Clinical filler vocabulary; none of these trip LCACPolicy.DISALLOWED_PATTERNS
+STUB_VOCABULARY = (
+    "patient reports symptoms over the past two days with stable vitals and no "
+    "acute distress recommend monitoring hydration rest and follow up with primary "
+    "care seek urgent evaluation if pain worsens fever develops or breathing becomes "
+    "difficult triage priority appears non-urgent based on the provided context"
+).split()
+
+
+class LocalStubError(RuntimeError):
+    """Injected provider failure."""
+
+
+class LocalStubChatModel(BaseChatModel):
+    """Chat model that fabricates deterministic responses with injected latency and faults."""
+    
+    model_name: str = "local-stub"
+    seed: int = 0
+    latency_distribution: str = "fixed"
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 0.0
+    tokens_per_second: float = 0.0
+    response_tokens: int = 60
+    error_rate: float = 0.0
+    violation_rate: float = 0.0
+    violation_text: str = "radiology"
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{self.latency_distribution}'. "
+                f"Options: {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+    
+    @property
+    def _llm_type(self) -> str:
+        return "local-stub"
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "seed": self.seed,
+            "latency_distribution": self.latency_distribution,
+            "latency_ms": self.latency_ms,
+            "latency_jitter_ms": self.latency_jitter_ms,
+            "tokens_per_second": self.tokens_per_second,
+            "error_rate": self.error_rate,
+            "violation_rate": self.violation_rate,
+        }
+    
+    # Deterministic call plan
+    
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        prompt = "\n".join(f"{message.type}:{message.content}" for message in messages)
+        digest = hashlib.sha256(f"{self.seed}\x00{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+    
+    def _sample_latency(self, rng: random.Random) -> float:
+        """Time to first token in seconds."""
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        if self.latency_distribution == "uniform":
+            value = rng.uniform(mean - jitter, mean + jitter)
+        elif self.latency_distribution == "normal":
+            value = rng.gauss(mean, jitter)
+        elif self.latency_distribution == "lognormal" and mean > 0:
+            # Parameterised so the samples have the configured mean and standard deviation
+            sigma2 = math.log(1 + (jitter / mean) ** 2)
+            value = rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        elif self.latency_distribution == "exponential" and mean > 0:
+            value = rng.expovariate(1 / mean)
+        else:
+            value = mean
+        return max(0.0, value) / 1000
+    
+    def _plan(self, messages: List[BaseMessage]) -> Tuple[float, bool, List[str]]:
+        """(first token latency, should fail, response tokens) for a prompt."""
+        rng = self._rng(messages)
+        latency = self._sample_latency(rng)
+        fail = rng.random() < self.error_rate
+        words = [rng.choice(STUB_VOCABULARY) for _ in range(max(1, self.response_tokens))]
+        words[0] = words[0].capitalize()
+        if rng.random() < self.violation_rate:
+            words.insert(rng.randrange(len(words) + 1), self.violation_text)
+        tokens = [word + " " for word in words[:-1]] + [words[-1] + "."]
+        return latency, fail, tokens
+    
+    @property
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+    
+    def _failure(self) -> LocalStubError:
+        return LocalStubError(f"Injected local-stub failure (error_rate={self.error_rate})")
+    
+    # LangChain interface
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, fail, tokens = self._plan(messages)
+        time.sleep(latency)
+        if fail:
+            raise self._failure()
+        time.sleep(self._token_delay * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, fail, tokens = self._plan(messages)
+        await asyncio.sleep(latency)
+        if fail:
+            raise self._failure()
+        await asyncio.sleep(self._token_delay * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        latency, fail, tokens = self._plan(messages)
+        time.sleep(latency)
+        if fail:
+            raise self._failure()
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(self._token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        latency, fail, tokens = self._plan(messages)
+        await asyncio.sleep(latency)
+        if fail:
+            raise self._failure()
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(self._token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
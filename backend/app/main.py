@@ -1,31 +1,72 @@
 """FastAPI application for Privacy-Safe Agentic Clinical Triage Assistant."""
 
-from fastapi import FastAPI, Depends, HTTPException, Header
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from typing import List, Optional
+from sqlalchemy import or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pydantic import BaseModel
 from uuid import UUID
+import anyio
+import asyncio
+import base64
+import json
+import tempfile
 import uvicorn
 
-from app.database import get_session, init_db
+from app.database import engine, async_engine, read_engine, get_session, get_read_session, get_async_session, init_db
 from app.models import Memory, Session as SessionModel, Audit, TrustScore
 from app.lcac import LCACEngine
 from app.trust import TrustEngine
-from app.orchestrator import TriageOrchestrator
+from app.orchestrator import AsyncTriageOrchestrator
+from app.retrieval import memory_retriever
+from app.llm_registry import llm_registry
+from app.metrics import MetricsMiddleware, instrument_engine, metrics
+from app.profiling import profiler
+from app.audit_writer import audit_writer
+from app.memory_ingest import MemoryIngestor, iter_results
+from app.invalidation_bus import ZONE, invalidation_bus
+from app.bulk_redaction import RedactionSelector, bulk_redactor
+from app.audit_export import EXPORT_COMPRESSIONS, audit_filter_clauses, export_audit
+from app.audit_chain import sequence_range, verify_range
 from app.config import settings
 
 # Initialize database
 init_db()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services and drain them on shutdown."""
+    if settings.audit_write_mode == "write_behind":
+        audit_writer.start()
+    llm_registry.start()
+    invalidation_bus.start()
+    yield
+    await asyncio.to_thread(bulk_redactor.shutdown)  # Waits for the running chunk to commit
+    invalidation_bus.stop()
+    audit_writer.drain()
+    await llm_registry.aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Privacy-Safe Agentic Clinical Triage Assistant",
     description="Backend API with LCAC (Least-Context Access Control) framework",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+# Request latency and SQL statements per request (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+for bound_engine in {engine, async_engine.sync_engine, read_engine}:
+    instrument_engine(bound_engine)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,7 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-API-Key"],
+    expose_headers=["X-API-Key", "X-Next-Cursor", "X-Ingest-Created", "X-Ingest-Rejected", "X-Profile-Id"],
 )
 
 # API Key authentication
@@ -89,9 +130,12 @@ class AskResponse(BaseModel):
     response: str
     audit_id: str
     used_memory_ids: List[str]
+    dropped_memory_ids: List[str] = []
+    retrieval_cut_count: int = 0
     success: bool
     error: Optional[str] = None
     session_revoked: bool = False
+    cached: bool = False
 
 
 class RevokeRequest(BaseModel):
@@ -104,6 +148,28 @@ class RedactRequest(BaseModel):
     reason: Optional[str] = None
 
 
+class BulkRedactRequest(BaseModel):
+    zone: Optional[str] = None
+    tags: List[str] = []
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    memory_ids: List[str] = []
+    reason: Optional[str] = None
+
+
+class RedactionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    redacted: int
+    chunks: int
+    progress: float
+    error: Optional[str]
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+
 class AuditResponse(BaseModel):
     id: str
     session_id: str
@@ -111,9 +177,24 @@ class AuditResponse(BaseModel):
     prompt: str
     response: str
     used_memory_ids: List[str]
+    dropped_memory_ids: List[str] = []
     provenance_hash: str
     policy_violation: bool
     violation_reason: Optional[str]
+    cached: bool = False
+    sequence: Optional[int] = None
+    chain_hash: Optional[str] = None
+
+
+class AuditVerifyResponse(BaseModel):
+    verified: bool
+    start_sequence: Optional[int]
+    end_sequence: Optional[int]
+    records: int
+    checkpoint_tree_size: Optional[int]
+    root_hash: Optional[str]
+    proof_hashes: int
+    error: Optional[str]
 
 
 class TrustResponse(BaseModel):
@@ -158,8 +239,11 @@ async def create_memory(
     memory.set_tags(memory_data.tags)
     
     session.add(memory)
+    session.add_all(memory.build_tag_rows())
+    invalidation_bus.publish(ZONE, memory.zone, db_session=session)
     session.commit()
     session.refresh(memory)
+    memory_retriever.index_memory(memory)
     
     return MemoryResponse(
         id=str(memory.id),
@@ -172,10 +256,41 @@ async def create_memory(
     )
 
 
+@app.post("/memories/bulk")
+async def bulk_create_memories(
+    request: Request,
+    api_key: bool = Depends(verify_api_key)
+):
+    """Ingest NDJSON memories, one {"zone", "tags", "content"} object per line.
+    
+    Responds with one NDJSON result per input line (created, rejected or error).
+    """
+    results = tempfile.SpooledTemporaryFile(max_size=settings.memory_ingest_spool_bytes)
+    ingestor = MemoryIngestor(engine, results)
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(ingestor.feed, chunk)
+        await run_in_threadpool(ingestor.finish)
+    except BaseException:
+        results.close()
+        raise
+    finally:
+        await run_in_threadpool(ingestor.close)
+    
+    for zone in ingestor.zones:
+        await run_in_threadpool(invalidation_bus.publish, ZONE, zone)
+    
+    return StreamingResponse(
+        iter_results(results),
+        media_type="application/x-ndjson",
+        headers={"X-Ingest-Created": str(ingestor.created), "X-Ingest-Rejected": str(ingestor.rejected)}
+    )
+
+
 @app.get("/memories", response_model=List[MemoryResponse])
 async def list_memories(
     zone: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     api_key: bool = Depends(verify_api_key)
 ):
     """List memories, filtered by zone if provided."""
@@ -231,16 +346,60 @@ async def create_session(
     )
 
 
+class ClosingStreamingResponse(StreamingResponse):
+    """Streaming response that closes its body iterator even when the client disconnects.
+    
+    Starlette abandons the iterator on disconnect and leaves its cleanup to
+    garbage collection; closing it here runs the stream's ``finally`` blocks
+    (the partial-response audit in ``/ask/stream``) before the request ends.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+# Pre-inference rejections (no audit record written) -> HTTP status
+PRE_INFERENCE_ERROR_STATUS = {
+    "Invalid session ID format": 400,
+    "Session not found": 404,
+    "Session has been revoked": 403,
+}
+
+
 @app.post("/ask", response_model=AskResponse)
-def ask(
+async def ask(
     ask_request: AskRequest,
-    db_session: Session = Depends(get_session),
-    api_key: bool = Depends(verify_api_key)
+    response: Response,
+    db_session: AsyncSession = Depends(get_async_session),
+    api_key: bool = Depends(verify_api_key),
+    x_profile: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None, description="Profile this request: cprofile or sample")
 ):
-    """Process a query through the orchestrator with LCAC enforcement."""
-    orchestrator = TriageOrchestrator(db_session)
+    """Process a query through the orchestrator with LCAC enforcement.
+    
+    With ``X-Profile``/``?profile=`` the orchestrator run is profiled and the
+    profile ID returned in ``X-Profile-Id`` (see ``GET /profiling/{profile_id}``).
+    """
+    try:
+        profile_mode = profiler.requested_mode(x_profile, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    orchestrator = AsyncTriageOrchestrator(db_session)
+    
+    async with profiler.profile(profile_mode) as capture:
+        result = await orchestrator.aprocess_query(ask_request.session_id, ask_request.message)
+    if capture.profile_id:
+        response.headers["X-Profile-Id"] = capture.profile_id
     
-    result = orchestrator.process_query(ask_request.session_id, ask_request.message)
+    if result["audit_id"] is None:
+        raise HTTPException(
+            status_code=PRE_INFERENCE_ERROR_STATUS.get(result.get("error"), 400),
+            detail=result.get("error")
+        )
     
     if not result["success"] and result.get("session_revoked"):
         raise HTTPException(
@@ -253,12 +412,61 @@ def ask(
         response=result["response"],
         audit_id=result["audit_id"],
         used_memory_ids=result["used_memory_ids"],
+        dropped_memory_ids=result.get("dropped_memory_ids", []),
+        retrieval_cut_count=result.get("retrieval_cut_count", 0),
         success=result["success"],
         error=result.get("error"),
-        session_revoked=result.get("session_revoked", False)
+        session_revoked=result.get("session_revoked", False),
+        cached=result.get("cached", False)
     )
 
 
+@app.post("/ask/stream")
+async def ask_stream(
+    ask_request: AskRequest,
+    api_key: bool = Depends(verify_api_key)
+):
+    """Stream a response as Server-Sent Events with incremental LCAC enforcement.
+    
+    Emits ``token`` events with response text, then a single ``done`` event
+    with the audit result (``AskResponse`` fields other than ``response``).
+    """
+    # The session must outlive this handler, so it is closed by the stream itself
+    db_session = AsyncSession(async_engine, expire_on_commit=False)
+    orchestrator = AsyncTriageOrchestrator(db_session)
+    
+    try:
+        ctx = await orchestrator.aprepare_inference(ask_request.session_id, ask_request.message)
+    except Exception:
+        await db_session.close()
+        raise
+    
+    if ctx.error:
+        await db_session.close()
+        raise HTTPException(
+            status_code=PRE_INFERENCE_ERROR_STATUS.get(ctx.error, 400),
+            detail=ctx.error
+        )
+    
+    async def event_stream():
+        inference = orchestrator.astream_inference(ctx)
+        try:
+            async for event in inference:
+                name = event.pop("event")
+                if name == "done":
+                    # Text was already streamed; never echo a withheld violating tail
+                    event.pop("response", None)
+                    event["session_id"] = ask_request.session_id
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            with anyio.CancelScope(shield=True):
+                # Audits a partial response if the client went away mid-stream
+                await inference.aclose()
+                await db_session.close()
+    
+    return ClosingStreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/revoke")
 async def revoke_session(
     revoke_request: RevokeRequest,
@@ -293,26 +501,112 @@ async def redact_memory(
     return {"message": "Memory redacted successfully", "entry_id": redact_request.entry_id}
 
 
+def _redaction_job_response(job) -> RedactionJobResponse:
+    return RedactionJobResponse(
+        job_id=str(job.id),
+        status=job.status,
+        total=job.total,
+        redacted=job.redacted,
+        chunks=job.chunks,
+        progress=1.0 if job.status == "completed" else min(1.0, job.redacted / job.total) if job.total else 0.0,
+        error=job.error,
+        created_at=job.created_at.isoformat(),
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None
+    )
+
+
+@app.post("/redactions", response_model=RedactionJobResponse, status_code=202)
+async def create_redaction_job(
+    request: BulkRedactRequest,
+    api_key: bool = Depends(verify_api_key)
+):
+    """Start a background job redacting every memory matching the selector."""
+    try:
+        selector = RedactionSelector(
+            zone=request.zone,
+            tags=request.tags,
+            created_after=request.created_after,
+            created_before=request.created_before,
+            memory_ids=[UUID(memory_id) for memory_id in request.memory_ids]
+        )
+        job = await run_in_threadpool(bulk_redactor.submit, selector, request.reason)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _redaction_job_response(job)
+
+
+@app.get("/redactions/{job_id}", response_model=RedactionJobResponse)
+async def get_redaction_job(
+    job_id: UUID,
+    session: Session = Depends(get_read_session),
+    api_key: bool = Depends(verify_api_key)
+):
+    """Progress of a bulk redaction job."""
+    job = bulk_redactor.get(job_id, session)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Redaction job not found")
+    return _redaction_job_response(job)
+
+
+def _encode_audit_cursor(audit: Audit) -> str:
+    """Opaque keyset cursor pointing just past ``audit``."""
+    raw = json.dumps({"timestamp": audit.timestamp.isoformat(), "id": str(audit.id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_audit_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(data["timestamp"]), UUID(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_audit_session_id(session_id: Optional[str]) -> Optional[UUID]:
+    if not session_id:
+        return None
+    try:
+        return UUID(session_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid session_id format")
+
+
 @app.get("/audit", response_model=List[AuditResponse])
 def get_audit(
+    response: Response,
     session_id: Optional[str] = None,
-    db_session: Session = Depends(get_session),
+    policy_violation: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(settings.audit_page_size, ge=1, le=settings.audit_page_size_max),
+    cursor: Optional[str] = None,
+    db_session: Session = Depends(get_read_session),
     api_key: bool = Depends(verify_api_key)
 ):
-    """Get audit records, optionally filtered by session_id."""
-    if session_id:
-        try:
-            session_uuid = UUID(session_id)
-            statement = select(Audit).where(Audit.session_id == session_uuid).order_by(Audit.timestamp)
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid session_id format")
-    else:
-        statement = select(Audit).order_by(Audit.timestamp)
+    """Get audit records, most recent first, one keyset page at a time.
     
+    Optional filters: session_id, policy_violation and a ``[since, until)``
+    timestamp range. When more records match, the ``X-Next-Cursor`` response
+    header carries the ``cursor`` value for the next page.
+    """
+    statement = select(Audit).where(
+        *audit_filter_clauses(_parse_audit_session_id(session_id), policy_violation, since, until)
+    )
+    if cursor:
+        cursor_timestamp, cursor_id = _decode_audit_cursor(cursor)
+        statement = statement.where(
+            Audit.timestamp <= cursor_timestamp,
+            or_(Audit.timestamp < cursor_timestamp, Audit.id < cursor_id)
+        )
+    
+    # Fetch one extra row to know whether another page exists
+    statement = statement.order_by(Audit.timestamp.desc(), Audit.id.desc()).limit(limit + 1)
     audits = db_session.exec(statement).all()
     
-    # Reverse the order to get descending order (most recent first)
-    audits = list(reversed(audits))
+    if len(audits) > limit:
+        audits = audits[:limit]
+        response.headers["X-Next-Cursor"] = _encode_audit_cursor(audits[-1])
     
     return [
         AuditResponse(
@@ -322,14 +616,76 @@ def get_audit(
             prompt=audit.prompt,
             response=audit.response,
             used_memory_ids=audit.get_used_memory_ids(),
+            dropped_memory_ids=audit.get_dropped_memory_ids(),
             provenance_hash=audit.provenance_hash,
             policy_violation=audit.policy_violation,
-            violation_reason=audit.violation_reason
+            violation_reason=audit.violation_reason,
+            cached=audit.cached,
+            sequence=audit.sequence,
+            chain_hash=audit.chain_hash
         )
         for audit in audits
     ]
 
 
+@app.get("/audit/verify", response_model=AuditVerifyResponse)
+def verify_audit(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    start_sequence: Optional[int] = Query(None, ge=1),
+    end_sequence: Optional[int] = Query(None, ge=1),
+    db_session: Session = Depends(get_read_session),
+    api_key: bool = Depends(verify_api_key)
+):
+    """Verify the integrity of a range of the audit hash chain.
+    
+    The range is given either as ``start_sequence``/``end_sequence`` or as a
+    ``[since, until)`` time window. Records in the range are rehashed and
+    checked against the first Merkle checkpoint covering them.
+    """
+    conn = db_session.connection()
+    if start_sequence is None and end_sequence is None:
+        span = sequence_range(conn, since, until)
+        if span is None:
+            return AuditVerifyResponse(
+                verified=True, start_sequence=None, end_sequence=None, records=0,
+                checkpoint_tree_size=None, root_hash=None, proof_hashes=0, error=None
+            )
+        start_sequence, end_sequence = span
+    elif start_sequence is None or end_sequence is None or start_sequence > end_sequence:
+        raise HTTPException(status_code=400, detail="start_sequence and end_sequence must form a range")
+    
+    return AuditVerifyResponse(**verify_range(conn, start_sequence, end_sequence))
+
+
+@app.get("/audit/export")
+def export_audit_log(
+    session_id: Optional[str] = None,
+    policy_violation: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    compression: str = "none",
+    api_key: bool = Depends(verify_api_key)
+):
+    """Stream the full (filtered) audit log as NDJSON, oldest first.
+    
+    ``compression`` is ``none``, ``gzip`` or ``zstd``. Rows are read with a
+    server-side cursor, so memory use does not grow with the table.
+    """
+    clauses = audit_filter_clauses(_parse_audit_session_id(session_id), policy_violation, since, until)
+    try:
+        chunks = export_audit(read_engine, clauses, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type, extension = EXPORT_COMPRESSIONS[compression]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit-export{extension}"'}
+    )
+
+
 @app.get("/trust", response_model=TrustResponse)
 async def get_trust(
     user_id: str,
@@ -349,5 +705,64 @@ async def get_trust(
     )
 
 
+@app.get("/llm/pools")
+async def get_llm_pools(api_key: bool = Depends(verify_api_key)):
+    """Shared LLM clients with their borrow counts and HTTP connection pool state."""
+    return {"clients": llm_registry.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(api_key: bool = Depends(verify_api_key)):
+    """Per-stage /ask latency, request latency, SQL statements per request and LCAC counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/profiling/window", response_class=PlainTextResponse)
+async def profile_window(
+    percent: float = Query(10.0, gt=0, le=100, description="Share of /ask requests to sample"),
+    seconds: float = Query(30.0, gt=0, description="Window length"),
+    api_key: bool = Depends(verify_api_key)
+):
+    """Sample a share of /ask requests on this worker for a time window.
+    
+    Blocks for the window and returns the merged profile as collapsed stacks
+    (``frame;frame count`` lines) ready for flamegraph.pl or speedscope.
+    """
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if seconds > settings.profiling_window_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window is limited to {settings.profiling_window_max_seconds:g} seconds"
+        )
+    try:
+        window = profiler.open_window(percent, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        collapsed = profiler.close_window(window)
+    return PlainTextResponse(collapsed, headers={
+        "X-Profile-Requests": str(window.requests),
+        "X-Profile-Sampled-Requests": str(window.sampled_requests),
+        "X-Profile-Samples": str(window.sampler.samples),
+    })
+
+
+@app.get("/profiling/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, api_key: bool = Depends(verify_api_key)):
+    """A stored per-request profile: pstats report (cprofile) or collapsed stacks (sample)."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    stored = profiler.get(profile_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(stored["text"], headers={
+        "X-Profile-Mode": stored["mode"],
+        "X-Profile-Seconds": f"{stored['seconds']:.6f}",
+    })
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
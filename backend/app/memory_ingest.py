@@ -0,0 +1,281 @@
+"""Bulk NDJSON memory ingestion.
+
+Each input line is a JSON object ``{"zone": ..., "tags": [...], "content": ...}``.
+Lines are validated against ``LCACPolicy.ZONE_POLICIES`` as they arrive (an
+unknown zone, or a tag the zone does not allow, rejects the line), content is
+hashed on a thread pool, and accepted memories plus their ``memorytag`` rows are
+inserted ``memory_ingest_batch_size`` at a time in one transaction per batch.
+
+One NDJSON result per input line, tagged with its line number, is written to a
+caller-supplied binary file (``POST /memories/bulk`` uses a spooled temp file),
+so neither the payload nor the results are ever held in memory as a whole.
+Results are written in input order: a rejected line waits with the batch it
+was read with (rejected lines count toward the batch size) and is written
+when that batch commits. New memories are not indexed by the retriever here;
+both retrieval backends index unseen memories lazily the first time their
+zone is ranked.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from app.config import settings
+from app.lcac import LCACPolicy
+from app.models import Memory, MemoryTag
+
+RESULT_CHUNK_SIZE = 64 * 1024
+
+
+def validate_memory_record(record) -> Tuple[str, List[str], str]:
+    """Return (zone, tags, content) or raise ValueError describing the problem."""
+    if not isinstance(record, dict):
+        raise ValueError("Line is not a JSON object")
+    zone, tags, content = record.get("zone"), record.get("tags", []), record.get("content")
+    if zone not in LCACPolicy.ZONE_POLICIES:
+        raise ValueError(f"Unknown zone '{zone}'")
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("'tags' must be a list of strings")
+    denied = [tag for tag in tags if not LCACPolicy.is_tag_allowed(zone, tag)]
+    if denied:
+        raise ValueError(f"Tags not allowed in zone '{zone}': {', '.join(denied)}")
+    if not isinstance(content, str) or not content:
+        raise ValueError("'content' must be a non-empty string")
+    return zone, tags, content
+
+
+def _insert_many(conn, table, rows: List[Dict], constants: Optional[Dict] = None):
+    """executemany on the DBAPI cursor; values go through each column's bind processor.
+    
+    Skips SQLAlchemy's per-row parameter construction, which costs more than
+    SQLite's own insert work at bulk-load volumes. ``constants`` are columns
+    shared by every row, bound once.
+    """
+    constants = constants or {}
+    dialect = conn.dialect
+    compiled = table.insert().compile(dialect=dialect, column_keys=list(rows[0]) + list(constants))
+    columns = list(compiled.positiontup) if compiled.positional else list(rows[0]) + list(constants)
+    
+    def processor(name):
+        process = table.c[name].type.bind_processor(dialect)
+        if name in constants:
+            value = process(constants[name]) if process else constants[name]
+            return lambda row: value
+        return (lambda row: process(row[name])) if process else itemgetter(name)
+    
+    getters = [processor(name) for name in columns]
+    if compiled.positional:
+        params = [tuple(get(row) for get in getters) for row in rows]
+    else:
+        params = [{name: get(row) for name, get in zip(columns, getters)} for row in rows]
+    conn.exec_driver_sql(compiled.string, params)
+
+
+def time_ordered_ids(count: int) -> List[UUID]:
+    """``count`` ascending UUIDv7-style IDs (48-bit millisecond timestamp, random tail).
+    
+    Bulk-loaded keys then land at the right edge of the primary key and tag
+    indexes instead of at random pages, so insert cost stays flat as the
+    tables grow.
+    """
+    prefix = (int(time.time() * 1000) << 80) | (0x7 << 76)
+    tails = sorted(
+        int.from_bytes(os.urandom(10), "big") & ((1 << 74) - 1)
+        for _ in range(count)
+    )
+    # 12 random bits after the version nibble, then the RFC 4122 variant and 62 random bits
+    return [UUID(int=prefix | ((tail >> 62) << 64) | (0b10 << 62) | (tail & ((1 << 62) - 1))) for tail in tails]
+
+
+def _sha256_many(contents: List[str]) -> List[str]:
+    return [hashlib.sha256(content.encode()).hexdigest() for content in contents]
+
+
+class MemoryIngestor:
+    """Feeds NDJSON bytes through validation, pooled hashing and batched inserts."""
+    
+    def __init__(
+        self,
+        engine,
+        results: BinaryIO,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.engine = engine
+        self.results = results
+        self.batch_size = batch_size or settings.memory_ingest_batch_size
+        self.workers = workers or settings.memory_ingest_workers or min(4, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="memory-ingest")
+        self._inserter = ThreadPoolExecutor(1, thread_name_prefix="memory-ingest-insert")
+        self._inflight = None
+        self._conn = None
+        self._saved_cache_size = None
+        self._tags_json: Dict[Tuple[str, ...], str] = {}  # Tag lists come from the small ZONE_POLICIES vocabulary
+        self._buffer = b""
+        self._pending: List[Tuple[int, str, List[str], str]] = []
+        self._rejects: List[Tuple[int, bytes]] = []  # (line number, result) read with the pending batch
+        self.line_number = 0
+        self.created = 0
+        self.rejected = 0
+        self.zones: Set[str] = set()
+    
+    # Input
+    
+    def feed(self, chunk: bytes):
+        """Consume a chunk of NDJSON; complete lines are processed, the tail is kept."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self.add_line(line)
+    
+    def finish(self):
+        """Process any unterminated last line and flush the final batch."""
+        if self._buffer:
+            self.add_line(self._buffer)
+            self._buffer = b""
+        self.flush()
+        self._collect()
+    
+    def add_line(self, line: bytes):
+        """Validate one line; flushes when a full batch is pending."""
+        self.line_number += 1
+        if not line.strip():
+            return
+        try:
+            zone, tags, content = validate_memory_record(json.loads(line))
+        except ValueError as e:  # Includes JSON decode errors
+            result = {"line": self.line_number, "status": "rejected", "error": str(e)}
+            self._rejects.append((self.line_number, json.dumps(result).encode() + b"\n"))
+            self.rejected += 1
+        else:
+            self._pending.append((self.line_number, zone, tags, content))
+        if len(self._pending) + len(self._rejects) >= self.batch_size:
+            self.flush()
+    
+    # Batching
+    
+    def _hash_contents(self, contents: List[str]) -> List[str]:
+        step = -(-len(contents) // self.workers)
+        slices = [contents[start:start + step] for start in range(0, len(contents), step)]
+        return [digest for digests in self._executor.map(_sha256_many, slices) for digest in digests]
+    
+    def flush(self):
+        """Hand the pending batch to the insert thread once the previous batch has committed.
+        
+        Rows for the next batch are parsed and built while SQLite inserts the
+        current one (the sqlite3 driver releases the GIL while it works).
+        """
+        batch, self._pending = self._pending, []
+        rejects, self._rejects = self._rejects, []
+        rows = self._build_rows(batch) if batch else None
+        self._collect()
+        if batch:
+            self._inflight = (batch, rows[0], rejects, self._inserter.submit(self._insert, *rows))
+        else:
+            self.results.writelines(result for _, result in rejects)
+    
+    def _build_rows(self, batch: List[Tuple[int, str, List[str], str]]) -> Tuple[List[Dict], List[Dict]]:
+        hashes = self._hash_contents([content for _, _, _, content in batch])
+        ids = time_ordered_ids(len(batch))
+        memories, tag_rows = [], []
+        for (_, zone, tags, content), content_hash, memory_id in zip(batch, hashes, ids):
+            tags_json = self._tags_json.get(tuple(tags))
+            if tags_json is None:
+                tags_json = self._tags_json[tuple(tags)] = json.dumps(tags)
+            memories.append({
+                "id": memory_id,
+                "zone": zone,
+                "tags": tags_json,
+                "content": content,
+                "content_hash": content_hash,
+            })
+            tag_rows.extend({"memory_id": memory_id, "zone": zone, "tag": tag} for tag in dict.fromkeys(tags))
+        return memories, tag_rows
+    
+    def _connection(self):
+        """One connection for the whole load, so SQLite's page cache stays warm between batches."""
+        if self._conn is None:
+            self._conn = self.engine.connect()
+            if self._conn.dialect.name == "sqlite":
+                self._saved_cache_size = self._conn.exec_driver_sql("PRAGMA cache_size").scalar()
+                self._conn.exec_driver_sql(f"PRAGMA cache_size = -{settings.memory_ingest_sqlite_cache_mb * 1024}")
+            self._conn.commit()
+        return self._conn
+    
+    def _insert(self, memories: List[Dict], tag_rows: List[Dict]):
+        conn = self._connection()
+        with conn.begin():
+            _insert_many(conn, Memory.__table__, memories, {"created_at": datetime.utcnow(), "redacted": False})
+            if tag_rows:
+                _insert_many(conn, MemoryTag.__table__, tag_rows)
+    
+    def _collect(self):
+        """Wait for the in-flight batch and write its per-line results, in line order."""
+        if self._inflight is None:
+            return
+        batch, memories, rejects, future = self._inflight
+        self._inflight = None
+        try:
+            future.result()
+        except Exception as e:
+            error = f"Batch insert failed: {e.__class__.__name__}"
+            results = [
+                (line_number, json.dumps({"line": line_number, "status": "error", "error": error}).encode() + b"\n")
+                for line_number, _, _, _ in batch
+            ]
+            self.rejected += len(batch)
+        else:
+            # IDs and hex digests never need escaping
+            results = [
+                (line_number, b'{"line": %d, "status": "created", "id": "%s", "content_hash": "%s"}\n'
+                 % (line_number, str(memory["id"]).encode(), memory["content_hash"].encode()))
+                for (line_number, _, _, _), memory in zip(batch, memories)
+            ]
+            self.zones.update(zone for _, zone, _, _ in batch)
+            self.created += len(batch)
+        self.results.writelines(result for _, result in heapq.merge(results, rejects, key=itemgetter(0)))
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._inserter.shutdown(wait=True)
+        if self._conn is not None:
+            if self._saved_cache_size is not None:
+                self._conn.exec_driver_sql(f"PRAGMA cache_size = {self._saved_cache_size}")
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
+    
+    @property
+    def summary(self) -> Dict[str, int]:
+        return {"lines": self.line_number, "created": self.created, "rejected": self.rejected}
+
+
+def ingest_ndjson(ingestor: MemoryIngestor, chunks: Iterable[bytes]) -> Dict[str, int]:
+    """Run a whole NDJSON byte stream through an ingestor and return its summary."""
+    try:
+        for chunk in chunks:
+            ingestor.feed(chunk)
+        ingestor.finish()
+    finally:
+        ingestor.close()
+    return ingestor.summary
+
+
+def iter_results(results: BinaryIO) -> Iterator[bytes]:
+    """Stream a results file from the start in fixed-size chunks, then close it."""
+    try:
+        results.seek(0)
+        while True:
+            chunk = results.read(RESULT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        results.close()
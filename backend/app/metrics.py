@@ -0,0 +1,308 @@
+"""In-process metrics with a Prometheus text exposition (``GET /metrics``).
+
+Counters and histograms are plain dicts keyed by label values behind one lock
+per metric, so recording costs a dict lookup and a bisect. The ``/ask``
+pipeline times its stages into ``InferenceContext.timings`` (see
+``StageTimer``) and observes them once per request, labeled with the zone and
+LLM provider. ``MetricsMiddleware`` records request latency and the number of
+SQL statements each request executed; statements are counted by a
+``before_cursor_execute`` listener on every engine passed to
+``instrument_engine``. Values owned by other components (e.g. cache hit
+counts) are read at scrape time through collectors.
+
+Zone labels go through ``zone_label``: session zones are client input, so any
+zone without an LCAC policy is reported as ``other`` to keep the number of
+series bounded.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Seconds; spans fast in-process stages up to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# (labels, value) pairs produced by a collector at scrape time
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+    
+    type = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+    
+    def lines(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(dict(zip(self.labelnames, labels)))} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+    
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+    
+    def lines(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels({**base, 'le': _format_value(bound)})} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(base)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(base)} {count}"
+
+
+class MetricsRegistry:
+    """Owns every metric and renders them in the Prometheus text format."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Samples]]] = []
+    
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def register_collector(self, name: str, metric_type: str, documentation: str, collect: Callable[[], Samples]):
+        """Add a metric whose samples are produced by ``collect()`` at scrape time."""
+        self._collectors.append((name, metric_type, documentation, collect))
+    
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.lines())
+        for name, metric_type, documentation, collect in self._collectors:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Context manager adding the elapsed seconds of its block to ``timings[stage]``."""
+    
+    __slots__ = ("timings", "stage", "start")
+    
+    def __init__(self, timings: Dict[str, float], stage: str):
+        self.timings = timings
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+metrics = MetricsRegistry()
+
+ask_stage_seconds = metrics.histogram(
+    "lcac_ask_stage_duration_seconds",
+    "Time spent in each /ask pipeline stage",
+    ("stage", "zone", "provider")
+)
+http_request_seconds = metrics.histogram(
+    "lcac_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+db_queries_per_request = metrics.histogram(
+    "lcac_db_queries_per_request",
+    "SQL statements executed while serving one HTTP request",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS
+)
+policy_violations = metrics.counter(
+    "lcac_policy_violations_total",
+    "Inferences rejected by the post-inference LCAC check",
+    ("zone",)
+)
+session_revocations = metrics.counter(
+    "lcac_session_revocations_total",
+    "Sessions revoked, manually or after a policy violation",
+    ("zone",)
+)
+
+
+# Caches registered with register_cache(); each exposes a ``stats`` dict and ``len()``
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """Export a cache's hit/miss/eviction/invalidation counts and size, labeled ``cache=name``."""
+    _caches[name] = cache
+
+
+def _cache_samples(stat: str) -> Samples:
+    return [({"cache": name}, cache.stats.get(stat, 0)) for name, cache in _caches.items()]
+
+
+for _stat, _documentation in (
+    ("hits", "Cache lookups answered from the cache"),
+    ("misses", "Cache lookups that missed or found an expired entry"),
+    ("evictions", "Entries evicted to stay within the cache limits"),
+    ("invalidations", "Entries dropped because the data they depend on changed"),
+):
+    metrics.register_collector(
+        f"lcac_cache_{_stat}_total", "counter", _documentation,
+        lambda stat=_stat: _cache_samples(stat)
+    )
+metrics.register_collector(
+    "lcac_cache_entries", "gauge", "Entries currently held by each cache",
+    lambda: [({"cache": name}, len(cache)) for name, cache in _caches.items()]
+)
+
+
+def zone_label(zone: Optional[str]) -> str:
+    """Label value for ``zone``: "none" when unset, "other" when it has no LCAC policy."""
+    from app.lcac import LCACPolicy  # lcac records metrics, so import on use
+    if not zone:
+        return "none"
+    return zone if zone in LCACPolicy.ZONE_POLICIES else "other"
+
+
+def observe_stages(timings: Dict[str, float], zone: Optional[str], provider: str):
+    """Record one request's stage timings."""
+    zone = zone_label(zone)
+    for stage, seconds in timings.items():
+        ask_stage_seconds.observe(seconds, stage, zone, provider)
+
+
+# Per-request SQL statement counter; a one-element list so threadpool copies of the context share it
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_engine(engine):
+    """Count the SQL statements ``engine`` executes toward the current request."""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and SQL statements per request.
+    
+    Requests are labeled with the matched route template (``/audit/verify``,
+    not the raw path), so label cardinality stays bounded.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = [500]
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        queries = [0]
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_queries.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.observe(elapsed, scope["method"], route, str(status[0]))
+            db_queries_per_request.observe(queries[0], scope["method"], route)
@@ -1,6 +1,7 @@
 """Database models for the application."""
 
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from datetime import datetime
 from typing import Optional, List
 from uuid import uuid4, UUID
@@ -28,6 +29,25 @@ class Memory(SQLModel, table=True):
     def set_tags(self, tags: List[str]):
         """Set tags as JSON string."""
         self.tags = json.dumps(tags)
+    
+    def build_tag_rows(self) -> List["MemoryTag"]:
+        """Build normalized tag index rows for this memory."""
+        return [
+            MemoryTag(memory_id=self.id, zone=self.zone, tag=tag)
+            for tag in dict.fromkeys(self.get_tags())
+        ]
+
+
+class MemoryTag(SQLModel, table=True):
+    """Normalized memory tags so zone/tag filtering runs in the database."""
+    
+    __table_args__ = (
+        Index("ix_memorytag_zone_tag_memory", "zone", "tag", "memory_id"),
+    )
+    
+    memory_id: UUID = Field(foreign_key="memory.id", primary_key=True)
+    tag: str = Field(primary_key=True)
+    zone: str  # Denormalized from Memory.zone for the composite index
 
 
 class Session(SQLModel, table=True):
@@ -59,15 +79,26 @@ class Session(SQLModel, table=True):
 class Audit(SQLModel, table=True):
     """Audit log for all inference events."""
     
+    __table_args__ = (
+        # Keyset pagination on (timestamp, id), newest first
+        Index("ix_audit_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_session_timestamp_id", "session_id", "timestamp", "id"),
+    )
+    
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     session_id: UUID = Field(foreign_key="session.session_id", index=True)
     timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     prompt: str  # User prompt
     response: str  # Agent response
     used_memory_ids: str = Field(default="[]")  # JSON array of memory IDs
+    dropped_memory_ids: str = Field(default="[]")  # JSON array of memory IDs left out by the context packer
     provenance_hash: str  # Hash of prompt + response + memory_ids for integrity
     policy_violation: bool = Field(default=False)
     violation_reason: Optional[str] = None
+    violation_offset: Optional[int] = None  # Character offset of a streamed violation
+    cached: bool = Field(default=False)  # Response was served from the response cache
+    sequence: Optional[int] = Field(default=None, unique=True, index=True)  # Position in the hash chain (1-based)
+    chain_hash: Optional[str] = None  # sha256(previous chain_hash + provenance_hash)
     
     def get_used_memory_ids(self) -> List[str]:
         """Parse used memory IDs from JSON string."""
@@ -79,6 +110,39 @@ class Audit(SQLModel, table=True):
     def set_used_memory_ids(self, memory_ids: List[str]):
         """Set used memory IDs as JSON string."""
         self.used_memory_ids = json.dumps([str(mid) for mid in memory_ids])
+    
+    def get_dropped_memory_ids(self) -> List[str]:
+        """Parse dropped memory IDs from JSON string."""
+        try:
+            return json.loads(self.dropped_memory_ids) if self.dropped_memory_ids else []
+        except json.JSONDecodeError:
+            return []
+
+
+class AuditChainHead(SQLModel, table=True):
+    """Tip of the audit hash chain (single row, locked while appending)."""
+    
+    id: int = Field(default=1, primary_key=True)
+    sequence: int = Field(default=0)  # Last assigned Audit.sequence
+    chain_hash: str  # chain_hash of the last record
+    frontier: str = Field(default="[]")  # JSON [[level, hash], ...] of the Merkle tree's right edge
+
+
+class AuditMerkleNode(SQLModel, table=True):
+    """Complete Merkle subtree over audit leaves [position * 2^level, (position + 1) * 2^level)."""
+    
+    level: int = Field(primary_key=True)  # >= 1; leaves are derived from Audit.provenance_hash
+    position: int = Field(primary_key=True)
+    hash: str
+
+
+class AuditCheckpoint(SQLModel, table=True):
+    """Merkle root of the first ``tree_size`` audit records."""
+    
+    tree_size: int = Field(primary_key=True)
+    root_hash: str
+    chain_hash: str  # chain_hash of record ``tree_size``
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class TrustScore(SQLModel, table=True):
@@ -88,4 +152,35 @@ class TrustScore(SQLModel, table=True):
     score: float = Field(default=1.0, ge=0.0, le=1.0)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
     violation_count: int = Field(default=0)
-    successful_inferences: int = Field(default=0)
\ No newline at end of file
+    successful_inferences: int = Field(default=0)
+
+
+class InvalidationEvent(SQLModel, table=True):
+    """Change log read by every worker's invalidation bus (see app/invalidation_bus.py)."""
+    
+    # Never reuse a version once pruning has emptied the table
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    version: Optional[int] = Field(default=None, primary_key=True)  # Monotonic, assigned on insert
+    kind: str  # "session", "memory", "zone", "trust"
+    key: str
+    payload: str = Field(default="{}")  # JSON details, e.g. the zone of a redacted memory
+    origin: str  # Publishing worker; it applied the event locally already
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class RedactionJob(SQLModel, table=True):
+    """Background bulk redaction (see app/bulk_redaction.py) and its progress."""
+    
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    status: str = Field(default="pending")  # pending, running, completed, failed, interrupted
+    selector: str = Field(default="{}")  # JSON: zone, tags, created_after, created_before, memory_ids
+    reason: Optional[str] = None
+    session_id: UUID = Field(foreign_key="session.session_id")  # Revoked system session its audit rows belong to
+    total: int = Field(default=0)  # Unredacted memories matching the selector when the job was submitted
+    redacted: int = Field(default=0)
+    chunks: int = Field(default=0)  # Committed chunks, one audit record each
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
\ No newline at end of file
@@ -1,32 +1,76 @@
 """Orchestrator for LangChain agent with LCAC pre/post hooks."""
 
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 try:
     from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 except ImportError:
     # Fallback for older langchain versions
     from langchain.schema import HumanMessage, SystemMessage, AIMessage
 
-# LLM Provider imports
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None
-
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
-except ImportError:
-    ChatGoogleGenerativeAI = None
-
 from app.lcac import LCACEngine
+from app.content_scanner import IncrementalScanner
+from app.retrieval import memory_retriever
+from app.context_packer import ContextPacker, estimate_tokens, resolve_token_budget
+from app.response_cache import response_cache
+from app.llm_registry import llm_registry
+from app.metrics import StageTimer, observe_stages, policy_violations, zone_label
 from app.trust import TrustEngine
 from app.models import Memory, Session as SessionModel
+from app.session_cache import SessionState
 from app.config import settings
+from dataclasses import dataclass, field
+import anyio
 import hashlib
 import json
 
 
+@dataclass
+class InferenceContext:
+    """Request-scoped state for one inference.
+    
+    The session state (zone, user, revoked) is looked up once by the
+    pre-inference hook and carried through the LLM call to the post-inference
+    hook; the row itself is only loaded if a violation revokes the session.
+    ``timings`` collects per-stage seconds for ``app.metrics``.
+    """
+    session_id: str
+    message: str
+    session: Optional[SessionState] = None
+    error: Optional[str] = None
+    used_memories: List[Memory] = field(default_factory=list)
+    dropped_memory_ids: List[str] = field(default_factory=list)  # Left out by the context packer
+    retrieval_cut: int = 0  # Allowed memories ranked below retrieval_top_k
+    messages: List = field(default_factory=list)
+    cache_key: Optional[str] = None  # Set when the response cache is enabled
+    cached: bool = False  # Response was served from the cache
+    llm_failed: bool = False  # Response is a fallback/error message, never cached
+    timings: Dict[str, float] = field(default_factory=dict)
+    
+    @property
+    def zone(self) -> Optional[str]:
+        return self.session.zone if self.session else None
+    
+    def stage(self, name: str) -> StageTimer:
+        """Time a pipeline stage: ``with ctx.stage("llm"): ...``."""
+        return StageTimer(self.timings, name)
+    
+    @property
+    def used_memory_ids(self) -> List[str]:
+        return [str(memory.id) for memory in self.used_memories]
+    
+    def error_result(self) -> Dict:
+        """Result for a request rejected before calling the LLM."""
+        return {
+            "success": False,
+            "error": self.error,
+            "response": None,
+            "audit_id": None,
+            "used_memory_ids": []
+        }
+
+
 class TriageOrchestrator:
     """Orchestrator that manages agent execution with LCAC enforcement."""
     
@@ -34,83 +78,27 @@ class TriageOrchestrator:
         self.db_session = db_session
         self.lcac = LCACEngine(db_session)
         self.trust_engine = TrustEngine(db_session)
-        self.llm = None
-        self.llm_provider = settings.llm_provider.lower()
-        
-        # Initialize LLM based on provider
-        if self.llm_provider == "openai":
-            self.llm = self._init_openai_llm()
-        elif self.llm_provider == "gemini":
-            self.llm = self._init_gemini_llm()
-        else:
-            print(f"Warning: Unknown LLM provider '{self.llm_provider}'. Supported: 'openai', 'gemini'")
-            # Try to auto-detect based on available API keys
-            if settings.openai_api_key:
-                self.llm = self._init_openai_llm()
-                self.llm_provider = "openai"
-            elif settings.gemini_api_key or settings.google_api_key:
-                self.llm = self._init_gemini_llm()
-                self.llm_provider = "gemini"
+        self.context_packer = ContextPacker(self._format_memory, self.EMPTY_CONTEXT)
+        # Long-lived client shared by every orchestrator (see app.llm_registry)
+        self.llm_provider = llm_registry.resolve_provider()
+        self.llm = llm_registry.get(self.llm_provider)
     
-    def _init_openai_llm(self):
-        """Initialize OpenAI LLM."""
-        if not settings.openai_api_key:
-            print("Warning: OpenAI API key not set. Set OPENAI_API_KEY environment variable.")
-            return None
-        
-        if ChatOpenAI is None:
-            print("Warning: langchain-openai not installed. Install with: pip install langchain-openai")
-            return None
-        
-        try:
-            return ChatOpenAI(
-                model=settings.openai_model,
-                temperature=settings.openai_temperature,
-                max_tokens=settings.openai_max_tokens,
-                openai_api_key=settings.openai_api_key
-            )
-        except Exception as e:
-            print(f"Warning: Failed to initialize OpenAI LLM: {e}")
-            return None
+    EMPTY_CONTEXT = "No relevant patient history available."
     
-    def _init_gemini_llm(self):
-        """Initialize Google Gemini LLM."""
-        import os
-        
-        # Check for API key in settings or environment (GOOGLE_API_KEY is the standard env var)
-        api_key = settings.gemini_api_key or settings.google_api_key or os.getenv("GOOGLE_API_KEY")
-        
-        if not api_key:
-            print("Warning: Gemini API key not set. Set GEMINI_API_KEY, GOOGLE_API_KEY, or google_api_key environment variable.")
-            return None
-        
-        if ChatGoogleGenerativeAI is None:
-            print("Warning: langchain-google-genai not installed. Install with: pip install langchain-google-genai")
-            return None
-        
-        try:
-            # ChatGoogleGenerativeAI reads from GOOGLE_API_KEY env var by default
-            # If we have it in settings, set it as env var so LangChain can pick it up
-            if (settings.gemini_api_key or settings.google_api_key) and not os.getenv("GOOGLE_API_KEY"):
-                os.environ["GOOGLE_API_KEY"] = settings.gemini_api_key or settings.google_api_key
-            
-            return ChatGoogleGenerativeAI(
-                model=settings.gemini_model,
-                temperature=settings.gemini_temperature,
-                max_output_tokens=settings.gemini_max_tokens
-            )
-        except Exception as e:
-            print(f"Warning: Failed to initialize Gemini LLM: {e}")
-            return None
+    @staticmethod
+    def _format_memory(memory: Memory, content: Optional[str] = None) -> str:
+        """Format one memory as a context line (optionally with replacement content)."""
+        text = memory.content if content is None else content
+        return f"- {text} (tags: {', '.join(memory.get_tags())})"
     
     def _build_context_from_memories(self, memories: List[Memory]) -> str:
         """Build context string from memories."""
         if not memories:
-            return "No relevant patient history available."
+            return self.EMPTY_CONTEXT
         
         context_parts = []
         for memory in memories:
-            context_parts.append(f"- {memory.content} (tags: {', '.join(memory.get_tags())})")
+            context_parts.append(self._format_memory(memory))
         
         return "\n".join(context_parts)
     
@@ -137,159 +125,366 @@ Do not mention radiology results, billing information, or other restricted data.
         
         return zone_prompts.get(zone, "You are a clinical assistant. Use only the provided context.")
     
-    def _pre_inference_hook(self, session_id: str, prompt: str) -> Tuple[List[Memory], bool, Optional[str]]:
-        """LCAC pre-inference hook: validate session and gather allowed memories."""
+    def _pre_inference_hook(self, ctx: InferenceContext) -> List[Memory]:
+        """LCAC pre-inference hook: load and validate the session, gather allowed memories."""
         from uuid import UUID
         try:
-            session_uuid = UUID(session_id) if isinstance(session_id, str) else session_id
+            session_uuid = UUID(ctx.session_id) if isinstance(ctx.session_id, str) else ctx.session_id
         except (ValueError, TypeError):
-            return [], False, "Invalid session ID format"
+            ctx.error = "Invalid session ID format"
+            return []
         # Check if session exists and is not revoked
-        session = self.db_session.get(SessionModel, session_uuid)
+        with ctx.stage("session_lookup"):
+            session = self.lcac.get_session_state(session_uuid)
         if not session:
-            return [], False, "Session not found"
+            ctx.error = "Session not found"
+            return []
         
-        if session.is_revoked():
-            return [], False, "Session has been revoked"
+        if session.revoked:
+            ctx.error = "Session has been revoked"
+            return []
         
-        # Get allowed memories for the zone
-        allowed_memories = self.lcac.get_allowed_memories(session.zone, session.user_id)
+        ctx.session = session
         
-        return allowed_memories, True, None
+        # Get allowed memories for the zone
+        with ctx.stage("allowed_memories"):
+            return self.lcac.get_allowed_memories(session.zone, session.user_id)
     
     def _post_inference_hook(
         self,
-        session_id: str,
-        prompt: str,
-        response: str,
-        used_memory_ids: List[str]
+        ctx: InferenceContext,
+        response: str
     ) -> Tuple[bool, Optional[str], Optional[str]]:
-        """LCAC post-inference hook: validate response for policy violations."""
-        from uuid import UUID
-        try:
-            session_uuid = UUID(session_id) if isinstance(session_id, str) else session_id
-        except (ValueError, TypeError):
-            return False, None, "Invalid session ID format"
-        session = self.db_session.get(SessionModel, session_uuid)
-        if not session:
-            return False, None, "Session not found"
+        """LCAC post-inference hook: validate response for policy violations.
+        
+        Trust and revocation changes are staged on the request's unit of work;
+        the caller commits them together with the audit record.
+        """
+        session = ctx.session
         
         # Validate inference
-        is_valid, violation_reason = self.lcac.validate_inference(
-            session.zone,
-            prompt,
-            response,
-            used_memory_ids
-        )
+        with ctx.stage("validate_inference"):
+            is_valid, violation_reason = self.lcac.validate_inference(
+                session.zone,
+                ctx.message,
+                response,
+                ctx.used_memory_ids,
+                ctx.used_memories
+            )
         
         if not is_valid:
-            # Record violation
-            self.trust_engine.record_violation(session.user_id, violation_reason)
-            
-            # Revoke session if violation is severe
-            self.lcac.revoke_session(session_id, violation_reason)
+            policy_violations.inc(zone_label(session.zone))
+            with ctx.stage("trust_update"):
+                # Record violation
+                self.trust_engine.record_violation(session.user_id, violation_reason, commit=False)
+                
+                # Revoke session if violation is severe
+                from uuid import UUID
+                session_uuid = UUID(ctx.session_id) if isinstance(ctx.session_id, str) else ctx.session_id
+                session_row = self.db_session.get(SessionModel, session_uuid)
+                self.lcac.mark_session_revoked(session_row, violation_reason)
             
             return False, violation_reason, "Session revoked due to policy violation"
         
         # Record success
-        self.trust_engine.record_success(session.user_id)
+        with ctx.stage("trust_update"):
+            self.trust_engine.record_success(session.user_id, commit=False)
         
         return True, None, None
     
-    def process_query(self, session_id: str, message: str) -> Dict:
-        """Process a query through the orchestrator with LCAC enforcement."""
+    def _build_messages(self, zone: str, context: str, message: str) -> List:
+        """Build the LLM message list for the configured provider."""
+        system_prompt = self._build_system_prompt(zone)
+        if self.llm_provider == "gemini":
+            # Gemini doesn't use SystemMessage the same way, so we include it in the user message
+            user_content = f"{system_prompt}\n\nPatient Context:\n{context}\n\nUser Query: {message}"
+            return [HumanMessage(content=user_content)]
+        # OpenAI uses SystemMessage
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Patient Context:\n{context}\n\nUser Query: {message}")
+        ]
+    
+    def _fallback_response(self) -> str:
+        """Response returned when no LLM is configured."""
+        return llm_registry.unavailable_message(self.llm_provider)
+    
+    @staticmethod
+    def _response_text(ai_response) -> str:
+        """Extract text content from an LLM response."""
+        return ai_response.content if hasattr(ai_response, 'content') else str(ai_response)
+    
+    @property
+    def llm_model(self) -> str:
+        """Model name of the configured provider."""
+        return llm_registry.model_for(self.llm_provider)
+    
+    def _call_llm(self, ctx: InferenceContext) -> str:
+        """Call the LLM synchronously."""
+        if not self.llm:
+            ctx.llm_failed = True
+            return self._fallback_response()
+        try:
+            with ctx.stage("llm"):
+                return self._response_text(self.llm.invoke(ctx.messages))
+        except Exception as e:
+            ctx.llm_failed = True
+            return f"Error processing query with {self.llm_provider}: {str(e)}"
+    
+    async def _acall_llm(self, ctx: InferenceContext) -> str:
+        """Call the LLM without blocking the event loop."""
+        if not self.llm:
+            ctx.llm_failed = True
+            return self._fallback_response()
+        try:
+            with ctx.stage("llm"):
+                return self._response_text(await self.llm.ainvoke(ctx.messages))
+        except Exception as e:
+            ctx.llm_failed = True
+            return f"Error processing query with {self.llm_provider}: {str(e)}"
+    
+    def _cached_response(self, ctx: InferenceContext) -> Optional[str]:
+        """Look up a cached response for this exact prompt and context."""
+        if ctx.cache_key is None:
+            return None
+        response = response_cache.get(ctx.cache_key)
+        ctx.cached = response is not None
+        return response
+    
+    def _cache_response(self, ctx: InferenceContext, response: str, result: Dict):
+        """Cache a fresh response that passed the post-inference check."""
+        if ctx.cache_key is None or ctx.cached or ctx.llm_failed or not result["success"]:
+            return
+        response_cache.put(ctx.cache_key, response, ctx.zone, ctx.used_memory_ids)
+    
+    def _prepare_inference(self, session_id: str, message: str) -> InferenceContext:
+        """Run the pre-inference hook and build LLM messages.
+        
+        Returns the request context; ``ctx.error`` is set when the request must
+        be rejected before calling the LLM.
+        """
+        ctx = InferenceContext(session_id=session_id, message=message)
+        
         # Pre-inference hook
-        allowed_memories, is_valid, error = self._pre_inference_hook(session_id, message)
+        allowed_memories = self._pre_inference_hook(ctx)
+        if ctx.error:
+            observe_stages(ctx.timings, ctx.zone, self.llm_provider)
+            return ctx
         
-        if not is_valid:
-            return {
-                "success": False,
-                "error": error,
-                "response": None,
-                "audit_id": None,
-                "used_memory_ids": []
-            }
+        with ctx.stage("context_build"):
+            self._build_context(ctx, allowed_memories)
+        return ctx
+    
+    def _build_context(self, ctx: InferenceContext, allowed_memories: List[Memory]):
+        """Rank and pack allowed memories into the LLM messages and derive the cache key."""
+        message = ctx.message
         
-        # Build context from memories
-        context = self._build_context_from_memories(allowed_memories)
+        # Retrieval: rank allowed memories by relevance to the message
+        ranked = memory_retriever.rank(ctx.zone, allowed_memories, message) if allowed_memories else []
+        if settings.retrieval_top_k > 0:
+            ctx.retrieval_cut = max(0, len(ranked) - settings.retrieval_top_k)
+            ranked = ranked[:settings.retrieval_top_k]
         
-        # Get session for zone
-        from uuid import UUID
+        # Pack the highest-priority memories into what the token budget leaves
+        fixed_tokens = sum(
+            estimate_tokens(m.content) for m in self._build_messages(ctx.zone, "", message)
+        )
+        budget = resolve_token_budget(self.llm_provider, ctx.zone)
+        packed = self.context_packer.pack(ranked, max(0, budget - fixed_tokens))
+        
+        ctx.used_memories = packed.packed
+        # The top-k cut is only counted: in a large zone it would list most of the zone
+        ctx.dropped_memory_ids = [str(memory.id) for memory in packed.dropped]
+        ctx.messages = self._build_messages(ctx.zone, packed.context, message)
+        if settings.response_cache_enabled:
+            ctx.cache_key = response_cache.make_key(
+                self.llm_provider,
+                self.llm_model,
+                ctx.zone,
+                self._build_system_prompt(ctx.zone),
+                [memory.content_hash for memory in ctx.used_memories],
+                message
+            )
+    
+    def _complete_inference(
+        self,
+        ctx: InferenceContext,
+        response: str,
+        violation_offset: Optional[int] = None
+    ) -> Dict:
+        """Run the post-inference hook and write the audit record in one transaction."""
+        used_memory_ids = ctx.used_memory_ids
         try:
-            session_uuid = UUID(session_id) if isinstance(session_id, str) else session_id
-        except (ValueError, TypeError):
-            return {
-                "success": False,
-                "error": "Invalid session ID format",
-                "response": None,
-                "audit_id": None
-            }
-        session = self.db_session.get(SessionModel, session_uuid)
-        if not session:
-            return {
-                "success": False,
-                "error": "Session not found",
-                "response": None,
-                "audit_id": None
-            }
-        system_prompt = self._build_system_prompt(session.zone)
+            # Post-inference hook
+            is_valid, violation_reason, revoke_reason = self._post_inference_hook(ctx, response)
+            
+            # Create audit record
+            with ctx.stage("audit_commit"):
+                audit = self.lcac.create_audit_record(
+                    ctx.session_id,
+                    ctx.message,
+                    response,
+                    used_memory_ids,
+                    not is_valid,
+                    violation_reason,
+                    violation_offset if not is_valid else None,
+                    ctx.dropped_memory_ids,
+                    ctx.cached,
+                    commit=False,
+                    atomic=bool(revoke_reason)  # Revocation and its audit row commit together
+                )
+                audit_id = str(audit.id)
+                
+                self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+        observe_stages(ctx.timings, ctx.zone, self.llm_provider)
         
-        # Build full prompt
-        full_prompt = f"""{system_prompt}
-
-Patient Context:
-{context}
+        return {
+            "success": is_valid,
+            "error": violation_reason or revoke_reason,
+            "response": response,
+            "audit_id": audit_id,
+            "used_memory_ids": used_memory_ids,
+            "dropped_memory_ids": ctx.dropped_memory_ids,
+            "retrieval_cut_count": ctx.retrieval_cut,
+            "session_revoked": bool(revoke_reason),
+            "cached": ctx.cached
+        }
+    
+    def process_query(self, session_id: str, message: str) -> Dict:
+        """Process a query through the orchestrator with LCAC enforcement."""
+        ctx = self._prepare_inference(session_id, message)
+        if ctx.error:
+            return ctx.error_result()
+        
+        response = self._cached_response(ctx)
+        if response is None:
+            response = self._call_llm(ctx)
+        
+        result = self._complete_inference(ctx, response)
+        self._cache_response(ctx, response, result)
+        return result
 
-User Query: {message}
 
-Please provide a helpful response based on the patient context above. Do not reference any information outside of the provided context."""
+class AsyncTriageOrchestrator(TriageOrchestrator):
+    """Orchestrator variant that awaits the LLM and database on the event loop.
+    
+    LCAC hooks run unchanged through ``AsyncSession.run_sync``, so the pre- and
+    post-inference semantics are shared with ``TriageOrchestrator``. No
+    database connection is held while the LLM is awaited: the session is
+    closed after the pre-inference phase and the post-inference phase checks
+    out a connection of its own, so in-flight requests are not capped by the
+    connection pool size.
+    """
+    
+    def __init__(self, db_session: AsyncSession):
+        super().__init__(db_session.sync_session)
+        self.async_db_session = db_session
+    
+    async def aprepare_inference(self, session_id: str, message: str) -> InferenceContext:
+        """Async wrapper around the pre-inference hook and message building.
         
-        # Call LLM
+        Ends the read transaction and returns its connection to the pool; the
+        loaded memories stay usable (closing detaches without expiring them).
+        """
         try:
-            if not self.llm:
-                # Fallback response if LLM not configured
-                provider_name = "OpenAI" if self.llm_provider == "openai" else "Gemini"
-                api_key_var = "OPENAI_API_KEY" if self.llm_provider == "openai" else "GEMINI_API_KEY"
-                response = f"LLM not configured. Please set {api_key_var} environment variable for {provider_name}."
-            else:
-                # Build messages - handle system message differently for Gemini
-                if self.llm_provider == "gemini":
-                    # Gemini doesn't use SystemMessage the same way, so we include it in the user message
-                    user_content = f"{system_prompt}\n\nPatient Context:\n{context}\n\nUser Query: {message}"
-                    messages = [HumanMessage(content=user_content)]
-                else:
-                    # OpenAI uses SystemMessage
-                    messages = [
-                        SystemMessage(content=system_prompt),
-                        HumanMessage(content=f"Patient Context:\n{context}\n\nUser Query: {message}")
-                    ]
-                
-                ai_response = self.llm.invoke(messages)
-                response = ai_response.content if hasattr(ai_response, 'content') else str(ai_response)
-        except Exception as e:
-            response = f"Error processing query with {self.llm_provider}: {str(e)}"
+            return await self.async_db_session.run_sync(
+                lambda _: self._prepare_inference(session_id, message)
+            )
+        finally:
+            await self.async_db_session.close()
+    
+    async def aprocess_query(self, session_id: str, message: str) -> Dict:
+        """Process a query without holding a worker thread during the LLM call."""
+        ctx = await self.aprepare_inference(session_id, message)
+        if ctx.error:
+            return ctx.error_result()
         
-        # Post-inference hook
-        used_memory_ids = [str(mem.id) for mem in allowed_memories]
-        is_valid, violation_reason, revoke_reason = self._post_inference_hook(
-            session_id, message, response, used_memory_ids
-        )
+        response = self._cached_response(ctx)
+        if response is None:
+            response = await self._acall_llm(ctx)
         
-        # Create audit record
-        audit = self.lcac.create_audit_record(
-            session_id,
-            message,
-            response,
-            used_memory_ids,
-            not is_valid,
-            violation_reason
+        result = await self.async_db_session.run_sync(
+            lambda _: self._complete_inference(ctx, response)
         )
+        self._cache_response(ctx, response, result)
+        return result
+    
+    async def _astream_llm(self, ctx: InferenceContext) -> AsyncIterator[str]:
+        """Stream LLM text chunks; closing this generator cancels the upstream call."""
+        cached = self._cached_response(ctx)
+        if cached is not None:
+            yield cached
+            return
+        if not self.llm:
+            ctx.llm_failed = True
+            yield self._fallback_response()
+            return
+        stream = self.llm.astream(ctx.messages)
+        try:
+            with ctx.stage("llm"):  # Includes time the consumer spends between chunks
+                async for chunk in stream:
+                    text = self._response_text(chunk)
+                    if text:
+                        yield text
+        except Exception as e:
+            ctx.llm_failed = True
+            yield f"Error processing query with {self.llm_provider}: {str(e)}"
+        finally:
+            await stream.aclose()
+    
+    async def astream_inference(self, ctx: InferenceContext) -> AsyncIterator[Dict]:
+        """Stream a prepared inference with incremental LCAC content checks.
         
-        return {
-            "success": is_valid,
-            "error": violation_reason or revoke_reason,
-            "response": response,
-            "audit_id": str(audit.id),
-            "used_memory_ids": used_memory_ids,
-            "session_revoked": bool(revoke_reason)
-        }
\ No newline at end of file
+        Yields ``{"event": "token", "text": ...}`` for text that cleared the
+        content scanner, then a final ``{"event": "done", ...}`` carrying the
+        same result dict as ``aprocess_query``. Generation is aborted as soon as
+        a disallowed pattern is seen; the audit row stores everything streamed
+        up to that point and the violation offset (into the raw response text).
+        
+        If the consumer stops early (client disconnect: the generator is closed
+        or cancelled), the text generated so far still goes through the
+        post-inference hook and is audited, shielded from the cancellation.
+        """
+        scanner = IncrementalScanner(self.lcac.policy.get_content_scanner(ctx.zone))
+        streamed = []
+        violation = None
+        audited = False
+        
+        try:
+            llm_stream = self._astream_llm(ctx)
+            try:
+                async for text in llm_stream:
+                    streamed.append(text)
+                    safe_text, violation = scanner.feed(text)
+                    if safe_text:
+                        yield {"event": "token", "text": safe_text}
+                    if violation:
+                        break
+            finally:
+                await llm_stream.aclose()
+            
+            if violation is None:
+                safe_text, violation = scanner.finish()
+                if safe_text:
+                    yield {"event": "token", "text": safe_text}
+            
+            audited = True
+            with anyio.CancelScope(shield=True):
+                result = await self._acomplete_stream(ctx, streamed, violation)
+            self._cache_response(ctx, "".join(streamed), result)
+            yield {"event": "done", **result}
+        finally:
+            if not audited:
+                # Partial output is never cached
+                with anyio.CancelScope(shield=True):
+                    await self._acomplete_stream(ctx, streamed, violation)
+    
+    async def _acomplete_stream(self, ctx: InferenceContext, streamed: List[str], violation) -> Dict:
+        response = "".join(streamed)
+        violation_offset = violation[1] if violation else None
+        return await self.async_db_session.run_sync(
+            lambda _: self._complete_inference(ctx, response, violation_offset)
+        )
@@ -0,0 +1,233 @@
+"""On-demand profiling of live ``/ask`` requests.
+
+Two surfaces, both behind the API key:
+
+- Per request: ``X-Profile: cprofile|sample`` (or ``?profile=...``) on
+  ``POST /ask`` profiles that request's orchestrator run. The result is kept
+  in a small in-memory ring and its ID returned in ``X-Profile-Id``; fetch it
+  from ``GET /profiling/{profile_id}``. ``cprofile`` yields a pstats report
+  sorted by cumulative time, ``sample`` collapsed stacks.
+- Windowed: ``POST /profiling/window`` samples ``percent`` of ``/ask``
+  requests for ``seconds`` and returns their merged collapsed stacks.
+
+Collapsed stacks are ``frame;frame;frame count`` lines (root first), the input
+format of flamegraph.pl, speedscope and similar viewers, so no outside
+service is needed.
+
+Both modes observe the worker's event loop thread, not the request alone.
+Samples are taken from that thread every ``profiling_sample_interval_ms`` by a
+background thread, and ``cprofile`` hooks the thread for the duration of the
+request, so while a profiled request awaits the LLM every other coroutine the
+loop runs is counted too, and idle time appears as the selector wait. pstats
+reports say so in their first line; profile under low concurrency for
+per-request numbers.
+"""
+
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from uuid import uuid4
+
+from app.config import settings
+
+PROFILE_MODES = ("cprofile", "sample")
+PSTATS_LINES = 60
+PSTATS_SCOPE_NOTE = (
+    "Worker-wide profile of the event loop thread over {seconds:.3f}s: "
+    "includes every coroutine run while this request was in flight\n"
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{code.co_firstlineno}".replace(";", ":").replace(" ", "_")
+
+
+def collapse_stack(frame) -> str:
+    """Semicolon-joined frame labels from the outermost frame to ``frame``."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def format_collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class StackSampler:
+    """Background thread counting the stacks of one target thread at a fixed interval.
+    
+    Samples are only recorded while ``active`` is positive, so a long-running
+    sampler can cover several overlapping requests without counting idle time.
+    """
+    
+    def __init__(self, thread_id: int, interval: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = interval or settings.profiling_sample_interval_ms / 1000
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.active = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.active <= 0:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse_stack(frame)] += 1
+                self.samples += 1
+    
+    def collapsed(self) -> str:
+        return format_collapsed(self.counts)
+
+
+class ProfileWindow:
+    """A time window during which a fraction of requests is sampled into one profile."""
+    
+    def __init__(self, percent: float, seconds: float, thread_id: int):
+        self.fraction = percent / 100
+        self.ends_at = time.monotonic() + seconds
+        self.sampler = StackSampler(thread_id).start()
+        self.requests = 0
+        self.sampled_requests = 0
+    
+    def is_open(self) -> bool:
+        return time.monotonic() < self.ends_at
+    
+    def should_sample(self) -> bool:
+        self.requests += 1
+        if random.random() >= self.fraction:
+            return False
+        self.sampled_requests += 1
+        return True
+
+
+class ProfileCapture:
+    """Handle yielded by ``Profiler.profile``; ``profile_id`` is set when the profile was stored."""
+    
+    def __init__(self, mode: Optional[str]):
+        self.mode = mode
+        self.profile_id: Optional[str] = None
+
+
+class Profiler:
+    """Per-request and windowed profiling for the current worker process."""
+    
+    def __init__(self, max_stored: Optional[int] = None):
+        self.max_stored = max_stored or settings.profiling_max_stored
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._window: Optional[ProfileWindow] = None
+        self._cprofile_lock = threading.Lock()  # One cProfile hook per thread at a time
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def requested_mode(header: Optional[str], query: Optional[str]) -> Optional[str]:
+        """Profile mode asked for by a request, or None. Raises ValueError for unknown modes."""
+        mode = (header or query or "").strip().lower()
+        if not mode or not settings.profiling_enabled:
+            return None
+        if mode in ("1", "true"):
+            return "sample"
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Options: {', '.join(PROFILE_MODES)}")
+        return mode
+    
+    @asynccontextmanager
+    async def profile(self, mode: Optional[str] = None):
+        """Profile the enclosed block if ``mode`` is set or an open window samples it."""
+        capture = ProfileCapture(mode)
+        if mode is not None:
+            async with self._profile_request(capture):
+                yield capture
+            return
+        
+        window = self._window
+        if window is None or not window.is_open() or not window.should_sample():
+            yield capture
+            return
+        window.sampler.active += 1
+        try:
+            yield capture
+        finally:
+            window.sampler.active -= 1
+    
+    @asynccontextmanager
+    async def _profile_request(self, capture: ProfileCapture):
+        started = time.perf_counter()
+        profile = None
+        if capture.mode == "cprofile" and self._cprofile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+        else:
+            capture.mode = "sample"  # Also when another request on this worker holds cProfile
+        
+        sampler = None
+        if profile is not None:
+            profile.enable()
+        else:
+            sampler = StackSampler(threading.get_ident())
+            sampler.active = 1
+            sampler.start()
+        try:
+            yield capture
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._cprofile_lock.release()
+                output = io.StringIO()
+                pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(PSTATS_LINES)
+                text = PSTATS_SCOPE_NOTE.format(seconds=time.perf_counter() - started) + output.getvalue()
+            else:
+                sampler.stop()
+                text = sampler.collapsed()
+            capture.profile_id = self._store(capture.mode, text, time.perf_counter() - started)
+    
+    def _store(self, mode: str, text: str, seconds: float) -> str:
+        profile_id = str(uuid4())
+        with self._lock:
+            self._profiles[profile_id] = {"mode": mode, "text": text, "seconds": seconds}
+            while len(self._profiles) > self.max_stored:
+                self._profiles.popitem(last=False)
+        return profile_id
+    
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+    
+    def open_window(self, percent: float, seconds: float) -> ProfileWindow:
+        """Start sampling ``percent`` of requests on this (event loop) thread. Raises RuntimeError if one is open."""
+        with self._lock:
+            if self._window is not None:
+                raise RuntimeError("A profiling window is already open")
+            self._window = ProfileWindow(percent, seconds, threading.get_ident())
+            return self._window
+    
+    def close_window(self, window: ProfileWindow) -> str:
+        """Stop the window's sampler and return its collapsed stacks."""
+        with self._lock:
+            if self._window is window:
+                self._window = None
+        window.sampler.stop()
+        return window.sampler.collapsed()
+
+
+profiler = Profiler()
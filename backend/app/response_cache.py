@@ -0,0 +1,167 @@
+"""LRU/TTL cache of LLM responses for repeated queries.
+
+Keys cover everything that shapes the LLM call: provider, model, zone, system
+prompt, the ``content_hash`` of every memory packed into the context, and the
+normalized user message. Entries are dropped when they expire, when the cache
+exceeds its entry or byte limits (least recently used first), and when a
+memory of their zone is created or one of their memories is redacted, in any
+worker process (``zone``/``memory`` events on ``app.invalidation_bus``).
+
+Cached responses are only served by the orchestrator, which still runs the
+post-inference LCAC check and writes an audit row for every hit.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+from app.content_scanner import normalize_text
+from app.metrics import register_cache
+from app.invalidation_bus import MEMORY, RESET, ZONE, invalidation_bus
+
+
+@dataclass
+class CacheEntry:
+    response: str
+    zone: str
+    memory_ids: Tuple[str, ...]
+    expires_at: float
+    size: int
+
+
+def normalize_message(message: str) -> str:
+    """Case- and whitespace-insensitive form of a user message."""
+    return " ".join(normalize_text(message).split())
+
+
+class ResponseCache:
+    """Thread-safe LRU response cache with a TTL and entry/byte limits."""
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self.max_bytes = max_bytes or settings.response_cache_max_bytes
+        self.ttl_seconds = ttl_seconds or settings.response_cache_ttl_seconds
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_memory: Dict[str, Set[str]] = {}
+        self._by_zone: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+    
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        zone: str,
+        system_prompt: str,
+        memory_content_hashes: Iterable[str],
+        message: str
+    ) -> str:
+        """Cache key for one fully specified LLM call."""
+        context_hash = hashlib.sha256("\n".join(memory_content_hashes).encode()).hexdigest()
+        parts = [provider, model, zone, system_prompt, context_hash, normalize_message(message)]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a live cached response and mark it most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.response
+    
+    def put(self, key: str, response: str, zone: str, memory_ids: Iterable[str]):
+        """Store a response, evicting least recently used entries beyond the limits."""
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        entry = CacheEntry(
+            response=response,
+            zone=zone,
+            memory_ids=tuple(str(memory_id) for memory_id in memory_ids),
+            expires_at=time.monotonic() + self.ttl_seconds,
+            size=size
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            self._by_zone.setdefault(zone, set()).add(key)
+            for memory_id in entry.memory_ids:
+                self._by_memory.setdefault(memory_id, set()).add(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+    
+    def invalidate_memory(self, memory_id: str) -> int:
+        """Drop every entry whose context included ``memory_id``."""
+        with self._lock:
+            keys = self._by_memory.pop(str(memory_id), set())
+            return self._invalidate(keys)
+    
+    def invalidate_zone(self, zone: str) -> int:
+        """Drop every entry for ``zone`` (e.g. after a memory was added to it)."""
+        with self._lock:
+            keys = self._by_zone.pop(zone, set())
+            return self._invalidate(keys)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_memory.clear()
+            self._by_zone.clear()
+            self._bytes = 0
+    
+    def _invalidate(self, keys: Set[str]) -> int:
+        removed = 0
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+                removed += 1
+        self.stats["invalidations"] += removed
+        return removed
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        zone_keys = self._by_zone.get(entry.zone)
+        if zone_keys is not None:
+            zone_keys.discard(key)
+            if not zone_keys:
+                del self._by_zone[entry.zone]
+        for memory_id in entry.memory_ids:
+            memory_keys = self._by_memory.get(memory_id)
+            if memory_keys is not None:
+                memory_keys.discard(key)
+                if not memory_keys:
+                    del self._by_memory[memory_id]
+
+
+response_cache = ResponseCache()
+register_cache("response", response_cache)
+invalidation_bus.subscribe(MEMORY, lambda key, payload: response_cache.invalidate_memory(key))
+invalidation_bus.subscribe(ZONE, lambda key, payload: response_cache.invalidate_zone(key))
+invalidation_bus.subscribe(RESET, lambda key, payload: response_cache.clear())
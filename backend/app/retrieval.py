@@ -0,0 +1,176 @@
+"""Relevance-ranked memory retrieval with in-process BM25 indexes per zone."""
+
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models import Memory
+from app.config import settings
+from app.content_scanner import normalize_text
+from app.invalidation_bus import MEMORY, invalidation_bus
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized word tokens."""
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+class BM25Index:
+    """Incremental inverted index with Okapi BM25 scoring."""
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> {doc_id: term frequency}
+        self.doc_terms: Dict[str, Counter] = {}  # doc_id -> term frequencies (for removal)
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_terms
+    
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+    
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing any previous version."""
+        terms = Counter(tokenize(text))
+        with self.lock:
+            self._remove(doc_id)
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+    
+    def remove(self, doc_id: str):
+        """Drop a document from the index."""
+        with self.lock:
+            self._remove(doc_id)
+    
+    def _remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+    
+    def search(self, query: str, top_k: int, candidates: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to ``top_k`` (doc_id, score) pairs with a positive score."""
+        query_terms = set(tokenize(query))
+        with self.lock:
+            doc_count = len(self.doc_terms)
+            if not doc_count or not query_terms:
+                return []
+            avg_length = self.total_length / doc_count
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    if candidates is not None and doc_id not in candidates:
+                        continue
+                    length = self.doc_lengths[doc_id]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+
+class BaseRetriever(ABC):
+    """Interface shared by the BM25 and vector memory retrievers."""
+    
+    @abstractmethod
+    def index_memory(self, memory: Memory):
+        """Add a memory to its zone index."""
+    
+    @abstractmethod
+    def remove_memory(self, memory_id: str, zone: Optional[str] = None):
+        """Drop a memory from the index."""
+    
+    @abstractmethod
+    def rank(self, zone: str, memories: List[Memory], query: str) -> List[Tuple[Memory, float]]:
+        """Return every memory as (memory, score), most relevant first."""
+    
+    @staticmethod
+    def _with_recency_fill(by_id: Dict[str, Memory], ranked: List[Tuple[str, float]]) -> List[Tuple[Memory, float]]:
+        """Append unmatched memories, most recent first, after the scored ones."""
+        scored = [(by_id[doc_id], score) for doc_id, score in ranked]
+        matched = {doc_id for doc_id, _ in ranked}
+        rest = sorted(
+            (memory for doc_id, memory in by_id.items() if doc_id not in matched),
+            key=lambda memory: memory.created_at,
+            reverse=True
+        )
+        return scored + [(memory, 0.0) for memory in rest]
+
+
+class MemoryRetriever(BaseRetriever):
+    """Process-wide registry of per-zone BM25 indexes over memory content."""
+    
+    def __init__(self):
+        self._indexes: Dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+    
+    def _zone_index(self, zone: str) -> BM25Index:
+        with self._lock:
+            index = self._indexes.get(zone)
+            if index is None:
+                index = self._indexes[zone] = BM25Index()
+            return index
+    
+    def index_memory(self, memory: Memory):
+        """Add a memory to its zone index (called on create)."""
+        if not memory.redacted:
+            self._zone_index(memory.zone).add(str(memory.id), memory.content)
+    
+    def remove_memory(self, memory_id: str, zone: Optional[str] = None):
+        """Drop a memory from the index (called on redaction)."""
+        with self._lock:
+            indexes = [self._indexes[zone]] if zone in self._indexes else list(self._indexes.values())
+        for index in indexes:
+            index.remove(str(memory_id))
+    
+    def _ensure_indexed(self, index: BM25Index, memories: Iterable[Memory]):
+        # Lazily index memories created before startup or by another worker
+        for memory in memories:
+            if str(memory.id) not in index:
+                index.add(str(memory.id), memory.content)
+    
+    def rank(self, zone: str, memories: List[Memory], query: str) -> List[Tuple[Memory, float]]:
+        """Score every allowed memory against the query, best first."""
+        index = self._zone_index(zone)
+        self._ensure_indexed(index, memories)
+        by_id = {str(memory.id): memory for memory in memories}
+        ranked = index.search(query, len(by_id), candidates=set(by_id))
+        return self._with_recency_fill(by_id, ranked)
+
+
+def create_retriever() -> BaseRetriever:
+    """Create the retriever selected by settings.retrieval_backend."""
+    backend = settings.retrieval_backend.lower()
+    if backend == "vector":
+        from app.vector_store import VectorMemoryRetriever
+        return VectorMemoryRetriever()
+    if backend != "bm25":
+        print(f"Warning: Unknown retrieval backend '{backend}'. Supported: 'bm25', 'vector'")
+    return MemoryRetriever()
+
+
+memory_retriever = create_retriever()
+# Redactions in other worker processes drop the memory from this worker's index too
+invalidation_bus.subscribe(MEMORY, lambda key, payload: memory_retriever.remove_memory(key, payload.get("zone")))
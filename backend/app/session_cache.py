@@ -0,0 +1,100 @@
+"""LRU/TTL cache of session state for the pre-inference hook.
+
+``/ask`` only needs a session's zone, user and whether it is revoked, so
+``LCACEngine.get_session_state`` serves those from this cache instead of a
+primary-key lookup per request. Revocation is the only state change a session
+goes through and it is permanent, so:
+
+- Revoked sessions are cached like any other; the flag can never go stale.
+- ``LCACEngine.mark_session_revoked`` publishes a ``session`` event on the
+  invalidation bus, which drops the entry in this process as soon as the
+  revocation commits; entries loaded from the database while an
+  invalidation was in flight are not stored (``generation`` check), so a
+  revocation takes effect in this process with no staleness window.
+- Other worker processes drop the entry when their bus poller sees the
+  event (``invalidation_poll_interval_ms``), and in any case once it expires
+  after ``session_cache_ttl_seconds``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from app.config import settings
+from app.metrics import register_cache
+from app.invalidation_bus import RESET, SESSION, invalidation_bus
+
+
+@dataclass(frozen=True)
+class SessionState:
+    zone: str
+    user_id: str
+    revoked: bool
+    
+    @classmethod
+    def from_session(cls, session) -> "SessionState":
+        return cls(zone=session.zone, user_id=session.user_id, revoked=session.is_revoked())
+
+
+class SessionStateCache:
+    """Thread-safe LRU session state cache with a TTL."""
+    
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or settings.session_cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.session_cache_ttl_seconds
+        self._entries: "OrderedDict[UUID, Tuple[SessionState, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by every invalidation
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, session_id: UUID) -> Optional[SessionState]:
+        """Return live cached state and mark it most recently used."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            state, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[session_id]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.stats["hits"] += 1
+            return state
+    
+    def put(self, session_id: UUID, state: SessionState, generation: int):
+        """Store state read from the database, unless an invalidation happened since ``generation`` was read."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[session_id] = (state, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(session_id)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def invalidate(self, session_id: UUID):
+        with self._lock:
+            self.generation += 1
+            if self._entries.pop(session_id, None) is not None:
+                self.stats["invalidations"] += 1
+    
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+session_cache = SessionStateCache()
+register_cache("session", session_cache)
+invalidation_bus.subscribe(SESSION, lambda key, payload: session_cache.invalidate(UUID(key)))
+invalidation_bus.subscribe(RESET, lambda key, payload: session_cache.clear())
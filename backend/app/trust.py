@@ -1,82 +1,136 @@
 """Trust scoring engine for LCAC."""
 
 from sqlmodel import Session, select
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from app.models import TrustScore
 from app.config import settings
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
+
+# Dialects with INSERT ... ON CONFLICT support
+UPSERT_DIALECTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+
+def _clamp(value: float) -> float:
+    return min(settings.trust_score_max, max(settings.trust_score_min, value))
 
 
 class TrustEngine:
-    """Trust scoring engine."""
+    """Trust scoring engine.
+    
+    Updates are single atomic upserts with the clamping done in SQL, so
+    concurrent requests for the same user never lose an update. Dialects
+    without ``INSERT ... ON CONFLICT`` get the same guarantee from an atomic
+    ``UPDATE`` followed, when no row matched, by an ``INSERT`` in a savepoint
+    that falls back to the ``UPDATE`` if a concurrent request inserted first.
+    """
     
     def __init__(self, db_session: Session):
         self.db_session = db_session
     
+    def _write(self, user_id: str, insert_values: Dict, update_values: Optional[Dict] = None):
+        """Insert the user's row, or apply ``update_values`` to it if it exists; return the row.
+        
+        Without ``update_values`` an existing row is left as it is.
+        """
+        table = TrustScore.__table__
+        upsert = UPSERT_DIALECTS.get(self.db_session.get_bind().dialect.name)
+        if upsert is not None:
+            statement = upsert(table).values(user_id=user_id, **insert_values)
+            if update_values is None:
+                statement = statement.on_conflict_do_nothing(index_elements=[table.c.user_id])
+                self.db_session.execute(statement)
+            else:
+                statement = statement.on_conflict_do_update(index_elements=[table.c.user_id], set_=update_values)
+                return self.db_session.execute(statement.returning(*table.c)).one()
+        else:
+            existing = update(table).where(table.c.user_id == user_id)
+            if update_values is None or not self.db_session.execute(existing.values(**update_values)).rowcount:
+                try:
+                    with self.db_session.begin_nested():
+                        self.db_session.execute(insert(table).values(user_id=user_id, **insert_values))
+                except IntegrityError:
+                    # Inserted concurrently; the row exists now
+                    if update_values is not None:
+                        self.db_session.execute(existing.values(**update_values))
+        return self.db_session.execute(select(table).where(table.c.user_id == user_id)).one()
+    
+    def _upsert(
+        self,
+        user_id: str,
+        score_delta: float,
+        violations: int = 0,
+        successes: int = 0,
+        commit: bool = True
+    ) -> TrustScore:
+        """Apply a clamped score delta and counter increments in one statement."""
+        table = TrustScore.__table__
+        now = datetime.utcnow()
+        new_score = table.c.score + score_delta
+        clamped_score = case(
+            (new_score > settings.trust_score_max, settings.trust_score_max),
+            (new_score < settings.trust_score_min, settings.trust_score_min),
+            else_=new_score
+        )
+        row = self._write(
+            user_id,
+            {
+                "score": _clamp(settings.trust_score_initial + score_delta),
+                "last_updated": now,
+                "violation_count": violations,
+                "successful_inferences": successes,
+            },
+            {
+                "score": clamped_score,
+                "last_updated": now,
+                "violation_count": table.c.violation_count + violations,
+                "successful_inferences": table.c.successful_inferences + successes,
+            }
+        )
+        if commit:
+            self.db_session.commit()
+        
+        return TrustScore(**row._mapping)
+    
     def get_trust_score(self, user_id: str) -> TrustScore:
         """Get or create trust score for a user."""
         trust_score = self.db_session.get(TrustScore, user_id)
         
         if not trust_score:
-            trust_score = TrustScore(
-                user_id=user_id,
-                score=settings.trust_score_initial,
-                violation_count=0,
-                successful_inferences=0
-            )
-            self.db_session.add(trust_score)
+            self._write(user_id, {
+                "score": settings.trust_score_initial,
+                "last_updated": datetime.utcnow(),
+                "violation_count": 0,
+                "successful_inferences": 0,
+            })
             self.db_session.commit()
-            self.db_session.refresh(trust_score)
+            trust_score = self.db_session.get(TrustScore, user_id)
         
         return trust_score
     
-    def record_violation(self, user_id: str, reason: Optional[str] = None) -> TrustScore:
+    def record_violation(self, user_id: str, reason: Optional[str] = None, commit: bool = True) -> TrustScore:
         """Record a policy violation and decrease trust score."""
-        trust_score = self.get_trust_score(user_id)
-        
-        # Decrease score
-        trust_score.score = max(
-            settings.trust_score_min,
-            trust_score.score - settings.trust_score_violation_penalty
-        )
-        trust_score.violation_count += 1
-        trust_score.last_updated = datetime.utcnow()
-        
-        self.db_session.add(trust_score)
-        self.db_session.commit()
-        self.db_session.refresh(trust_score)
-        
-        return trust_score
+        return self._upsert(user_id, -settings.trust_score_violation_penalty, violations=1, commit=commit)
     
-    def record_success(self, user_id: str) -> TrustScore:
+    def record_success(self, user_id: str, commit: bool = True) -> TrustScore:
         """Record a successful inference and slightly increase trust score."""
-        trust_score = self.get_trust_score(user_id)
-        
-        # Increase score (with cap)
-        trust_score.score = min(
-            settings.trust_score_max,
-            trust_score.score + settings.trust_score_success_bonus
-        )
-        trust_score.successful_inferences += 1
-        trust_score.last_updated = datetime.utcnow()
-        
-        self.db_session.add(trust_score)
-        self.db_session.commit()
-        self.db_session.refresh(trust_score)
-        
-        return trust_score
+        return self._upsert(user_id, settings.trust_score_success_bonus, successes=1, commit=commit)
     
     def reset_trust_score(self, user_id: str) -> TrustScore:
         """Reset trust score to initial value."""
-        trust_score = self.get_trust_score(user_id)
-        trust_score.score = settings.trust_score_initial
-        trust_score.violation_count = 0
-        trust_score.successful_inferences = 0
-        trust_score.last_updated = datetime.utcnow()
-        
-        self.db_session.add(trust_score)
+        values = {
+            "score": settings.trust_score_initial,
+            "last_updated": datetime.utcnow(),
+            "violation_count": 0,
+            "successful_inferences": 0,
+        }
+        row = self._write(user_id, values, values)
         self.db_session.commit()
-        self.db_session.refresh(trust_score)
         
-        return trust_score
-
+        return TrustScore(**row._mapping)
@@ -0,0 +1,357 @@
+"""Embedded, memory-mapped vector store for semantic memory retrieval.
+
+Each zone gets a directory holding an append-only record file (memory ID +
+normalized float32 embedding per record) and an append-only tombstone file of
+redacted IDs. Records are read through ``numpy.memmap``, so opening a store
+costs a ``stat`` call and the OS pages vectors in on demand. A record left
+partial by a crash mid-append is cut off on open and before the next append,
+so later records stay aligned.
+"""
+
+import importlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from hashlib import sha1
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from app.config import settings
+from app.models import Memory
+from app.retrieval import BaseRetriever, tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: torn tails are still cut off, without locking out concurrent appends
+    fcntl = None
+
+_SAFE_ZONE_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class HashingEmbedder:
+    """Dependency-free embedder using the hashing trick over unigrams and bigrams."""
+    
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+    
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an (n, dim) float32 array of L2-normalized embeddings."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                bucket = h % self.dim
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            for bucket, value in counts.items():
+                # Sublinear term frequency
+                vectors[row, bucket] = math.copysign(1 + math.log(abs(value)), value) if value else 0.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+# Embedder name -> factory(dim). Local model wrappers can be registered here or
+# referenced as "package.module:ClassName" in settings.vector_embedder.
+EMBEDDERS: Dict[str, Callable[[int], object]] = {
+    "hashing": HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[[int], object]):
+    """Register a local embedder factory under a name."""
+    EMBEDDERS[name] = factory
+
+
+def create_embedder(name: str, dim: int):
+    """Create an embedder from a registered name or a "module:attr" path."""
+    if name in EMBEDDERS:
+        return EMBEDDERS[name](dim)
+    if ":" in name:
+        module_name, attr = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), attr)(dim)
+    raise ValueError(f"Unknown embedder '{name}'. Registered: {', '.join(EMBEDDERS)}")
+
+
+def _split_uuid(memory_id: str) -> Tuple[int, int]:
+    value = UUID(str(memory_id)).int
+    return value >> 64, value & 0xFFFFFFFFFFFFFFFF
+
+
+def _join_uuid(hi: int, lo: int) -> str:
+    return str(UUID(int=(int(hi) << 64) | int(lo)))
+
+
+class ZoneVectorStore:
+    """Append-only vector file for one zone, searched through a memory map."""
+    
+    RECORDS_FILE = "records.bin"
+    TOMBSTONES_FILE = "tombstones.bin"
+    META_FILE = "meta.json"
+    
+    def __init__(self, path: str, dim: int, embedder_name: str = "hashing"):
+        self.path = path
+        self.dim = dim
+        self.record_dtype = np.dtype([("hi", "<u8"), ("lo", "<u8"), ("vec", "<f4", (dim,))])
+        self.id_dtype = np.dtype([("hi", "<u8"), ("lo", "<u8")])
+        self._lock = threading.Lock()
+        self._records: Optional[np.memmap] = None
+        self._tombstones: Optional[np.ndarray] = None
+        self._tombstones_size = -1
+        self._id_index: Optional[np.ndarray] = None  # Sorted record IDs, 16 bytes each
+        self._indexed_count = 0
+        
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("dim") != dim or meta.get("embedder") != embedder_name:
+                raise ValueError(
+                    f"Vector store at {path} was built with {meta}; "
+                    f"configured dim={dim}, embedder={embedder_name}"
+                )
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim, "embedder": embedder_name}, f)
+        
+        if os.path.exists(self.records_path):
+            fd = os.open(self.records_path, os.O_WRONLY)
+            try:
+                self._cut_torn_tail(fd)
+            finally:
+                os.close(fd)
+    
+    @property
+    def records_path(self) -> str:
+        return os.path.join(self.path, self.RECORDS_FILE)
+    
+    @property
+    def tombstones_path(self) -> str:
+        return os.path.join(self.path, self.TOMBSTONES_FILE)
+    
+    def _record_count(self) -> int:
+        try:
+            return os.path.getsize(self.records_path) // self.record_dtype.itemsize
+        except FileNotFoundError:
+            return 0
+    
+    def records(self) -> np.ndarray:
+        """Memory-mapped view of all complete records, remapped when the file grows."""
+        count = self._record_count()
+        with self._lock:
+            if self._records is None or len(self._records) != count:
+                if count == 0:
+                    self._records = np.zeros(0, dtype=self.record_dtype)
+                else:
+                    self._records = np.memmap(self.records_path, dtype=self.record_dtype, mode="r", shape=(count,))
+            return self._records
+    
+    def __len__(self) -> int:
+        return self._record_count()
+    
+    def append(self, memory_ids: Sequence[str], vectors: np.ndarray):
+        """Append records in a single O_APPEND write (safe across worker processes)."""
+        if not len(memory_ids):
+            return
+        batch = np.zeros(len(memory_ids), dtype=self.record_dtype)
+        for row, memory_id in enumerate(memory_ids):
+            batch["hi"][row], batch["lo"][row] = _split_uuid(memory_id)
+        batch["vec"] = vectors
+        fd = os.open(self.records_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            self._cut_torn_tail(fd)
+            os.write(fd, batch.tobytes())
+        finally:
+            os.close(fd)  # Also releases the lock
+    
+    def _cut_torn_tail(self, fd: int):
+        """Truncate the records file to whole records, keeping it locked for the caller's write."""
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        size = os.fstat(fd).st_size
+        torn = size % self.record_dtype.itemsize
+        if torn:
+            os.ftruncate(fd, size - torn)
+    
+    def tombstone(self, memory_id: str):
+        """Mark a memory as deleted; its record is skipped by searches."""
+        entry = np.zeros(1, dtype=self.id_dtype)
+        entry["hi"][0], entry["lo"][0] = _split_uuid(memory_id)
+        fd = os.open(self.tombstones_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, entry.tobytes())
+        finally:
+            os.close(fd)
+    
+    def _tombstone_ids(self) -> np.ndarray:
+        try:
+            size = os.path.getsize(self.tombstones_path)
+        except FileNotFoundError:
+            size = 0
+        with self._lock:
+            if size != self._tombstones_size:
+                count = size // self.id_dtype.itemsize
+                self._tombstones = (
+                    np.fromfile(self.tombstones_path, dtype=self.id_dtype, count=count)
+                    if count else np.zeros(0, dtype=self.id_dtype)
+                )
+                self._tombstones_size = size
+            return self._tombstones
+    
+    def _ids(self, memory_ids: Sequence[str]) -> np.ndarray:
+        ids = np.zeros(len(memory_ids), dtype=self.id_dtype)
+        for row, memory_id in enumerate(memory_ids):
+            ids["hi"][row], ids["lo"][row] = _split_uuid(memory_id)
+        return ids
+    
+    def missing(self, memory_ids: Sequence[str]) -> List[str]:
+        """Return the IDs without a record, via binary search over a sorted ID index.
+        
+        The index is built on first use and new records are merged into it.
+        """
+        records = self.records()
+        with self._lock:
+            if self._id_index is None:
+                self._id_index, self._indexed_count = np.zeros(0, dtype=self.id_dtype), 0
+            if self._indexed_count < len(records):
+                new = records[self._indexed_count:]
+                order = np.lexsort((new["lo"], new["hi"]))
+                added = np.empty(len(new), dtype=self.id_dtype)
+                added["hi"], added["lo"] = new["hi"][order], new["lo"][order]
+                self._id_index = np.insert(self._id_index, self._id_index.searchsorted(added), added)
+                self._indexed_count = len(records)
+            index = self._id_index
+        
+        ids = self._ids(memory_ids)
+        if not len(index):
+            return list(memory_ids)
+        positions = np.minimum(index.searchsorted(ids), len(index) - 1)
+        found = (index["hi"][positions] == ids["hi"]) & (index["lo"][positions] == ids["lo"])
+        return [memory_id for memory_id, hit in zip(memory_ids, found) if not hit]
+    
+    def contains(self, memory_id: str) -> bool:
+        """Check whether a memory has a record."""
+        return not self.missing([memory_id])
+    
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        candidates: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Cosine top-k over live records, optionally restricted to candidate IDs."""
+        records = self.records()
+        count = len(records)
+        if count == 0 or top_k <= 0:
+            return []
+        
+        scores = np.asarray(records["vec"] @ query, dtype=np.float32)
+        tombstones = self._tombstone_ids()
+        if len(tombstones):
+            # Compare whole 128-bit IDs; matching the halves separately would also hit live IDs
+            # that share a high half with one tombstone and a low half with another
+            ids = np.empty(count, dtype=self.id_dtype)
+            ids["hi"], ids["lo"] = records["hi"], records["lo"]
+            dead = np.isin(ids.view("V16"), tombstones.view("V16"))
+            scores[dead] = -np.inf
+        
+        results: List[Tuple[str, float]] = []
+        fetch = min(count, top_k * 4 if candidates is None else max(top_k * 4, 64))
+        while True:
+            top = np.argpartition(-scores, fetch - 1)[:fetch]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results, seen = [], set()
+            for row in top:
+                score = float(scores[row])
+                if not np.isfinite(score):
+                    break
+                memory_id = _join_uuid(records["hi"][row], records["lo"][row])
+                if memory_id in seen or (candidates is not None and memory_id not in candidates):
+                    continue
+                seen.add(memory_id)
+                results.append((memory_id, score))
+                if len(results) == top_k:
+                    return results
+            if fetch >= count:
+                return results
+            fetch = min(count, fetch * 4)
+
+
+class VectorMemoryRetriever(BaseRetriever):
+    """Retriever backed by per-zone memory-mapped vector stores."""
+    
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        embedder_name: Optional[str] = None,
+        dim: Optional[int] = None
+    ):
+        self.root = root or settings.vector_store_path
+        self.embedder_name = embedder_name or settings.vector_embedder
+        self.dim = dim or settings.vector_dim
+        self.embedder = create_embedder(self.embedder_name, self.dim)
+        self._stores: Dict[str, ZoneVectorStore] = {}
+        self._lock = threading.Lock()
+    
+    def _zone_path(self, zone: str) -> str:
+        name = zone if _SAFE_ZONE_RE.match(zone) else sha1(zone.encode()).hexdigest()
+        return os.path.join(self.root, name)
+    
+    def store(self, zone: str) -> ZoneVectorStore:
+        """Get (opening lazily) the vector store for a zone."""
+        with self._lock:
+            store = self._stores.get(zone)
+            if store is None:
+                store = self._stores[zone] = ZoneVectorStore(self._zone_path(zone), self.dim, self.embedder_name)
+            return store
+    
+    def index_memories(self, memories: Iterable[Memory]):
+        """Embed and append memories, grouped by zone."""
+        by_zone: Dict[str, List[Memory]] = {}
+        for memory in memories:
+            if not memory.redacted:
+                by_zone.setdefault(memory.zone, []).append(memory)
+        for zone, zone_memories in by_zone.items():
+            vectors = self.embedder.embed([memory.content for memory in zone_memories])
+            self.store(zone).append([str(memory.id) for memory in zone_memories], vectors)
+    
+    def index_memory(self, memory: Memory):
+        """Add a memory to its zone store (called on create)."""
+        self.index_memories([memory])
+    
+    def remove_memory(self, memory_id: str, zone: Optional[str] = None):
+        """Tombstone a memory (called on redaction)."""
+        if zone is not None:
+            self.store(zone).tombstone(memory_id)
+            return
+        with self._lock:
+            stores = list(self._stores.values())
+        for store in stores:
+            store.tombstone(memory_id)
+    
+    def rank(self, zone: str, memories: List[Memory], query: str) -> List[Tuple[Memory, float]]:
+        """Score every allowed memory by cosine similarity, best first."""
+        store = self.store(zone)
+        by_id = {str(memory.id): memory for memory in memories}
+        missing = store.missing(list(by_id))
+        if missing:
+            self.index_memories([by_id[memory_id] for memory_id in missing])
+
+        query_vector = self.embedder.embed([query])[0]
+        ranked = [
+            (memory_id, score)
+            for memory_id, score in store.search(query_vector, len(by_id), candidates=set(by_id))
+            if score > 0
+        ]
+        return self._with_recency_fill(by_id, ranked)
@@ -0,0 +1,334 @@
+"""In-process load benchmark for the FastAPI backend.
+
+Usage:
+    python scripts/bench_api.py [--requests N] [--concurrency N] [--endpoints NAME ...]
+        [--memories N] [--users N] [--audits N] [--database-url URL]
+        [--llm-latency-ms MS] [--response-cache] [-o results.json]
+        [--compare baseline.json] [--max-regression PCT]
+
+Seeds a fresh SQLite database (or DATABASE_URL) with synthetic memories, tags,
+users, sessions and a hash-chained audit log across every policy zone, then
+drives each endpoint through an httpx ASGI client (no server, no network) with
+N concurrent workers. The LLM is the offline ``local-stub`` provider and the
+response cache is off unless ``--response-cache`` is given, so ``/ask`` runs
+the full LCAC pipeline on every request.
+
+Prints throughput and p50/p95/p99 latency per endpoint and can save them as
+JSON. ``--compare`` reads an earlier results file and exits with status 1 when
+any endpoint's throughput dropped, or its p95 rose, by more than
+``--max-regression`` percent.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+from uuid import uuid4
+
+ENDPOINTS = ["memories", "sessions", "ask", "audit", "trust"]
+SEED_BATCH = 5_000
+NOISE_TAGS = [f"noise_{i}" for i in range(20)]
+
+CLINICAL_PHRASES = [
+    "chest pain radiating to left arm", "shortness of breath on exertion",
+    "fever of 38.5C for two days", "blood pressure 145/92", "heart rate 104 bpm",
+    "persistent dry cough", "mild dehydration", "follow-up visit last week",
+    "sprained ankle after a fall", "severe headache with nausea",
+]
+QUESTIONS = [
+    "How urgent is this?", "Should the patient go to the emergency department?",
+    "What follow-up do you recommend?", "Summarize the recent symptoms.",
+    "Is this consistent with the last visit?",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process with an offline LLM.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight requests")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--memories", type=int, default=10_000, help="Memories to seed")
+    parser.add_argument("--users", type=int, default=500, help="Users (trust scores) to seed")
+    parser.add_argument("--audits", type=int, default=10_000, help="Audit records to seed")
+    parser.add_argument("--database-url", help="Benchmark against this database (default: temporary SQLite)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="local-stub time to first token")
+    parser.add_argument("--response-cache", action="store_true", help="Leave the /ask response cache on")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic data")
+    parser.add_argument("-o", "--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed regression in percent")
+    return parser.parse_args()
+
+
+def configure_environment(args, tmp: str):
+    """Point the app at the benchmark database and offline LLM (before app.config is imported)."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["LLM_PROVIDER"] = "local-stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_STUB_ERROR_RATE"] = "0"
+    os.environ["LLM_STUB_VIOLATION_RATE"] = "0"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if args.response_cache else "false"
+
+
+# Seeding
+
+def seed_database(args, rng: random.Random) -> Dict[str, List]:
+    """Bulk insert synthetic data; returns the seeded users, sessions and audit-owning sessions."""
+    from app.database import engine, init_db
+    from app.models import Audit, Memory, MemoryTag, Session as SessionModel, TrustScore
+    from app.lcac import LCACPolicy
+    from app.audit_chain import append_to_chain, compute_provenance_hash
+    
+    init_db()
+    zones = list(LCACPolicy.ZONE_POLICIES)
+    users = [f"bench_user_{i:05d}" for i in range(args.users)]
+    now = datetime.utcnow()
+    
+    with engine.begin() as conn:
+        for start in range(0, args.memories, SEED_BATCH):
+            memories, tag_rows = [], []
+            for i in range(start, min(start + SEED_BATCH, args.memories)):
+                memory_id = uuid4()
+                zone = rng.choice(zones)
+                tags = rng.sample(LCACPolicy.ZONE_POLICIES[zone], k=1) + [rng.choice(NOISE_TAGS)]
+                content = f"{rng.choice(CLINICAL_PHRASES)}; {rng.choice(CLINICAL_PHRASES)} (record {i})"
+                memories.append({
+                    "id": memory_id,
+                    "zone": zone,
+                    "tags": json.dumps(tags),
+                    "content": content,
+                    "content_hash": hashlib.sha256(content.encode()).hexdigest(),
+                    "created_at": now - timedelta(minutes=i),
+                    "redacted": False,
+                })
+                tag_rows.extend({"memory_id": memory_id, "zone": zone, "tag": tag} for tag in tags)
+            conn.execute(Memory.__table__.insert(), memories)
+            conn.execute(MemoryTag.__table__.insert(), tag_rows)
+        
+        conn.execute(TrustScore.__table__.insert(), [
+            {"user_id": user, "score": 1.0, "last_updated": now, "violation_count": 0, "successful_inferences": 0}
+            for user in users
+        ])
+        
+        # One fresh session per /ask request, plus a pool that owns the seeded audits
+        sessions = [(uuid4(), rng.choice(zones), rng.choice(users)) for _ in range(args.requests + 100)]
+        conn.execute(SessionModel.__table__.insert(), [
+            {"session_id": session_id, "zone": zone, "user_id": user, "started_at": now, "session_metadata": "{}"}
+            for session_id, zone, user in sessions
+        ])
+        
+        audit_sessions = [session_id for session_id, _, _ in sessions[-100:]]
+        for start in range(0, args.audits, SEED_BATCH):
+            audits = []
+            for i in range(start, min(start + SEED_BATCH, args.audits)):
+                audit = Audit(
+                    session_id=rng.choice(audit_sessions),
+                    timestamp=now - timedelta(seconds=args.audits - i),
+                    prompt=rng.choice(QUESTIONS),
+                    response=rng.choice(CLINICAL_PHRASES),
+                    used_memory_ids="[]",
+                )
+                audit.provenance_hash = compute_provenance_hash(audit)
+                audits.append(audit)
+            links = append_to_chain(conn, [audit.provenance_hash for audit in audits])
+            rows = []
+            for audit, (sequence, chain_hash) in zip(audits, links):
+                audit.sequence, audit.chain_hash = sequence, chain_hash
+                rows.append({column.name: getattr(audit, column.name) for column in Audit.__table__.columns})
+            conn.execute(Audit.__table__.insert(), rows)
+    
+    return {"users": users, "sessions": sessions, "audit_sessions": audit_sessions}
+
+
+# Load generation
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def drive(client, make_request: Callable[[int], Tuple[str, str, Dict]], total: int, concurrency: int) -> Dict:
+    """Send ``total`` requests from ``concurrency`` workers and summarize latencies."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+    
+    async def worker():
+        for index in counter:
+            method, path, kwargs = make_request(index)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+    
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def request_factories(seeded: Dict, rng: random.Random) -> Dict[str, Tuple[str, Callable]]:
+    """Endpoint name -> (label, index -> (method, path, kwargs))."""
+    from app.lcac import LCACPolicy
+    zones = list(LCACPolicy.ZONE_POLICIES)
+    users, sessions = seeded["users"], seeded["sessions"]
+    
+    def create_memory(i):
+        zone = rng.choice(zones)
+        tags = rng.sample(LCACPolicy.ZONE_POLICIES[zone], k=1) + [rng.choice(NOISE_TAGS)]
+        return "POST", "/memories", {"json": {"zone": zone, "tags": tags, "content": f"{rng.choice(CLINICAL_PHRASES)} (bench {i})"}}
+    
+    def create_session(i):
+        return "POST", "/sessions", {"json": {"zone": rng.choice(zones), "user_id": rng.choice(users)}}
+    
+    def ask(i):
+        session_id = sessions[i % len(sessions)][0]
+        return "POST", "/ask", {"json": {"session_id": str(session_id), "message": f"{rng.choice(QUESTIONS)} ({i})"}}
+    
+    def list_audit(i):
+        params = {"limit": 50}
+        if i % 2:
+            params["session_id"] = str(rng.choice(seeded["audit_sessions"]))
+        return "GET", "/audit", {"params": params}
+    
+    def get_trust(i):
+        return "GET", "/trust", {"params": {"user_id": rng.choice(users)}}
+    
+    return {
+        "memories": ("POST /memories", create_memory),
+        "sessions": ("POST /sessions", create_session),
+        "ask": ("POST /ask", ask),
+        "audit": ("GET /audit", list_audit),
+        "trust": ("GET /trust", get_trust),
+    }
+
+
+async def run_benchmark(args, seeded: Dict, rng: random.Random) -> Dict[str, Dict]:
+    """Run each selected endpoint in turn against the in-process app."""
+    import httpx
+    from app.main import app
+    from app.config import settings
+    
+    factories = request_factories(seeded, rng)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://bench",
+            headers={settings.api_key_header: settings.api_key},
+            timeout=None
+        ) as client:
+            for name in args.endpoints:
+                label, make_request = factories[name]
+                results[label] = await drive(client, make_request, args.requests, args.concurrency)
+                print_row(label, results[label])
+    return results
+
+
+# Reporting
+
+def print_row(label: str, result: Dict):
+    errors = sum(result["errors"].values())
+    print(
+        f"{label:<16} | {result['throughput_rps']:9.1f} req/s | p50 {result['p50_ms']:8.2f} ms | "
+        f"p95 {result['p95_ms']:8.2f} ms | p99 {result['p99_ms']:8.2f} ms | errors {errors}"
+    )
+
+
+def compare(results: Dict[str, Dict], baseline_path: str, max_regression: float) -> bool:
+    """Print throughput/p95 deltas against a baseline; True if anything regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["endpoints"]
+    
+    regressed = False
+    print(f"\nComparison with {baseline_path} (max regression {max_regression:.0f}%)")
+    for label, result in results.items():
+        if label not in baseline:
+            continue
+        before = baseline[label]
+        throughput_delta = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        p95_delta = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        flag = throughput_delta < -max_regression or p95_delta > max_regression
+        regressed = regressed or flag
+        print(
+            f"{label:<16} | throughput {throughput_delta:+7.1f}% | p95 {p95_delta:+7.1f}%"
+            f"{' | REGRESSION' if flag else ''}"
+        )
+    return regressed
+
+
+def main():
+    """Seed, benchmark, report and optionally compare."""
+    args = parse_args()
+    rng = random.Random(args.seed)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args, tmp)
+        from app.database import engine
+        
+        seed_start = time.perf_counter()
+        seeded = seed_database(args, rng)
+        print(
+            f"API benchmark: seeded {args.memories:,} memories, {args.users:,} users, "
+            f"{len(seeded['sessions']):,} sessions, {args.audits:,} audits in {time.perf_counter() - seed_start:.1f}s"
+        )
+        print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}, local-stub LLM")
+        
+        results = asyncio.run(run_benchmark(args, seeded, rng))
+        engine.dispose()
+    
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": "sqlite (temporary)" if not args.database_url else args.database_url.split("://", 1)[0],
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "memories": args.memories,
+                "users": args.users,
+                "audits": args.audits,
+                "llm_latency_ms": args.llm_latency_ms,
+                "response_cache": args.response_cache,
+            },
+            "endpoints": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+    
+    if args.compare and compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
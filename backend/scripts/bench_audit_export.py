@@ -0,0 +1,103 @@
+"""Benchmark streaming audit export throughput and memory.
+
+Usage:
+    python scripts/bench_audit_export.py [ROWS]
+
+Seeds ROWS synthetic audit records (default 5M) into a temporary SQLite
+database, then exports them once per compression, reporting rows/s, output
+size and the peak resident memory growth while exporting.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import hashlib
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import SQLModel, create_engine
+from app.models import Audit
+from app.audit_export import EXPORT_COMPRESSIONS, export_audit, zstandard
+
+DEFAULT_ROWS = 5_000_000
+SEED_BATCH = 50_000
+SESSIONS = 1000
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), or 0 where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1_000_000
+    except (OSError, ValueError):
+        return 0.0
+
+
+def seed(engine, rows: int):
+    """Insert synthetic audit rows shaped like real inference events."""
+    sessions = [uuid4() for _ in range(SESSIONS)]
+    memory_ids = json.dumps([str(uuid4()) for _ in range(3)])
+    base = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for start in range(0, rows, SEED_BATCH):
+            batch = []
+            for i in range(start, min(rows, start + SEED_BATCH)):
+                violation = i % 50 == 0
+                batch.append({
+                    "id": uuid4(),
+                    "session_id": sessions[i % SESSIONS],
+                    "timestamp": base + timedelta(milliseconds=i * 10),
+                    "prompt": f"Patient {i % 997} reports chest pain and shortness of breath. Assess urgency.",
+                    "response": "Recommend urgent evaluation; monitor vitals and escalate if symptoms worsen.",
+                    "used_memory_ids": memory_ids,
+                    "dropped_memory_ids": "[]",
+                    "provenance_hash": hashlib.sha256(str(i).encode()).hexdigest(),
+                    "policy_violation": violation,
+                    "violation_reason": "Content contains disallowed pattern: x-ray" if violation else None,
+                })
+            conn.execute(Audit.__table__.insert(), batch)
+
+
+def run(engine, rows: int, compression: str):
+    """Export everything once and report throughput and memory growth."""
+    baseline = peak = rss_mb()
+    written = chunks = 0
+    start = time.perf_counter()
+    for chunk in export_audit(engine, compression=compression):
+        written += len(chunk)
+        chunks += 1
+        if chunks % 20 == 0:
+            peak = max(peak, rss_mb())
+    elapsed = time.perf_counter() - start
+    print(
+        f"{compression:>5} | {rows / elapsed:>9,.0f} rows/s | {written / 1_000_000:9.1f} MB out | "
+        f"{elapsed:6.1f} s | peak RSS +{peak - baseline:6.1f} MB"
+    )
+
+
+def main():
+    """Seed once, then export with each available compression."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        
+        seed_start = time.perf_counter()
+        seed(engine, rows)
+        print(f"Audit export benchmark: seeded {rows:,} rows in {time.perf_counter() - seed_start:.1f}s")
+        
+        for compression in EXPORT_COMPRESSIONS:
+            if compression == "zstd" and zstandard is None:
+                print(" zstd | skipped (zstandard not installed)")
+                continue
+            run(engine, rows, compression)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark audit log verification: parallel bulk rehash vs. Merkle range proofs.
+
+Usage:
+    python scripts/bench_audit_verify.py [ROWS] [WORKERS ...]
+
+Seeds ROWS chained audit records (default 2M) into a temporary SQLite
+database through the normal chaining path, then times verify_all with each
+worker count (default 1 and the CPU count) and verify_range over small
+windows, which only rehash the window plus O(log n) proof hashes.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import SQLModel, create_engine
+from app.models import Audit
+from app.audit_chain import append_to_chain, compute_provenance_hash, verify_all, verify_range
+
+DEFAULT_ROWS = 2_000_000
+SEED_BATCH = 50_000
+SESSIONS = 1000
+RANGE_SIZES = [1, 100, 10_000]
+RANGE_REPEATS = 20
+
+
+def seed(engine, rows: int):
+    """Insert synthetic records, chained in batches like the write-behind writer."""
+    sessions = [uuid4() for _ in range(SESSIONS)]
+    base = datetime(2025, 1, 1)
+    for start in range(0, rows, SEED_BATCH):
+        batch = []
+        for i in range(start, min(rows, start + SEED_BATCH)):
+            record = {
+                "id": uuid4(),
+                "session_id": sessions[i % SESSIONS],
+                "timestamp": base + timedelta(milliseconds=i * 10),
+                "prompt": f"Patient {i % 997} reports chest pain and shortness of breath. Assess urgency.",
+                "response": "Recommend urgent evaluation; monitor vitals and escalate if symptoms worsen.",
+                "used_memory_ids": "[]",
+                "dropped_memory_ids": "[]",
+                "policy_violation": False,
+                "violation_reason": None,
+                "violation_offset": None,
+                "cached": False,
+            }
+            record["provenance_hash"] = compute_provenance_hash(record)
+            batch.append(record)
+        with engine.begin() as conn:
+            links = append_to_chain(conn, [record["provenance_hash"] for record in batch])
+            for record, (sequence, chain_hash) in zip(batch, links):
+                record["sequence"] = sequence
+                record["chain_hash"] = chain_hash
+            conn.execute(Audit.__table__.insert(), batch)
+
+
+def main():
+    """Seed once, then benchmark bulk and range verification."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, os.cpu_count() or 1})
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(database_url)
+        SQLModel.metadata.create_all(engine)
+        
+        seed_start = time.perf_counter()
+        seed(engine, rows)
+        print(f"Audit verification benchmark: seeded {rows:,} chained rows in {time.perf_counter() - seed_start:.1f}s")
+        
+        for workers in worker_counts:
+            result = verify_all(database_url, workers=workers)
+            assert result["verified"], result["error"]
+            print(
+                f"verify_all  | {workers:>2} workers | {result['seconds']:7.1f} s | "
+                f"{rows / result['seconds']:>9,.0f} rows/s | {result['checkpoints_checked']:,} checkpoints"
+            )
+        
+        rng = random.Random(rows)
+        with engine.connect() as conn:
+            for size in RANGE_SIZES:
+                if size > rows:
+                    continue
+                latencies, proof_hashes = [], 0
+                for _ in range(RANGE_REPEATS):
+                    start = rng.randint(1, rows - size + 1)
+                    begin = time.perf_counter()
+                    result = verify_range(conn, start, start + size - 1)
+                    latencies.append((time.perf_counter() - begin) * 1000)
+                    assert result["verified"], result["error"]
+                    proof_hashes = max(proof_hashes, result["proof_hashes"])
+                print(
+                    f"verify_range | {size:>7,} records | p50 {statistics.median(latencies):8.2f} ms | "
+                    f"max {max(latencies):8.2f} ms | <= {proof_hashes} proof hashes"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare a bulk redaction job with redacting the same memories one by one.
+
+Usage:
+    python scripts/bench_bulk_redaction.py [--memories N] [--chunk-size N]
+
+Seeds a temporary SQLite database with two zones of N memories each, redacts
+one zone through ``LCACEngine.redact_memory`` per memory (one transaction per
+memory, as ``POST /redact_memory`` does) and the other with a bulk redaction
+job, then checks that every memory was redacted and the audit chain still
+verifies.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import hashlib
+import json
+import tempfile
+import time
+from datetime import datetime
+from uuid import uuid4
+
+
+def seed(engine, zone: str, count: int):
+    """Insert ``count`` tagged memories into ``zone`` in one transaction."""
+    from app.models import Memory, MemoryTag
+    memories, tags = [], []
+    for i in range(count):
+        memory_id = uuid4()
+        content = f"{zone} note {i}: patient reports mild symptoms"
+        memories.append({
+            "id": memory_id,
+            "zone": zone,
+            "tags": json.dumps(["symptoms"]),
+            "content": content,
+            "content_hash": hashlib.sha256(content.encode()).hexdigest(),
+            "created_at": datetime.utcnow(),
+            "redacted": False,
+        })
+        tags.append({"memory_id": memory_id, "zone": zone, "tag": "symptoms"})
+    with engine.begin() as conn:
+        conn.execute(Memory.__table__.insert(), memories)
+        conn.execute(MemoryTag.__table__.insert(), tags)
+    return [memory["id"] for memory in memories]
+
+
+def main():
+    """Time both redaction paths and verify the result."""
+    parser = argparse.ArgumentParser(description="Benchmark bulk redaction jobs.")
+    parser.add_argument("--memories", type=int, default=5000, help="Memories per zone")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'redaction.db')}"
+        from sqlalchemy import func, select
+        from sqlmodel import Session
+        from app.audit_chain import sequence_range, verify_range
+        from app.bulk_redaction import BulkRedactor, RedactionSelector
+        from app.database import engine, init_db
+        from app.lcac import LCACEngine
+        from app.models import Memory, RedactionJob
+        init_db()
+        
+        single_ids = seed(engine, "triage", args.memories)
+        seed(engine, "teleconsult", args.memories)
+        
+        started = time.perf_counter()
+        with Session(engine) as db_session:
+            lcac = LCACEngine(db_session)
+            for memory_id in single_ids:
+                lcac.redact_memory(str(memory_id), "benchmark")
+        single_seconds = time.perf_counter() - started
+        
+        redactor = BulkRedactor(chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        job = redactor.submit(RedactionSelector(zone="teleconsult", tags=["symptoms"]), "benchmark")
+        while True:
+            with Session(engine) as db_session:
+                job = db_session.get(RedactionJob, job.id)
+            if job.status not in ("pending", "running"):
+                break
+            time.sleep(0.01)
+        bulk_seconds = time.perf_counter() - started
+        redactor.shutdown()
+        
+        with Session(engine) as db_session:
+            remaining = db_session.execute(
+                select(func.count()).select_from(Memory).where(Memory.redacted == False)
+            ).scalar()
+            conn = db_session.connection()
+            report = verify_range(conn, *sequence_range(conn))
+    
+    print(f"Redacting {args.memories:,} memories per path (chunk size {redactor.chunk_size})")
+    print(f"  per memory  {single_seconds:8.2f} s | {args.memories / single_seconds:10,.0f} memories/s")
+    print(
+        f"  bulk job    {bulk_seconds:8.2f} s | {args.memories / bulk_seconds:10,.0f} memories/s | "
+        f"{job.chunks} chunks, {job.redacted:,} redacted, status {job.status}"
+    )
+    print(f"  speedup     {single_seconds / bulk_seconds:8.1f}x")
+    print(f"  unredacted memories left: {remaining} | audit chain verified: {report['verified']}")
+    if remaining or job.status != "completed" or not report['verified']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
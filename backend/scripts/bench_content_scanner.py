@@ -0,0 +1,94 @@
+"""Benchmark LCAC content violation scanning throughput (MB/s).
+
+Usage:
+    python scripts/bench_content_scanner.py [DICTIONARY_SIZE ...]
+
+Compares the legacy one-substring-search-per-pattern loop with the compiled
+ContentScanner over synthetic LLM responses. Dictionary sizes default to
+5, 1000 and 10000 terms.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import string
+import time
+from typing import List
+
+from app.content_scanner import ContentScanner
+from app.lcac import LCACPolicy
+
+DEFAULT_SIZES = [5, 1000, 10_000]
+RESPONSE_COUNT = 500
+RESPONSE_WORDS = 300
+
+CLINICAL_WORDS = (
+    "patient reports chest pain shortness of breath for two days blood pressure "
+    "heart rate stable afebrile recommend urgent evaluation monitor symptoms "
+    "follow up with primary care hydrate rest emergency department if worsening"
+).split()
+
+
+def synthetic_terms(count: int, rng: random.Random) -> List[str]:
+    """Build a dictionary mixing drug-like names, ICD/CPT-like codes and phrases."""
+    terms = list(LCACPolicy.DISALLOWED_PATTERNS)
+    while len(terms) < count:
+        kind = rng.random()
+        if kind < 0.4:
+            terms.append("".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12))))
+        elif kind < 0.7:
+            terms.append(f"{rng.choice(string.ascii_uppercase)}{rng.randint(0, 99):02d}.{rng.randint(0, 9)}")
+        else:
+            terms.append(f"{rng.choice(['ct', 'mri', 'pet', 'us'])} {rng.choice(['head', 'chest', 'abdomen'])} {rng.randint(1, 999)}")
+    return terms[:count]
+
+
+def synthetic_responses(rng: random.Random) -> List[str]:
+    """Clean responses: the worst case, since every scanner must read all the text."""
+    return [" ".join(rng.choices(CLINICAL_WORDS, k=RESPONSE_WORDS)) for _ in range(RESPONSE_COUNT)]
+
+
+def legacy_scan(patterns: List[str], content: str) -> bool:
+    """Pre-compiled implementation: one substring search per pattern."""
+    content_lower = content.lower()
+    return any(pattern in content_lower for pattern in patterns)
+
+
+def throughput(fn, responses: List[str]) -> float:
+    """Return MB/s for scanning every response once."""
+    total_bytes = sum(len(r.encode()) for r in responses)
+    start = time.perf_counter()
+    for response in responses:
+        fn(response)
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / 1_000_000
+
+
+def main():
+    """Run the throughput comparison for each dictionary size."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    rng = random.Random(42)
+    responses = synthetic_responses(rng)
+    print(f"Content scanner benchmark ({RESPONSE_COUNT} responses x {RESPONSE_WORDS} words)")
+    
+    for size in sizes:
+        terms = synthetic_terms(size, rng)
+        lowered = [t.lower() for t in terms]
+        
+        compile_start = time.perf_counter()
+        scanner = ContentScanner(terms)
+        compile_ms = (time.perf_counter() - compile_start) * 1000
+        
+        legacy = throughput(lambda text: legacy_scan(lowered, text), responses)
+        compiled = throughput(scanner.search, responses)
+        print(
+            f"{size:>7,} terms | compile {compile_ms:8.1f} ms | "
+            f"legacy {legacy:8.2f} MB/s | compiled {compiled:8.2f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure cross-process propagation latency of the cache invalidation bus.
+
+Usage:
+    python scripts/bench_invalidation_bus.py [--workers N] [--events N] [--interval-ms MS]
+
+Starts N worker processes against a temporary SQLite database, each running
+its own invalidation bus poller like a uvicorn worker would. The parent
+publishes session revocation events and every worker reports when it applied
+each one. Prints the publish-to-apply latency distribution and exits with
+status 1 if any worker missed an event.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import math
+import multiprocessing
+import queue
+import tempfile
+import time
+from uuid import uuid4
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def worker(database_url: str, results, ready, stop):
+    """One worker process: apply bus events and report their latency."""
+    os.environ["DATABASE_URL"] = database_url
+    from app.invalidation_bus import SESSION, invalidation_bus
+    from app.session_cache import session_cache  # Subscribes like the real cache
+    
+    def applied(key, payload):
+        results.put((os.getpid(), key, time.time() - payload["sent_at"]))
+    
+    invalidation_bus.subscribe(SESSION, applied)
+    invalidation_bus.start()
+    ready.release()
+    stop.wait()
+    invalidation_bus.stop()
+
+
+def main():
+    """Publish events from the parent and collect worker latencies."""
+    parser = argparse.ArgumentParser(description="Measure invalidation bus propagation latency.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="Delay between published events")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bus.db')}"
+        os.environ["DATABASE_URL"] = database_url
+        from app.config import settings
+        from app.database import init_db
+        from app.invalidation_bus import SESSION, invalidation_bus
+        init_db()
+        
+        context = multiprocessing.get_context("spawn")
+        results, ready, stop = context.Queue(), context.Semaphore(0), context.Event()
+        processes = [
+            context.Process(target=worker, args=(database_url, results, ready, stop))
+            for _ in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.acquire()
+        
+        for _ in range(args.events):
+            invalidation_bus.publish(SESSION, str(uuid4()), {"sent_at": time.time()})
+            time.sleep(args.interval_ms / 1000)
+        
+        expected = args.workers * args.events
+        latencies = []
+        deadline = time.monotonic() + 10 + settings.invalidation_poll_interval_ms / 1000
+        while len(latencies) < expected and time.monotonic() < deadline:
+            try:
+                latencies.append(results.get(timeout=0.5)[2] * 1000)
+            except queue.Empty:
+                pass
+        stop.set()
+        for process in processes:
+            process.join()
+    
+    print(
+        f"Invalidation bus: {args.workers} workers, {args.events} events, "
+        f"poll interval {settings.invalidation_poll_interval_ms:g} ms"
+    )
+    print(f"  applied {len(latencies):,}/{expected:,}")
+    if latencies:
+        print(
+            f"  latency p50 {percentile(latencies, 50):.1f} ms | p95 {percentile(latencies, 95):.1f} ms | "
+            f"p99 {percentile(latencies, 99):.1f} ms | max {max(latencies):.1f} ms"
+        )
+    if len(latencies) < expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark bulk NDJSON memory ingestion against one-commit-per-memory inserts.
+
+Usage:
+    python scripts/bench_memory_ingest.py [SIZE ...]
+
+Sizes default to 100k and 1M memories. Each size is written to a temporary
+NDJSON file and loaded into a fresh temporary SQLite database. The per-memory
+baseline (hash, insert, commit, refresh as in ``POST /memories``) runs on a
+small sample and is extrapolated.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import hashlib
+import json
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session, create_engine
+from app.models import Memory
+from app.lcac import LCACPolicy
+from app.memory_ingest import MemoryIngestor, ingest_ndjson
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+BASELINE_SAMPLE = 2_000
+READ_CHUNK_SIZE = 1024 * 1024
+
+PHRASES = (
+    "patient reports chest pain radiating to left arm", "shortness of breath on exertion",
+    "blood pressure 145/92 heart rate 104", "follow-up visit after ankle sprain",
+    "persistent dry cough for a week", "fever of 38.5C with chills",
+)
+
+
+def write_ndjson(path: str, size: int, rng: random.Random):
+    """Synthetic memories with tags drawn from each zone's allowed set."""
+    zones = list(LCACPolicy.ZONE_POLICIES)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            zone = rng.choice(zones)
+            allowed = LCACPolicy.ZONE_POLICIES[zone]
+            record = {"zone": zone, "tags": rng.sample(allowed, k=min(2, len(allowed))), "content": f"{rng.choice(PHRASES)} (record {i})"}
+            f.write(json.dumps(record) + "\n")
+
+
+def read_chunks(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def fresh_engine(tmp: str, name: str):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, name)}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def baseline_rate(engine, path: str) -> float:
+    """Memories/s for the single-row path on the first BASELINE_SAMPLE lines."""
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(next(f)) for _ in range(BASELINE_SAMPLE)]
+    start = time.perf_counter()
+    with Session(engine) as db_session:
+        for record in records:
+            memory = Memory(
+                zone=record["zone"],
+                content=record["content"],
+                content_hash=hashlib.sha256(record["content"].encode()).hexdigest()
+            )
+            memory.set_tags(record["tags"])
+            db_session.add(memory)
+            db_session.add_all(memory.build_tag_rows())
+            db_session.commit()
+            db_session.refresh(memory)
+    return len(records) / (time.perf_counter() - start)
+
+
+def run(size: int):
+    """Benchmark one corpus size."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memories.ndjson")
+        write_ndjson(path, size, random.Random(size))
+        
+        engine = fresh_engine(tmp, "bulk.db")
+        start = time.perf_counter()
+        with open(os.devnull, "wb") as results:
+            summary = ingest_ndjson(MemoryIngestor(engine, results), read_chunks(path))
+        bulk_s = time.perf_counter() - start
+        engine.dispose()
+        
+        engine = fresh_engine(tmp, "single.db")
+        single_rate = baseline_rate(engine, path)
+        engine.dispose()
+    
+    assert summary["created"] == size, summary
+    bulk_rate = size / bulk_s
+    print(
+        f"{size:>10,} memories | bulk {bulk_s:7.1f} s ({bulk_rate:9,.0f}/s) | "
+        f"single-row {single_rate:7,.0f}/s | speedup {bulk_rate / single_rate:6.1f}x"
+    )
+
+
+def main():
+    """Run the benchmark for each requested size."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"Memory ingestion benchmark (SQLite, single-row baseline on {BASELINE_SAMPLE:,} memories)")
+    for size in sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
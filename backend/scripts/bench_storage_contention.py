@@ -0,0 +1,128 @@
+"""Benchmark SQLite write contention under the default and sqlite_wal storage profiles.
+
+Usage:
+    python scripts/bench_storage_contention.py [--writers N] [--readers N] [--seconds S]
+
+Each profile gets a fresh SQLite file. Writer threads run /ask-style
+transactions (read the session's trust score, insert a memory with its tag
+rows, upsert the trust score, commit) while reader threads list memories
+through the profile's read engine. Reports committed writes and reads per
+second, write p95 latency and how many operations failed with "database is
+locked".
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import hashlib
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, select
+from app.database import create_engines
+from app.models import Memory, TrustScore
+from app.trust import TrustEngine
+
+PROFILES = ["default", "sqlite_wal"]
+USERS = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare SQLite write contention across storage profiles.")
+    parser.add_argument("--writers", type=int, default=8, help="Writer threads")
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per profile")
+    return parser.parse_args()
+
+
+def write_once(engine, rng: random.Random):
+    """One read-then-write transaction shaped like the /ask post-inference path."""
+    user_id = f"user_{rng.randrange(USERS)}"
+    with Session(engine) as db_session:
+        db_session.get(TrustScore, user_id)
+        content = f"synthetic memory {rng.random()}"
+        memory = Memory(zone="triage", content=content, content_hash=hashlib.sha256(content.encode()).hexdigest())
+        memory.set_tags(["symptoms"])
+        db_session.add(memory)
+        db_session.add_all(memory.build_tag_rows())
+        TrustEngine(db_session).record_success(user_id, commit=False)
+        db_session.commit()
+
+
+def read_once(engine):
+    with Session(engine) as db_session:
+        db_session.exec(select(Memory).where(Memory.zone == "triage").order_by(Memory.created_at.desc()).limit(50)).all()
+
+
+def worker(kind: str, engine, deadline: float, stats: Dict, seed: int):
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    ok = locked = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            write_once(engine, rng) if kind == "write" else read_once(engine)
+        except OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            locked += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        ok += 1
+    with stats["lock"]:
+        stats[kind]["ok"] += ok
+        stats[kind]["locked"] += locked
+        stats[kind]["latencies"].extend(latencies)
+
+
+def run(profile: str, args):
+    """Benchmark one storage profile on a fresh database file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, async_engine, read_engine = create_engines(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+        SQLModel.metadata.create_all(engine)
+        
+        stats = {"lock": threading.Lock()}
+        for kind in ("write", "read"):
+            stats[kind] = {"ok": 0, "locked": 0, "latencies": []}
+        deadline = time.monotonic() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=("write", engine, deadline, stats, i))
+            for i in range(args.writers)
+        ] + [
+            threading.Thread(target=worker, args=("read", read_engine, deadline, stats, 1000 + i))
+            for i in range(args.readers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        for bound in {engine, read_engine}:
+            bound.dispose()
+    
+    writes, reads = stats["write"], stats["read"]
+    latencies = sorted(writes["latencies"]) or [0.0]
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{profile:<10} | writes {writes['ok'] / args.seconds:8.1f}/s | write p95 {p95:8.1f} ms | "
+        f"reads {reads['ok'] / args.seconds:8.1f}/s | locked: writes {writes['locked']:>5}, reads {reads['locked']:>5}"
+    )
+
+
+def main():
+    """Run every profile with the same thread counts."""
+    args = parse_args()
+    print(f"SQLite contention benchmark ({args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile)")
+    for profile in PROFILES:
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark LCAC zone/tag filtering: legacy JSON scan vs. memorytag index.
+
+Usage:
+    python scripts/bench_tag_filter.py [SIZE ...]
+
+Sizes default to 10k, 100k and 1M memories. Each size is seeded into a fresh
+temporary SQLite database spread across all policy zones.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import tempfile
+import time
+from uuid import uuid4
+from typing import List
+
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.models import Memory, MemoryTag
+from app.lcac import LCACEngine, LCACPolicy
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+SEED_BATCH = 20_000
+REPEATS = 5
+BENCH_ZONE = "triage"
+
+
+def legacy_get_allowed_memories(db_session: Session, zone: str) -> List[Memory]:
+    """Pre-index implementation: load the whole zone and filter JSON tags in Python."""
+    allowed_tags = LCACPolicy.get_allowed_tags(zone)
+    statement = select(Memory).where(Memory.zone == zone, Memory.redacted == False)
+    return [
+        memory for memory in db_session.exec(statement).all()
+        if any(tag in allowed_tags for tag in memory.get_tags())
+    ]
+
+
+def seed(engine, size: int):
+    """Insert synthetic memories; roughly 1 in 10 carries an allowed tag."""
+    rng = random.Random(size)
+    zones = list(LCACPolicy.ZONE_POLICIES)
+    all_tags = sorted({tag for tags in LCACPolicy.ZONE_POLICIES.values() for tag in tags})
+    noise_tags = [f"noise_{i}" for i in range(50)]
+    
+    with engine.begin() as conn:
+        for start in range(0, size, SEED_BATCH):
+            memories, tag_rows = [], []
+            for _ in range(min(SEED_BATCH, size - start)):
+                memory_id = uuid4()
+                zone = rng.choice(zones)
+                if rng.random() < 0.1:
+                    tags = [rng.choice(all_tags), rng.choice(noise_tags)]
+                else:
+                    tags = [rng.choice(noise_tags)]
+                memories.append({
+                    "id": memory_id,
+                    "zone": zone,
+                    "tags": json.dumps(tags),
+                    "content": f"synthetic memory {start}",
+                    "content_hash": "0" * 64,
+                    "redacted": False,
+                })
+                tag_rows.extend(
+                    {"memory_id": memory_id, "zone": zone, "tag": tag}
+                    for tag in dict.fromkeys(tags)
+                )
+            conn.execute(Memory.__table__.insert(), memories)
+            conn.execute(MemoryTag.__table__.insert(), tag_rows)
+
+
+def time_call(fn) -> tuple:
+    """Return (best seconds, result length) over REPEATS runs."""
+    best, count = float("inf"), 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        count = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def run(size: int):
+    """Benchmark both paths for one corpus size."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        seed(engine, size)
+        
+        with Session(engine) as db_session:
+            legacy_s, legacy_n = time_call(lambda: legacy_get_allowed_memories(db_session, BENCH_ZONE))
+            db_session.expunge_all()
+            lcac = LCACEngine(db_session)
+            indexed_s, indexed_n = time_call(lambda: lcac.get_allowed_memories(BENCH_ZONE))
+        
+        engine.dispose()
+    
+    assert legacy_n == indexed_n, f"result mismatch: {legacy_n} != {indexed_n}"
+    print(
+        f"{size:>10,} memories | {indexed_n:>7,} allowed | "
+        f"legacy {legacy_s * 1000:9.1f} ms | indexed {indexed_s * 1000:9.1f} ms | "
+        f"speedup {legacy_s / indexed_s:6.1f}x"
+    )
+
+
+def main():
+    """Run the benchmark for each requested size."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"LCAC tag filter benchmark (zone={BENCH_ZONE}, best of {REPEATS})")
+    for size in sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark post-inference memory validation against context size.
+
+Usage:
+    python scripts/bench_validate_inference.py [CONTEXT_SIZE ...]
+
+Compares the legacy one-get-per-ID loop with LCACEngine.validate_memory_access
+over cold sessions (IDs only, one IN query) and warm sessions (memories passed
+in from the pre-inference hook). Context sizes default to 5, 50 and 500.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import tempfile
+import time
+from uuid import UUID, uuid4
+from typing import List
+
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.models import Memory
+from app.lcac import LCACEngine
+
+DEFAULT_SIZES = [5, 50, 500]
+REPEATS = 20
+BENCH_ZONE = "triage"
+
+
+def legacy_validate(db_session: Session, zone: str, used_memory_ids: List[str]) -> bool:
+    """Pre-batching implementation: one session.get per used memory."""
+    lcac = LCACEngine(db_session)
+    for memory_id in used_memory_ids:
+        memory = db_session.get(Memory, UUID(memory_id))
+        if memory and not lcac.check_memory_access(zone, memory)[0]:
+            return False
+    return True
+
+
+def seed(engine, size: int) -> List[str]:
+    """Insert ``size`` memories readable from the bench zone."""
+    rows = [
+        {
+            "id": uuid4(),
+            "zone": BENCH_ZONE,
+            "tags": json.dumps(["symptoms"]),
+            "content": f"synthetic memory {i}",
+            "content_hash": "0" * 64,
+            "redacted": False,
+        }
+        for i in range(size)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Memory.__table__.insert(), rows)
+    return [str(row["id"]) for row in rows]
+
+
+def measure(engine, fn) -> tuple:
+    """Return (mean ms, mean statements) for ``fn(db_session)`` on fresh sessions."""
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    total = 0.0
+    try:
+        for _ in range(REPEATS):
+            with Session(engine) as db_session:
+                start = time.perf_counter()
+                assert fn(db_session)
+                total += time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return total / REPEATS * 1000, len(statements) / REPEATS
+
+
+def run(size: int):
+    """Benchmark all three paths for one context size."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        ids = seed(engine, size)
+        
+        legacy = measure(engine, lambda s: legacy_validate(s, BENCH_ZONE, ids))
+        cold = measure(engine, lambda s: LCACEngine(s).validate_memory_access(BENCH_ZONE, ids)[0])
+        
+        def warm_validate(db_session: Session) -> bool:
+            memories = db_session.exec(select(Memory).where(Memory.zone == BENCH_ZONE)).all()
+            start = time.perf_counter()
+            ok = LCACEngine(db_session).validate_memory_access(BENCH_ZONE, ids, memories)[0]
+            warm_times.append(time.perf_counter() - start)
+            return ok
+        
+        warm_times: List[float] = []
+        measure(engine, warm_validate)
+        engine.dispose()
+    
+    warm_ms = sum(warm_times) / len(warm_times) * 1000
+    print(
+        f"{size:>6,} memories | legacy {legacy[0]:8.2f} ms ({legacy[1]:5.0f} queries) | "
+        f"batched {cold[0]:7.2f} ms ({cold[1]:3.0f} queries) | preloaded {warm_ms:6.2f} ms (0 queries)"
+    )
+
+
+def main():
+    """Run the benchmark for each requested context size."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"Post-inference memory validation benchmark (mean of {REPEATS})")
+    for size in sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark vector store open time and query latency against corpus size.
+
+Usage:
+    python scripts/bench_vector_store.py [SIZE ...]
+
+Sizes default to 10k, 100k and 1M vectors. Vectors are random unit vectors
+(embedding cost is not part of the measurement); queries use the hashing
+embedder like the application does.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+import numpy as np
+
+from app.config import settings
+from app.vector_store import HashingEmbedder, ZoneVectorStore
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+APPEND_BATCH = 50_000
+QUERIES = 50
+TOP_K = 5
+
+
+def seed(store: ZoneVectorStore, size: int, rng: np.random.Generator):
+    """Append random normalized vectors in batches."""
+    for start in range(0, size, APPEND_BATCH):
+        count = min(APPEND_BATCH, size - start)
+        vectors = rng.standard_normal((count, store.dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store.append([str(uuid4()) for _ in range(count)], vectors)
+
+
+def run(size: int, dim: int):
+    """Seed one store and report open time plus query latency percentiles."""
+    rng = np.random.default_rng(size)
+    embedder = HashingEmbedder(dim)
+    queries = embedder.embed([f"patient reports symptom {i} with elevated heart rate" for i in range(QUERIES)])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(ZoneVectorStore(tmp, dim), size, rng)
+        
+        open_start = time.perf_counter()
+        store = ZoneVectorStore(tmp, dim)
+        store.records()
+        open_ms = (time.perf_counter() - open_start) * 1000
+        
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.search(query, TOP_K)
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{size:>10,} vectors | open {open_ms:7.2f} ms | "
+        f"query p50 {statistics.median(latencies):8.2f} ms | p95 {p95:8.2f} ms"
+    )
+
+
+def main():
+    """Run the benchmark for each requested size."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    dim = settings.vector_dim
+    print(f"Vector store benchmark (dim={dim}, top_k={TOP_K}, {QUERIES} queries)")
+    for size in sizes:
+        run(size, dim)
+
+
+if __name__ == "__main__":
+    main()
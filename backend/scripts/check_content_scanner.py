@@ -0,0 +1,104 @@
+"""Check that LCAC content scanning catches disallowed terms and their listed forms.
+
+Usage:
+    python scripts/check_content_scanner.py
+
+Runs every case through ``LCACPolicy.check_content_violation`` and through the
+streaming ``IncrementalScanner`` with the text split at every position, and
+checks that streamed violations report the raw offset of the term. Short
+terms and codes are checked against words that merely contain them. Exits
+non-zero on any mismatch.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.content_scanner import ContentScanner, IncrementalScanner
+from app.lcac import LCACPolicy
+
+ZONE = "triage"
+
+# (text, expected offset of the violation in the raw text, or None)
+CASES = [
+    ("the radiology report is normal", 4),
+    ("the radiologist said it was fine", 4),
+    ("radiological findings pending", 0),
+    ("two radiologies were ordered", 4),
+    ("see RADIOLOGY_report", 4),
+    ("ﬁne radiology", 4),  # NFKC expands the ligature before the term
+    ("ＲＡＤＩＯＬＯＧＹ follow-up", 0),
+    ("two x-rays taken", 4),
+    ("chest x-rayed yesterday", 6),
+    ("the X\u2011ray is clear", 4),  # Non-breaking hyphen
+    ("an x ray today", 3),
+    ("xray results", 0),
+    ("billing_codes attached", 0),
+    ("insurance_claims filed", 0),
+    ("no imaging needed", 3),
+    # Compounds the original substring check caught
+    ("teleradiology review", 0),
+    ("neuroimaging shows", 0),
+    ("patient reports chest pain", None),
+    ("a radiolo typo", None),
+    ("radiologyish wording", None),
+    ("discuss the billing code later", None),
+]
+
+# Short terms and codes must match whole words only: (text, offset or None)
+SHORT_TERMS = ["pet", "A01"]
+SHORT_CASES = [
+    ("pet scan ordered", 0),
+    ("petition filed", None),
+    ("carpet cleaned", None),
+    ("code A01 billed", 5),
+    ("code A011 billed", None),
+]
+
+
+def stream(scanner: ContentScanner, text: str, split: int):
+    """Feed ``text`` in two chunks; return the violation (pattern, offset) or None."""
+    scanner = IncrementalScanner(scanner)
+    for chunk in (text[:split], text[split:]):
+        _, violation = scanner.feed(chunk)
+        if violation:
+            return violation
+    return scanner.finish()[1]
+
+
+def check(scanner: ContentScanner, cases) -> int:
+    """Run ``cases`` through ``scanner`` in both modes; return the number of failures."""
+    failures = 0
+    for text, offset in cases:
+        match = scanner.search(text)
+        if (match is not None) != (offset is not None):
+            failures += 1
+            print(f"FAIL search({text!r}) = {match}")
+        for split in range(len(text) + 1):
+            violation = stream(scanner, text, split)
+            found = violation[1] if violation else None
+            if found != offset:
+                failures += 1
+                print(f"FAIL stream({text!r}, split={split}) offset {found}, expected {offset}")
+                break
+    return failures
+
+
+def main():
+    """Check every case in both scanning modes."""
+    failures = check(LCACPolicy.get_content_scanner(ZONE), CASES)
+    for text, offset in CASES:
+        violated, _ = LCACPolicy.check_content_violation(ZONE, text)
+        if violated != (offset is not None):
+            failures += 1
+            print(f"FAIL check_content_violation({text!r}) = {violated}")
+    failures += check(ContentScanner(SHORT_TERMS), SHORT_CASES)
+    
+    print(f"{len(CASES) + len(SHORT_CASES)} cases, {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Hammer one user's trust score from many threads and check nothing is lost.
+
+Usage:
+    python scripts/check_trust_concurrency.py [THREADS] [UPDATES_PER_THREAD]
+
+Runs against a temporary SQLite file. Every thread alternates successes and
+violations for the same user through its own TrustEngine/session; the final
+counters must equal the number of calls exactly. Exits non-zero on mismatch.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import threading
+import time
+
+from sqlmodel import SQLModel, Session, create_engine
+from app.config import settings
+from app.trust import TrustEngine
+
+USER_ID = "concurrency_user"
+
+
+def worker(engine, updates: int, errors: list):
+    """Apply ``updates`` alternating success/violation records."""
+    try:
+        with Session(engine) as db_session:
+            trust_engine = TrustEngine(db_session)
+            for i in range(updates):
+                if i % 3 == 0:
+                    trust_engine.record_violation(USER_ID, "concurrency check")
+                else:
+                    trust_engine.record_success(USER_ID)
+    except Exception as e:
+        errors.append(e)
+
+
+def main():
+    """Run the concurrency check."""
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    expected_violations = threads * len(range(0, updates, 3))
+    expected_successes = threads * updates - expected_violations
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'trust.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        SQLModel.metadata.create_all(engine)
+        
+        errors: list = []
+        workers = [threading.Thread(target=worker, args=(engine, updates, errors)) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        with Session(engine) as db_session:
+            trust_score = TrustEngine(db_session).get_trust_score(USER_ID)
+        engine.dispose()
+    
+    total = threads * updates
+    print(f"{threads} threads x {updates} updates in {elapsed:.2f}s ({total / elapsed:,.0f} updates/s)")
+    print(f"violations: {trust_score.violation_count} (expected {expected_violations})")
+    print(f"successes:  {trust_score.successful_inferences} (expected {expected_successes})")
+    print(f"score:      {trust_score.score:.2f}")
+    
+    ok = (
+        not errors
+        and trust_score.violation_count == expected_violations
+        and trust_score.successful_inferences == expected_successes
+        and settings.trust_score_min <= trust_score.score <= settings.trust_score_max
+    )
+    for error in errors:
+        print(f"error: {error}")
+    print("✓ No lost updates" if ok else "✗ Lost or failed updates")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Export the audit log as NDJSON (optionally gzip/zstd compressed).
+
+Usage:
+    python scripts/export_audit.py [-o FILE] [--compression none|gzip|zstd]
+        [--session-id UUID] [--since ISO] [--until ISO] [--violations-only | --no-violations]
+
+Writes to stdout when no output file is given. Rows stream from the database
+with a server-side cursor, so memory use stays flat for any table size.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import time
+from datetime import datetime
+from uuid import UUID
+
+from app.database import engine
+from app.audit_export import EXPORT_BATCH_SIZE, EXPORT_COMPRESSIONS, audit_filter_clauses, export_audit
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the audit log as NDJSON.")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--compression", choices=list(EXPORT_COMPRESSIONS), default="none")
+    parser.add_argument("--session-id", type=UUID, help="Only export this session")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Inclusive start timestamp (ISO 8601)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Exclusive end timestamp (ISO 8601)")
+    violations = parser.add_mutually_exclusive_group()
+    violations.add_argument("--violations-only", dest="policy_violation", action="store_true", default=None)
+    violations.add_argument("--no-violations", dest="policy_violation", action="store_false")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Rows fetched per round trip")
+    return parser.parse_args()
+
+
+def main():
+    """Run the export."""
+    args = parse_args()
+    clauses = audit_filter_clauses(args.session_id, args.policy_violation, args.since, args.until)
+    chunks = export_audit(engine, clauses, args.compression, args.batch_size)
+    
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    start = time.perf_counter()
+    written = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✓ Exported {written / 1_000_000:.1f} MB in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Bulk-load memories from NDJSON files straight into the database.
+
+Usage:
+    python scripts/ingest_memories.py [FILE ...] [--results FILE]
+        [--batch-size N] [--workers N]
+
+Reads stdin when no file is given. Each line is a JSON object
+``{"zone": ..., "tags": [...], "content": ...}``; lines are validated against
+the LCAC zone policies and inserted in batched transactions, exactly like
+``POST /memories/bulk`` but without a running server. Per-line results are
+written as NDJSON to ``--results`` (discarded by default).
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import time
+from typing import Iterator, List
+
+from app.database import engine, init_db
+from app.memory_ingest import MemoryIngestor, ingest_ndjson
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load NDJSON memories.")
+    parser.add_argument("files", nargs="*", help="NDJSON files (default: stdin)")
+    parser.add_argument("--results", help="Write per-line NDJSON results to this file")
+    parser.add_argument("--batch-size", type=int, help="Memories per insert transaction")
+    parser.add_argument("--workers", type=int, help="Hashing threads")
+    return parser.parse_args()
+
+
+def read_chunks(paths: List[str]) -> Iterator[bytes]:
+    """Yield raw chunks from each file (or stdin), keeping files newline-separated."""
+    for path in paths or ["-"]:
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            last = b"\n"
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                last = chunk
+                yield chunk
+            if not last.endswith(b"\n"):
+                yield b"\n"
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+
+
+def main():
+    """Run the load and print a summary."""
+    args = parse_args()
+    init_db()
+    
+    results = open(args.results or os.devnull, "wb")
+    start = time.perf_counter()
+    try:
+        ingestor = MemoryIngestor(engine, results, batch_size=args.batch_size, workers=args.workers)
+        summary = ingest_ndjson(ingestor, read_chunks(args.files))
+    finally:
+        results.close()
+    elapsed = time.perf_counter() - start
+    
+    print(
+        f"✓ {summary['created']:,} memories created, {summary['rejected']:,} rejected "
+        f"from {summary['lines']:,} lines in {elapsed:.1f}s "
+        f"({summary['created'] / elapsed if elapsed else 0:,.0f} memories/s)",
+        file=sys.stderr
+    )
+    if summary["rejected"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -50,6 +50,7 @@ def create_sample_data():
         )
         memory.set_tags(mem_data["tags"])
         session.add(memory)
+        session.add_all(memory.build_tag_rows())
         print(f"  - Created memory in zone '{mem_data['zone']}' with tags {mem_data['tags']}")
     
     session.commit()
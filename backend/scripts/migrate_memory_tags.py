@@ -0,0 +1,25 @@
+"""Backfill the memorytag index from existing JSON ``Memory.tags`` data.
+
+``init_db`` runs the backfill by itself when ``memorytag`` is empty and tagged
+memories exist; use this script to rebuild the index at any other time.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import backfill_memory_tags, init_db
+
+
+def main():
+    """Run the memory tag migration."""
+    print("Ensuring tables exist...")
+    init_db()
+    print("Backfilling memory tag index...")
+    count = backfill_memory_tags()
+    print(f"✓ Indexed tags for {count} memories")
+
+
+if __name__ == "__main__":
+    main()
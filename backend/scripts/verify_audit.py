@@ -0,0 +1,41 @@
+"""Verify the whole audit hash chain and every Merkle checkpoint.
+
+Usage:
+    python scripts/verify_audit.py [--workers N] [--chunk-size N]
+
+Rehashes every chained audit record across a process pool. Exits non-zero if
+any record, chain link or checkpoint does not match.
+"""
+
+import sys
+import os
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+
+from app.audit_chain import VERIFY_CHUNK_SIZE, verify_all
+
+
+def main():
+    """Run the bulk verification."""
+    parser = argparse.ArgumentParser(description="Verify the audit hash chain and Merkle checkpoints.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: AUDIT_VERIFY_WORKERS or CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=VERIFY_CHUNK_SIZE, help="Records per task (power of two)")
+    args = parser.parse_args()
+    
+    result = verify_all(workers=args.workers, chunk_size=args.chunk_size)
+    print(
+        f"{result['records']:,} chained records, {result['checkpoints_checked']:,} checkpoints, "
+        f"{result['unchained_records']:,} legacy unchained records "
+        f"({result['workers']} workers, {result['seconds']:.1f}s)"
+    )
+    if result["verified"]:
+        print(f"✓ Audit log verified, root {result['root_hash']}")
+    else:
+        print(f"✗ Verification failed: {result['error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()